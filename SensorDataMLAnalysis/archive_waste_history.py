@@ -1,67 +1,203 @@
+import heapq
 import json
 import os
-import sys
+from datetime import datetime, timezone
+
+from waste_dedupe import collapse_duplicates
+from waste_thumbnails import add_thumbnails
+
+# The history is kept as one JSON file per month plus a small manifest:
+#
+#   public/detected_waste_photos/history/manifest.json
+#   public/detected_waste_photos/history/2026-01.json   (newest first)
+#   public/detected_waste_photos/history/2025-12.json
+#   ...
+#
+# The manifest lists every shard newest first with its count, newest/oldest
+# timestamp and per-day / per-hour counts, so the Gallery can draw its charts
+# from the manifest alone and only fetch shards when the user pages back.
+# A sync only opens the shards the new photos fall into, and nothing is
+# ever trimmed. Before merging, bursts of near-identical frames are folded
+# into one representative (see waste_dedupe.py) and the representatives get
+# their Gallery thumbnails (see waste_thumbnails.py); both are also written
+# back to photos.json. Only representatives are archived.
+
+
+def photo_key(photo):
+    # ISO-like date + time strings sort correctly as text; id breaks ties
+    return (photo["date"], photo["time"], photo["id"])
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"Error decoding {path}. Starting fresh.")
+        return default
+
+
+def json_lines(items):
+    # one item per line keeps the git diffs of a shard (or the manifest) small
+    return "[\n" + ",\n".join(json.dumps(item) for item in items) + "\n]" if items else "[]"
+
+
+def write_json(path, text):
+    # write next to the target and swap it in, so a half written shard is never served
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text + "\n")
+    os.replace(tmp_path, path)
+
+
+def shard_summary(month, photos):
+    days = {}
+    hours = [0] * 24
+    for photo in photos:
+        days[photo["date"]] = days.get(photo["date"], 0) + 1
+        try:
+            hours[int(photo["time"].split(":")[0]) % 24] += 1
+        except ValueError:
+            pass
+    return {
+        "month": month,
+        "file": f"history/{month}.json",
+        "count": len(photos),
+        # including the near-duplicate frames folded into these photos
+        "frames": len(photos) + sum(photo.get("duplicates", 0) for photo in photos),
+        "newest": f"{photos[0]['date']} {photos[0]['time']}",
+        "oldest": f"{photos[-1]['date']} {photos[-1]['time']}",
+        "days": dict(sorted(days.items())),
+        "hours": hours,
+    }
+
+
+def merge_into_shard(shard_path, new_photos, duplicates=None):
+    """Sorted merge of new_photos into one month shard; returns (photos, added, updated).
+
+    Photos marked duplicate_of are left out (and taken out if an earlier run
+    archived them); duplicates maps representative id -> its duplicate ids.
+    """
+    shard = load_json(shard_path, [])
+    positions = {photo["id"]: i for i, photo in enumerate(shard)}
+
+    added, updated, removed = [], [], set()
+    for photo in new_photos:
+        i = positions.get(photo["id"])
+        if "duplicate_of" in photo:
+            if i is not None and i >= 0:
+                removed.add(photo["id"])
+                updated.append(photo)
+        elif i is None:
+            positions[photo["id"]] = -1
+            added.append(photo)
+        elif i >= 0 and shard[i] != photo:
+            # already archived, but the record changed (e.g. it got thumbnails)
+            shard[i] = photo
+            updated.append(photo)
+
+    # representatives that took new frames this run but are not in photos.json any more
+    for rep_id, duplicate_ids in (duplicates or {}).items():
+        i = positions.get(rep_id)
+        if i is not None and i >= 0 and shard[i].get("duplicate_ids") != duplicate_ids:
+            shard[i] = {**shard[i], "duplicates": len(duplicate_ids), "duplicate_ids": duplicate_ids}
+            updated.append(shard[i])
+
+    if removed:
+        shard = [photo for photo in shard if photo["id"] not in removed]
+    if updated:
+        shard.sort(key=photo_key, reverse=True)
+    if not added:
+        return shard, added, updated
+
+    added.sort(key=photo_key, reverse=True)
+    return list(heapq.merge(shard, added, key=photo_key, reverse=True)), added, updated
+
 
 def archive_history():
     # Paths (relative to where script is run, usually root of repo in CI)
-    # get the paths for the json files
-    PHOTOS_JSON_PATH = os.path.join("public", "detected_waste_photos", "photos.json")
-    HISTORY_JSON_PATH = os.path.join("public", "detected_waste_photos", "waste_history.json")
+    PHOTOS_DIR = os.path.join("public", "detected_waste_photos")
+    PHOTOS_JSON_PATH = os.path.join(PHOTOS_DIR, "photos.json")
+    HISTORY_DIR = os.path.join(PHOTOS_DIR, "history")
+    MANIFEST_PATH = os.path.join(HISTORY_DIR, "manifest.json")
+    PHASH_DIR = os.path.join(HISTORY_DIR, "phash")
+    # the old single-file hash index, split into month shards once
+    LEGACY_PHASH_PATH = os.path.join(HISTORY_DIR, "phash.json")
+    # the old single-file history, imported once if it is still around
+    LEGACY_HISTORY_PATH = os.path.join(PHOTOS_DIR, "waste_history.json")
 
     print(f"Checking for new photos in {PHOTOS_JSON_PATH}...")
 
-    
     # 1. load the current list of photos
-    current_photos = []
     if not os.path.exists(PHOTOS_JSON_PATH):
-        print(f"No photos.json found at {PHOTOS_JSON_PATH}. Initializing empty history.")
-    else:
-        try:
-            with open(PHOTOS_JSON_PATH, "r") as f:
-                current_photos = json.load(f)
-        except json.JSONDecodeError:
-            print("Error decoding photos.json. Initializing empty history.")
+        print(f"No photos.json found at {PHOTOS_JSON_PATH}.")
+    current_photos = load_json(PHOTOS_JSON_PATH, [])
+    os.makedirs(HISTORY_DIR, exist_ok=True)
 
-    # 2. load the old history or make a new one
-    if os.path.exists(HISTORY_JSON_PATH):
-        try:
-            with open(HISTORY_JSON_PATH, "r") as f:
-                history_photos = json.load(f)
-        except json.JSONDecodeError:
-            print("Error decoding waste_history.json. Starting fresh.")
-            history_photos = []
+    # fold bursts of near-identical frames, then make thumbnails of what is left;
+    # photos.json gets both too, the build imports it
+    before = json.dumps(current_photos)
+    changed_reps = collapse_duplicates(current_photos, PHASH_DIR, legacy_path=LEGACY_PHASH_PATH)
+    add_thumbnails([photo for photo in current_photos if "duplicate_of" not in photo])
+    if json.dumps(current_photos) != before:
+        write_json(PHOTOS_JSON_PATH, json.dumps(current_photos, indent=2))
+
+    # 2. load the manifest (small), or start a new history
+    if os.path.exists(MANIFEST_PATH):
+        manifest = load_json(MANIFEST_PATH, {"shards": []})
     else:
-        print("No history file found. Creating new one.")
-        history_photos = []
+        print("No history manifest found. Creating new one.")
+        manifest = {"shards": []}
+        if os.path.exists(LEGACY_HISTORY_PATH):
+            legacy = load_json(LEGACY_HISTORY_PATH, [])
+            print(f"Importing {len(legacy)} photos from {LEGACY_HISTORY_PATH}.")
+            current_photos = legacy + current_photos
+    shards = {entry["month"]: entry for entry in manifest["shards"]}
 
-    # 3. Merge process
-    # Create a set of existing IDs for fast lookup
-    existing_ids = set(photo["id"] for photo in history_photos)
-    
-    new_count = 0
+    # 3. group the photos by month, only those shards get touched
+    by_month = {}
     for photo in current_photos:
-        if photo["id"] not in existing_ids:
-            history_photos.append(photo)
-            existing_ids.add(photo["id"])
-            new_count += 1
-            print(f"Archived new photo: {photo['id']} ({photo['date']} {photo['time']})")
-
-    # 4. save history if we added something new
-    if new_count > 0 or not os.path.exists(HISTORY_JSON_PATH):
-        # Sort by date/time newly (optional but good for consistency)
-        # Using simple string comparison for date+time which works for ISO-like formats
-        history_photos.sort(key=lambda x: x["date"] + x["time"], reverse=True)
+        month = photo.get("date", "")[:7]
+        if len(month) != 7 or "time" not in photo or "id" not in photo:
+            print(f"Skipping photo with no usable id/date/time: {photo}")
+            continue
+        by_month.setdefault(month, []).append(photo)
+    duplicates_by_month = {}
+    for rep_id, rep in changed_reps.items():
+        duplicates_by_month.setdefault(rep["at"][:7], {})[rep_id] = rep["duplicate_ids"]
 
-        # Safety Limit: Keep only the recent 5000 entries to prevent performance issues
-        if len(history_photos) > 5000:
-            print(f"History limit exceeded ({len(history_photos)}). Trimming to recent 5000.")
-            history_photos = history_photos[:5000]
+    # 4. merge each month into its shard
+    new_count = 0
+    updated_count = 0
+    for month in sorted(set(by_month) | set(duplicates_by_month)):
+        shard_path = os.path.join(HISTORY_DIR, f"{month}.json")
+        merged, added, updated = merge_into_shard(shard_path, by_month.get(month, []),
+                                                  duplicates_by_month.get(month))
+        if not added and not updated:
+            continue
+        for photo in added:
+            print(f"Archived new photo: {photo['id']} ({photo['date']} {photo['time']})")
+        updated_count += len(updated)
+        write_json(shard_path, json_lines(merged))
+        if merged:
+            shards[month] = shard_summary(month, merged)
+        else:
+            shards.pop(month, None)
+        new_count += len(added)
 
-        with open(HISTORY_JSON_PATH, "w") as f:
-            json.dump(history_photos, f, indent=2)
-        print(f"Successfully synced history. Added {new_count} new photos. Total: {len(history_photos)}")
+    # 5. save the manifest if we added something new
+    if new_count > 0 or updated_count > 0 or not os.path.exists(MANIFEST_PATH):
+        updated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        total = sum(entry["count"] for entry in shards.values())
+        shard_list = json_lines([shards[month] for month in sorted(shards, reverse=True)])
+        write_json(MANIFEST_PATH, f'{{"updated": "{updated_at}", "total": {total}, "shards": {shard_list}}}')
+        print(f"Successfully synced history. Added {new_count} new photos, updated {updated_count}. "
+              f"Total: {total} in {len(shards)} shards")
     else:
-        print("No new photos to archive and history file exists.")
+        print("No new photos to archive and history manifest exists.")
+
 
 if __name__ == "__main__":
     archive_history()
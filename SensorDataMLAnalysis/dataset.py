@@ -0,0 +1,215 @@
+"""
+The training dataset (flood_risk_dataset_india_modified.csv), parsed once.
+
+The first load parses the csv and writes a binary copy next to it:
+
+    .dataset_cache/flood_risk_dataset_india_modified-<sha256[:16]>.npz
+    .dataset_cache/flood_risk_dataset_india_modified.json    size/mtime -> hash of the csv
+
+Numeric columns are stored as float32, the 0/1 columns as int8 and the text
+columns (Land Cover, Soil Type) as int8 codes plus their category names.
+Later loads find the cache through the content hash of the csv and only
+read the .npz; the hash itself is only recomputed when the size or mtime of
+the csv changed, so an unchanged dataset loads in milliseconds whatever its
+size. Editing the csv gives a new hash and a new cache.
+
+The default 80/20 split (random_state 42, as the training scripts always
+used) is stored in the cache too.
+
+Column names are the csv headers without units, in snake case:
+    'Rainfall (mm)' -> rainfall, 'Temperature (°C)' -> temperature,
+    'Water Level (m)' -> water_level, 'Flood Occurred' -> flood, ...
+
+Usage:
+    from dataset import FEATURES, load_split
+    X_train, X_test, y_train, y_test = load_split()
+
+    python dataset.py            # build (or check) the cache and print what it holds
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_FILE = 'flood_risk_dataset_india_modified.csv'
+DATASET_PATH = os.path.join(BASE_DIR, DATASET_FILE)
+CACHE_DIR = ".dataset_cache"
+CACHE_VERSION = 1
+
+# the inputs every model is trained on, in the order predict_flood_risk.py builds them
+FEATURES = ['rainfall', 'humidity', 'temperature', 'water_level']
+TARGET = 'flood'
+# columns of the csv the models do not use (yet)
+EXTRA_FEATURES = ['river_discharge', 'elevation', 'land_cover', 'soil_type']
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+_RENAMES = {'flood_occurred': TARGET}
+
+
+def column_name(header):
+    """'Water Level (m)' -> 'water_level', and the sensor csv's 'waterLevel' -> 'water_level'."""
+    name = re.sub(r"\s*\(.*\)\s*$", "", header).strip()
+    name = re.sub(r"(?<=[a-z])(?=[A-Z])", "_", name).lower()
+    name = re.sub(r"\W+", "_", name).strip("_")
+    return _RENAMES.get(name, name)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, write, mode='w'):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class Dataset:
+    """Columns of the dataset as arrays; text columns are codes into categories[name]."""
+
+    def __init__(self, columns, categories, split=None, source_hash=None):
+        self.columns = columns
+        self.categories = categories
+        self.split = split
+        self.source_hash = source_hash
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def frame(self, names=None, one_hot=True):
+        """DataFrame of the named columns; text columns become one 0/1 column per category."""
+        data = {}
+        for name in names or list(self.columns):
+            values = self.columns[name]
+            if name in self.categories and one_hot:
+                for code, category in enumerate(self.categories[name]):
+                    data[f"{name}={category}"] = (values == code).astype(np.int8)
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+    def split_indices(self, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+        if self.split is not None and (test_size, random_state) == (TEST_SIZE, RANDOM_STATE):
+            return self.split
+        from sklearn.model_selection import train_test_split
+
+        # the split only depends on the row count, same rows as splitting the frame itself
+        return train_test_split(np.arange(len(self)), test_size=test_size, random_state=random_state)
+
+
+def _parse(csv_path):
+    df = pd.read_csv(csv_path)
+    df.columns = [column_name(c) for c in df.columns]
+    columns, categories = {}, {}
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series):
+            if pd.api.types.is_integer_dtype(series) and series.between(-128, 127).all():
+                columns[name] = series.to_numpy(dtype=np.int8)
+            else:
+                columns[name] = series.to_numpy(dtype=np.float32)
+        else:
+            codes, uniques = pd.factorize(series, sort=True)
+            columns[name] = codes.astype(np.int8 if len(uniques) < 128 else np.int16)
+            categories[name] = [str(u) for u in uniques]
+    return columns, categories
+
+
+def _cache_paths(csv_path, source_hash=None):
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    npz = os.path.join(cache_dir, f"{stem}-{source_hash[:16]}.npz") if source_hash else None
+    return cache_dir, os.path.join(cache_dir, f"{stem}.json"), npz
+
+
+def source_hash(csv_path):
+    """sha256 of the csv, reused from the cache index while its size and mtime are unchanged."""
+    _, index_path, _ = _cache_paths(csv_path)
+    stat = os.stat(csv_path)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('size') == stat.st_size and index.get('mtime_ns') == stat.st_mtime_ns:
+                return index['sha256']
+        except (OSError, ValueError, KeyError):
+            pass
+    return file_hash(csv_path)
+
+
+def load_dataset(csv_path=DATASET_PATH):
+    """The whole dataset from the binary cache, rebuilding it when the csv changed."""
+    digest = source_hash(csv_path)
+    cache_dir, index_path, npz_path = _cache_paths(csv_path, digest)
+
+    if os.path.exists(npz_path):
+        try:
+            with np.load(npz_path, allow_pickle=False) as cached:
+                meta = json.loads(str(cached['__meta__']))
+                if meta.get('version') == CACHE_VERSION:
+                    columns = {name: cached[name] for name in meta['columns']}
+                    split = (cached['__train__'], cached['__test__'])
+                    return Dataset(columns, meta['categories'], split, digest)
+        except (OSError, ValueError, KeyError):
+            print(f"Could not read {npz_path}, parsing {csv_path} again.")
+
+    print(f"Parsing {csv_path}...")
+    columns, categories = _parse(csv_path)
+    dataset = Dataset(columns, categories, source_hash=digest)
+    dataset.split = dataset.split_indices()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    meta = {'version': CACHE_VERSION, 'columns': list(columns), 'categories': categories}
+    arrays = {**columns, '__train__': dataset.split[0], '__test__': dataset.split[1],
+              '__meta__': np.array(json.dumps(meta))}
+    _write_atomic(npz_path, lambda f: np.savez(f, **arrays), 'wb')
+    # older caches of this csv are stale now
+    stem = os.path.basename(npz_path).rsplit('-', 1)[0]
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{stem}-") and name.endswith('.npz') and os.path.join(cache_dir, name) != npz_path:
+            os.remove(os.path.join(cache_dir, name))
+    stat = os.stat(csv_path)
+    index = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    _write_atomic(index_path, lambda f: json.dump(index, f))
+    return dataset
+
+
+def load_split(csv_path=DATASET_PATH, features=FEATURES, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """X_train, X_test, y_train, y_test like train_test_split(df[features], df['flood'], ...)."""
+    dataset = load_dataset(csv_path)
+    X = dataset.frame(features)
+    y = pd.Series(dataset.columns[TARGET], name=TARGET)
+    train, test = dataset.split_indices(test_size, random_state)
+    return X.iloc[train], X.iloc[test], y.iloc[train], y.iloc[test]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or check the binary cache of the training dataset.")
+    parser.add_argument("csv", nargs="?", default=DATASET_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    dataset = load_dataset(args.csv)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{len(dataset)} rows loaded in {elapsed:.1f} ms (csv sha256 {dataset.source_hash[:16]})")
+    for name, values in dataset.columns.items():
+        categories = dataset.categories.get(name)
+        print(f"  {name:<20} {values.dtype}" + (f"  {', '.join(categories)}" if categories else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,97 @@
-import pandas as pd
 import pickle
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 import numpy as np
 import json
+import os
+import time
+import tracemalloc
+
+from dataset import DATASET_FILE, load_split
+from numpy_runtime import compact_path, load_compact_model
 
 # Set style
 sns.set_theme(style="whitegrid")
 
+MODEL_FILES = {
+    'Logistic Regression': 'logistic_model.pkl',
+    'Decision Tree': 'decision_tree_model.pkl',
+    'SVM': 'svm_model.pkl',
+    'Deep Learning (MLP)': 'deep_model.pkl',
+}
+
+SINGLE_ROW_RUNS = 200   # timed single-row predictions per model
+BATCH_RUNS = 20         # timed predictions of the whole test set per model
+
 def load_data():
     print("Loading data...")
-    df = pd.read_csv('flood_risk_dataset_india_modified.csv')
-    
-    # Rename columns
-    column_mapping = {
-        'Rainfall (mm)': 'rainfall',
-        'Humidity (%)': 'humidity',
-        'Water Level (m)': 'water_level',
-        'Flood Occurred': 'flood'
-    }
-    for col in df.columns:
-        if 'Temperature' in col:
-            column_mapping[col] = 'temperature'
-            break
-    df.rename(columns=column_mapping, inplace=True)
-
-    X = df[['rainfall', 'humidity', 'temperature', 'water_level']]
-    y = df['flood']
-    # Split same as training
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # same split as training
+    X_train, X_test, y_train, y_test = load_split(DATASET_FILE)
     return X_test, y_test
 
+def _timed(fn, runs):
+    # returns (p50, p99) in milliseconds
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def benchmark_inference(model, X_test):
+    """Single-row and whole-test-set latency of a compact model, the one predict_flood_risk.py serves."""
+    predict = model.predict
+
+    single_row = X_test.iloc[[0]]
+    predict(single_row)  # warm up
+    single_p50, single_p99 = _timed(lambda: predict(single_row), SINGLE_ROW_RUNS)
+    batch_p50, batch_p99 = _timed(lambda: predict(X_test), BATCH_RUNS)
+    return {
+        'single_p50_ms': single_p50,
+        'single_p99_ms': single_p99,
+        'batch_rows': len(X_test),
+        'batch_p50_ms': batch_p50,
+        'batch_p99_ms': batch_p99,
+        'has_proba': hasattr(model, 'predict_proba'),
+    }
+
+
+def load_compact_timed(compact_file):
+    """Load a compact export, timing the load and its peak allocation; returns (model, stats)."""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        model = load_compact_model(compact_file)
+        load_ms = (time.perf_counter() - started) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return model, {
+        'load_ms': load_ms,
+        'load_peak_bytes': peak,
+        'artifact_bytes': os.path.getsize(compact_file),
+    }
+
+
 def evaluate_models():
     X_test, y_test = load_data()
     
     models = {}
-    
-    # helper to load pickle safely
+    compact_models = {}
+    load_stats = {}
+
+    # the pickles give the report and plots, the latency/size numbers come from the
+    # compact .npz exports predict_flood_risk.py actually loads (timing the load and its peak allocation)
     print("Loading models...")
     try:
-        with open('logistic_model.pkl', 'rb') as f:
-            models['Logistic Regression'] = pickle.load(f)
-            
-        with open('decision_tree_model.pkl', 'rb') as f:
-            models['Decision Tree'] = pickle.load(f)
-            
-        with open('svm_model.pkl', 'rb') as f:
-            models['SVM'] = pickle.load(f)
-            
-        with open('deep_model.pkl', 'rb') as f:
-            deep_pkg = pickle.load(f)
-            models['Deep Learning (MLP)'] = deep_pkg
+        for name, filename in MODEL_FILES.items():
+            with open(filename, 'rb') as f:
+                models[name] = pickle.load(f)
+            compact_models[name], load_stats[name] = load_compact_timed(compact_path(filename))
     except FileNotFoundError as e:
-        print(f"Error loading models: {e}")
+        print(f"Error loading models: {e} (run export_models.py for the compact models)")
         return
 
     results = []
@@ -62,8 +99,8 @@ def evaluate_models():
     
     # 1. Evaluate Loop
     for name, model_obj in models.items():
-        if name == 'Deep Learning (MLP)':
-             # DL model handle (has scaler)
+        if isinstance(model_obj, dict):
+             # models trained on scaled features are stored with their scaler
              model = model_obj['model']
              scaler = model_obj['scaler']
              X_input = scaler.transform(X_test)
@@ -79,12 +116,17 @@ def evaluate_models():
             'name': name,
             'accuracy': acc,
             'cm': cm,
-            'model': model
+            'model': model,
+            'perf': {**load_stats[name], **benchmark_inference(compact_models[name], X_test)}
         })
         
         
         report = classification_report(y_test, y_pred)
-        res_str = f"\n--- {name} Results ---\nAccuracy: {acc:.2f}\nConfusion Matrix:\n{cm}\nReport:\n{report}\n"
+        perf = results[-1]['perf']
+        res_str = (f"\n--- {name} Results ---\nAccuracy: {acc:.2f}\nConfusion Matrix:\n{cm}\nReport:\n{report}\n"
+                   f"Latency: single row p50 {perf['single_p50_ms']:.3f} ms / p99 {perf['single_p99_ms']:.3f} ms, "
+                   f"{perf['batch_rows']} rows p50 {perf['batch_p50_ms']:.3f} ms / p99 {perf['batch_p99_ms']:.3f} ms\n"
+                   f"Load: {perf['load_ms']:.1f} ms, peak {perf['load_peak_bytes']} bytes, artifact {perf['artifact_bytes']} bytes\n")
         output_text += res_str
         # print(res_str) # defer printing
 
@@ -137,13 +179,19 @@ def evaluate_models():
     print(output_text)
 
     # Save metrics for prediction script
-    # We only need name and accuracy to pick the best one, 
-    # but let's save more just in case.
+    # accuracy picks the model, the latency/size numbers let it respect a budget.
+    # Keep fields written by other tools (e.g. the training params).
+    previous = {}
+    if os.path.exists('model_metrics.json'):
+        with open('model_metrics.json', 'r') as f:
+            previous = {m['name']: m for m in json.load(f)}
     metrics_export = []
     for r in results:
         metrics_export.append({
+            **previous.get(r['name'], {}),
             'name': r['name'],
-            'accuracy': r['accuracy']
+            'accuracy': r['accuracy'],
+            **r['perf']
         })
     
     with open('model_metrics.json', 'w') as f:
@@ -0,0 +1,129 @@
+"""
+Export the pickled scikit-learn models to the compact .npz format read by
+numpy_runtime.py, so predictions no longer import scikit-learn or depend on
+the pickle's scikit-learn version.
+
+Usage (from SensorDataMLAnalysis/):
+    python export_models.py            # export every model found
+    python export_models.py --verify   # export, then check predictions match
+"""
+
+import argparse
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+from dataset import DATASET_FILE, FEATURES, load_dataset
+from numpy_runtime import FORMAT_VERSION, COMPACT_DIR, compact_path, load_compact_model
+
+MODEL_FILES = ['logistic_model.pkl', 'decision_tree_model.pkl', 'svm_model.pkl', 'deep_model.pkl']
+
+
+def model_arrays(model_obj):
+    """Flatten a fitted estimator (or the deep_model.pkl dict) into plain arrays."""
+    scaler = None
+    if isinstance(model_obj, dict):
+        model_obj, scaler = model_obj['model'], model_obj['scaler']
+
+    name = type(model_obj).__name__
+    arrays = {'classes': np.asarray(model_obj.classes_)}
+    if name in ('LogisticRegression', 'SVC', 'SGDClassifier'):
+        if name == 'SVC' and model_obj.kernel != 'linear':
+            raise ValueError(f"Cannot export {name} with a {model_obj.kernel} kernel")
+        logistic = name == 'LogisticRegression' or (name == 'SGDClassifier' and model_obj.loss == 'log_loss')
+        coef, intercept = np.asarray(model_obj.coef_), np.asarray(model_obj.intercept_)
+        if scaler is not None:
+            # fold the scaler into the weights, w.(x - mean)/scale + b
+            coef = coef / scaler.scale_
+            intercept = intercept - coef @ scaler.mean_
+            scaler = None
+        arrays.update(kind='logistic' if logistic else 'linear_svm', coef=coef, intercept=intercept)
+    elif name == 'DecisionTreeClassifier':
+        tree = model_obj.tree_
+        arrays.update(kind='tree', children_left=tree.children_left, children_right=tree.children_right,
+                      feature=tree.feature, threshold=tree.threshold, value=tree.value[:, 0, :])
+    elif name == 'MLPClassifier':
+        arrays.update(kind='mlp', activation=model_obj.activation, n_layers=len(model_obj.coefs_))
+        for i, (W, b) in enumerate(zip(model_obj.coefs_, model_obj.intercepts_)):
+            arrays[f'coefs_{i}'] = W
+            arrays[f'intercepts_{i}'] = b
+    else:
+        raise ValueError(f"Cannot export {name}")
+
+    if scaler is not None:
+        arrays.update(scaler_mean=scaler.mean_, scaler_scale=scaler.scale_)
+    arrays['format_version'] = FORMAT_VERSION
+    return arrays
+
+
+def export_models(model_dir=BASE_DIR, compact_dir=COMPACT_DIR):
+    os.makedirs(compact_dir, exist_ok=True)
+    exported = []
+    for filename in MODEL_FILES:
+        pickle_path = os.path.join(model_dir, filename)
+        if not os.path.exists(pickle_path):
+            print(f"Skipping missing {filename}")
+            continue
+        with open(pickle_path, 'rb') as f:
+            model_obj = pickle.load(f)
+
+        target = compact_path(filename, compact_dir)
+        # write next to the target and swap it in, predictions may be reading it
+        tmp_path = target + '.tmp.npz'
+        np.savez_compressed(tmp_path, **model_arrays(model_obj))
+        os.replace(tmp_path, target)
+        print(f"Exported {filename} -> {os.path.relpath(target, model_dir)} ({os.path.getsize(target)} bytes)")
+        exported.append(filename)
+    return exported
+
+
+def verify(model_dir=BASE_DIR, compact_dir=COMPACT_DIR):
+    """Compare sklearn and NumPy-runtime predictions on the training data and sensor history."""
+    X = load_dataset(os.path.join(model_dir, DATASET_FILE)).frame(FEATURES).astype(float)
+    sensor_csv = os.path.join(model_dir, '..', 'public', 'sensor_data.csv')
+    if os.path.exists(sensor_csv):
+        sensors = pd.read_csv(sensor_csv)
+        sensors = sensors.rename(columns={'waterLevel': 'water_level'})[FEATURES]
+        X = pd.concat([X, sensors], ignore_index=True)
+
+    ok = True
+    for filename in MODEL_FILES:
+        target = compact_path(filename, compact_dir)
+        if not os.path.exists(target):
+            continue
+        with open(os.path.join(model_dir, filename), 'rb') as f:
+            model_obj = pickle.load(f)
+        if isinstance(model_obj, dict):
+            model, X_input = model_obj['model'], model_obj['scaler'].transform(X)
+        else:
+            model, X_input = model_obj, X
+        compact = load_compact_model(target)
+
+        same = np.array_equal(model.predict(X_input), compact.predict(X))
+        proba_diff = None
+        if hasattr(model, 'predict_proba'):
+            proba_diff = float(np.abs(model.predict_proba(X_input) - compact.predict_proba(X)).max())
+            same = same and proba_diff < 1e-9
+        ok = ok and same
+        print(f"{filename}: predictions {'match' if same else 'DIFFER'} on {len(X)} rows"
+              + (f", max probability difference {proba_diff:.2e}" if proba_diff is not None else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the pickled models to NumPy-only .npz files.")
+    parser.add_argument("--verify", action="store_true", help="check the exported models against scikit-learn")
+    args = parser.parse_args()
+
+    export_models()
+    if args.verify and not verify():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Local inference server that keeps the flood models warm in memory.
+
+Loads every supervised model listed in model_metrics.json plus the
+IsolationForest used by analysis_firebase.py once, then serves predictions
+over localhost HTTP. Concurrent requests for the same model are queued and
+scored together in a single predict call (micro-batching).
+
+Endpoints:
+    POST /predict   {"model": "<name>", "columns": {"feature": [values, ...]}}
+                    -> {"predictions": [...], "probabilities": [...] | null}
+                    the IsolationForest ("isolation_forest") returns
+                    {"predictions": [...], "scores": [...]} instead
+    GET  /stats     per-model request/row/batch counters, latency and throughput
+    GET  /health    {"status": "ok", "models": [...]}
+
+Usage:
+    python SensorDataMLAnalysis/model_server.py [--host 127.0.0.1] [--port 8765]
+
+Scripts talk to it through model_client.py in the repository root.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+from predict_flood_risk import METRICS_PATH, load_model
+
+ANOMALY_MODEL = "isolation_forest"
+ANOMALY_MODEL_PATH = os.path.join(BASE_DIR, '..', 'flood_unsupervised.pkl')
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BATCH_ROWS = 512       # rows scored together in one predict call
+MAX_WAIT_SECONDS = 0.005   # how long a batch waits for more requests to join
+LATENCY_WINDOW = 1000      # request latencies kept for the percentiles
+
+
+class ModelHTTPServer(ThreadingHTTPServer):
+    # the default backlog of 5 refuses connections under concurrent load
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class BatchingModel:
+    """Scores queued requests for one model in combined predict calls."""
+
+    def __init__(self, name, model, scaler=None, anomaly=False,
+                 max_batch_rows=MAX_BATCH_ROWS, max_wait=MAX_WAIT_SECONDS):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.anomaly = anomaly
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started = time.time()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        threading.Thread(target=self._worker, name=f"batcher-{name}", daemon=True).start()
+
+    def submit(self, frame):
+        """Queue a DataFrame and block until its slice of the batch is scored."""
+        job = {"frame": frame, "done": threading.Event(), "result": None, "error": None,
+               "queued": time.perf_counter()}
+        self._queue.put(job)
+        job["done"].wait()
+        if job["error"] is not None:
+            raise job["error"]
+        return job["result"]
+
+    def _collect(self):
+        jobs = [self._queue.get()]
+        rows = len(jobs[0]["frame"])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            rows += len(job["frame"])
+        return jobs
+
+    def _predict(self, frame):
+        if self.anomaly:
+            return {"predictions": self.model.predict(frame), "scores": self.model.score_samples(frame)}
+        X_input = self.scaler.transform(frame) if self.scaler is not None else frame
+        probabilities = None
+        if hasattr(self.model, "predict_proba"):
+            try:
+                probabilities = self.model.predict_proba(X_input)[:, 1]
+            except Exception:
+                pass
+        return {"predictions": self.model.predict(X_input), "probabilities": probabilities}
+
+    def _worker(self):
+        while True:
+            jobs = self._collect()
+            started = time.perf_counter()
+            try:
+                frame = pd.concat([job["frame"] for job in jobs], ignore_index=True)
+                output = self._predict(frame)
+                error = None
+            except Exception as e:
+                output, error = None, e
+            finished = time.perf_counter()
+
+            offset = 0
+            for job in jobs:
+                n = len(job["frame"])
+                if error is None:
+                    job["result"] = {key: (None if values is None else np.asarray(values)[offset:offset + n].tolist())
+                                     for key, values in output.items()}
+                job["error"] = error
+                offset += n
+
+            with self._stats_lock:
+                self.batches += 1
+                self.requests += len(jobs)
+                self.rows += offset
+                self.errors += len(jobs) if error is not None else 0
+                self.busy_seconds += finished - started
+                for job in jobs:
+                    self.latencies.append(finished - job["queued"])
+            for job in jobs:
+                job["done"].set()
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = np.array(self.latencies) * 1000.0
+            uptime = max(time.time() - self.started, 1e-9)
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "avg_batch_rows": self.rows / self.batches if self.batches else 0.0,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "latency_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+                "rows_per_second": self.rows / uptime,
+                "busy_rows_per_second": self.rows / self.busy_seconds if self.busy_seconds else None,
+            }
+
+
+def load_models(metrics_path=METRICS_PATH, anomaly_model_path=ANOMALY_MODEL_PATH):
+    """Load every model once and wrap each in a BatchingModel, keyed by name."""
+    models = {}
+    with open(metrics_path, 'r') as f:
+        metrics = json.load(f)
+    for entry in metrics:
+        try:
+            model, scaler = load_model(entry['name'])
+        except (ValueError, FileNotFoundError) as e:
+            print(f"Skipping {entry['name']}: {e}")
+            continue
+        models[entry['name']] = BatchingModel(entry['name'], model, scaler)
+
+    if os.path.exists(anomaly_model_path):
+        print(f"Loading model from: {anomaly_model_path}")
+        models[ANOMALY_MODEL] = BatchingModel(ANOMALY_MODEL, joblib.load(anomaly_model_path), anomaly=True)
+    return models
+
+
+def make_handler(models):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "models": list(models)})
+            elif self.path == "/stats":
+                self._send(200, {name: m.stats() for name, m in models.items()})
+            else:
+                self._send(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": f"Unknown path: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length))
+                model = models[request["model"]]
+                frame = pd.DataFrame(request["columns"])
+            except KeyError as e:
+                self._send(400, {"error": f"Missing or unknown field: {e}"})
+                return
+            except (ValueError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            try:
+                self._send(200, model.submit(frame))
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # keep the console quiet, /stats has the numbers
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the flood models from memory over localhost HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    models = load_models()
+    server = ModelHTTPServer((args.host, args.port), make_handler(models))
+    print(f"Model server listening on http://{args.host}:{args.port} with {len(models)} models")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
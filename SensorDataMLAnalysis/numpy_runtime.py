@@ -0,0 +1,145 @@
+"""
+NumPy-only inference for the models exported by export_models.py.
+
+A compact model is a .npz file holding a format version, a kind and the plain
+arrays needed to evaluate it:
+    logistic    coef, intercept, classes  (LogisticRegression, SGDClassifier(loss='log_loss'))
+    linear_svm  coef, intercept, classes  (linear SVC, SGDClassifier(loss='hinge')), no predict_proba
+                a StandardScaler bundled with either is folded into coef and intercept
+    tree        children_left/right, feature, threshold, value, classes
+    mlp         coefs_<i>, intercepts_<i>, activation, classes,
+                plus scaler_mean/scaler_scale for the bundled StandardScaler
+
+Loading one needs neither scikit-learn nor pickle, and predictions match the
+original estimators (checked by `export_models.py --verify`).
+"""
+
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+COMPACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compact_models')
+
+
+def _as_array(X):
+    # accept DataFrames without importing pandas
+    return np.asarray(X.to_numpy() if hasattr(X, 'to_numpy') else X, dtype=np.float64)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class LinearModel:
+    def __init__(self, arrays):
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+        self.classes_ = arrays['classes']
+
+    def decision_function(self, X):
+        return (_as_array(X) @ self.coef.T + self.intercept).ravel()
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+class LogisticModel(LinearModel):
+    def predict_proba(self, X):
+        p = _sigmoid(self.decision_function(X))
+        return np.column_stack([1 - p, p])
+
+
+class TreeModel:
+    def __init__(self, arrays):
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.classes_ = arrays['classes']
+
+    def _leaves(self, X):
+        # sklearn compares float32 inputs against the thresholds
+        X = _as_array(X).astype(np.float32).astype(np.float64)
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.int64)
+        active = self.children_left[node] != -1
+        # walk every row down one level per iteration
+        while active.any():
+            idx = rows[active]
+            current = node[idx]
+            go_left = X[idx, self.feature[current]] <= self.threshold[current]
+            node[idx] = np.where(go_left, self.children_left[current], self.children_right[current])
+            active = self.children_left[node] != -1
+        return node
+
+    def predict_proba(self, X):
+        value = self.value[self._leaves(X)]
+        return value / value.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.value[self._leaves(X)], axis=1)]
+
+
+class MLPModel:
+    def __init__(self, arrays):
+        layers = int(arrays['n_layers'])
+        self.coefs = [arrays[f'coefs_{i}'] for i in range(layers)]
+        self.intercepts = [arrays[f'intercepts_{i}'] for i in range(layers)]
+        self.activation = str(arrays['activation'])
+        self.classes_ = arrays['classes']
+        self.scaler_mean = arrays['scaler_mean'] if 'scaler_mean' in arrays else None
+        self.scaler_scale = arrays['scaler_scale'] if 'scaler_scale' in arrays else None
+
+    def _hidden(self, z):
+        if self.activation == 'relu':
+            return np.maximum(z, 0)
+        if self.activation == 'tanh':
+            return np.tanh(z)
+        if self.activation == 'logistic':
+            return _sigmoid(z)
+        return z
+
+    def _forward(self, X):
+        a = _as_array(X)
+        if self.scaler_mean is not None:
+            a = (a - self.scaler_mean) / self.scaler_scale
+        for i, (W, b) in enumerate(zip(self.coefs, self.intercepts)):
+            a = a @ W + b
+            if i < len(self.coefs) - 1:
+                a = self._hidden(a)
+        # binary classifiers end in a single logistic unit
+        return _sigmoid(a).ravel()
+
+    def predict_proba(self, X):
+        p = self._forward(X)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes_[(self._forward(X) > 0.5).astype(int)]
+
+
+KINDS = {
+    'logistic': LogisticModel,
+    'linear_svm': LinearModel,
+    'tree': TreeModel,
+    'mlp': MLPModel,
+}
+
+
+def load_compact_model(path):
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    version = int(arrays.pop('format_version'))
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model version {version} in {path}")
+    kind = str(arrays.pop('kind'))
+    if kind not in KINDS:
+        raise ValueError(f"Unknown compact model kind '{kind}' in {path}")
+    return KINDS[kind](arrays)
+
+
+def compact_path(pickle_filename, compact_dir=COMPACT_DIR):
+    """compact_models/<stem>.npz for a model's .pkl file name."""
+    return os.path.join(compact_dir, os.path.splitext(pickle_filename)[0] + '.npz')
@@ -1,104 +1,246 @@
 import pandas as pd
+import numpy as np
 import pickle
 import json
 import os
 import sys
+import argparse
 import requests
 
-def predict_flood_risk():
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    SENSOR_DATA_PATH = os.path.join(BASE_DIR, '..', 'public', 'sensor_data.csv')
-    METRICS_PATH = os.path.join(BASE_DIR, 'model_metrics.json')
-    OUTPUT_PATH = os.path.join(BASE_DIR, '..', 'public', 'latest_flood_risk.json')
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, BASE_DIR)
+from sensor_store import SensorStore, to_epoch
+import model_client
+from instrumentation import enable, span, timed
+from numpy_runtime import compact_path, load_compact_model
+from water_forecast import latest_forecast
 
-    print(f"Reading sensor data from: {SENSOR_DATA_PATH}")
-    
+STORE_PATH = os.path.join(BASE_DIR, '..', 'data', 'sensor_store')
+SENSOR_DATA_PATH = os.path.join(BASE_DIR, '..', 'public', 'sensor_data.csv')
+METRICS_PATH = os.path.join(BASE_DIR, 'model_metrics.json')
+OUTPUT_PATH = os.path.join(BASE_DIR, '..', 'public', 'latest_flood_risk.json')
+HISTORY_PATH = os.path.join(BASE_DIR, '..', 'public', 'flood_risk_history.csv')
+FORECAST_STATE_PATH = os.path.join(BASE_DIR, '..', 'data', 'forecast_state.json')
+
+HISTORY_FIELDS = ['timestamp', 'prediction', 'probability', 'model_used']
+
+MODEL_FILES = {
+    'Logistic Regression': "logistic_model.pkl",
+    'Decision Tree': "decision_tree_model.pkl",
+    'SVM': "svm_model.pkl",
+    'Deep Learning': "deep_model.pkl",
+}
+
+
+def load_latest_reading(sensor_data_path):
+    # the columnar store opens in milliseconds, fall back to the csv if it is not there yet
+    store = SensorStore(STORE_PATH)
+    if len(store) > 0:
+        print(f"Reading sensor data from: {STORE_PATH}")
+        return store.to_frame(store.tail(1))
+    print(f"Reading sensor data from: {sensor_data_path}")
+    return pd.read_csv(sensor_data_path)
+
+
+def build_features(df):
+    # map sensor columns to the names the models were trained with
+    input_features = pd.DataFrame(index=df.index)
+    input_features['rainfall'] = df['rainfall']
+    input_features['humidity'] = df['humidity']
+    input_features['temperature'] = df['temperature']
+
+    if 'waterLevel' in df.columns:
+        input_features['water_level'] = df['waterLevel']
+    elif 'water_level' in df.columns:
+        input_features['water_level'] = df['water_level']
+    else:
+        return None
+    return input_features
+
+
+def _env_float(name):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+# Selection budget, set through the environment (e.g. in the workflow):
+#   MODEL_MAX_LATENCY_MS      single-row p99 latency limit
+#   MODEL_MAX_ARTIFACT_BYTES  model file size limit
+#   MODEL_ACCURACY_TOLERANCE  accuracy gap treated as a tie (default 0.02)
+#   MODEL_LATENCY_TOLERANCE   single-row p50 within this fraction of the fastest is a tie (default 0.5,
+#                             timings of a few microseconds move that much between benchmark runs)
+MAX_LATENCY_MS = _env_float("MODEL_MAX_LATENCY_MS")
+MAX_ARTIFACT_BYTES = _env_float("MODEL_MAX_ARTIFACT_BYTES")
+ACCURACY_TOLERANCE = _env_float("MODEL_ACCURACY_TOLERANCE")
+if ACCURACY_TOLERANCE is None:
+    ACCURACY_TOLERANCE = 0.02
+LATENCY_TOLERANCE = _env_float("MODEL_LATENCY_TOLERANCE")
+if LATENCY_TOLERANCE is None:
+    LATENCY_TOLERANCE = 0.5
+
+
+def choose_model(metrics, max_latency_ms=MAX_LATENCY_MS, max_artifact_bytes=MAX_ARTIFACT_BYTES,
+                 tolerance=ACCURACY_TOLERANCE, latency_tolerance=LATENCY_TOLERANCE):
+    """Pick a metrics entry: the most accurate within budget, near-ties go to the cheaper model.
+
+    Among near-ties a model that publishes a probability (has_proba) comes
+    first, then the fastest, counting latencies within latency_tolerance of
+    the fastest as equal, then the smallest artifact.
+
+    A missing benchmark number is unknown, not free: the entry does not fit a
+    budget set on that number and ranks after the measured ones among near-ties.
+    """
+    def cost(m, key):
+        value = m.get(key)
+        return float('inf') if value is None else value
+
+    def within_budget(m):
+        if max_latency_ms is not None and cost(m, 'single_p99_ms') > max_latency_ms:
+            return False
+        if max_artifact_bytes is not None and cost(m, 'artifact_bytes') > max_artifact_bytes:
+            return False
+        return True
+
+    candidates = [m for m in metrics if within_budget(m)]
+    if not candidates:
+        print("No model fits the latency/size budget, ignoring it.")
+        candidates = metrics
+
+    best_accuracy = max(m['accuracy'] for m in candidates)
+    near_ties = [m for m in candidates if m['accuracy'] >= best_accuracy - tolerance]
+    # the result carries a probability when any near-tie can give one
+    near_ties = [m for m in near_ties if m.get('has_proba')] or near_ties
+    fastest = min(cost(m, 'single_p50_ms') for m in near_ties)
+    near_ties = [m for m in near_ties if cost(m, 'single_p50_ms') <= fastest * (1 + latency_tolerance)]
+    # cheaper first: artifact size, then accuracy, then the measured latency
+    return min(near_ties, key=lambda m: (cost(m, 'artifact_bytes'), -m['accuracy'], cost(m, 'single_p50_ms')))
+
+
+def select_best_model(metrics_path=METRICS_PATH):
+    print(f"Loading metrics from: {metrics_path}")
+    with open(metrics_path, 'r') as f:
+        metrics = json.load(f)
+
+    best_model_info = choose_model(metrics)
+    return best_model_info['name'], best_model_info['accuracy']
+
+
+@timed("model_load")
+def load_model(model_name):
+    """Return (model, scaler) for a metrics entry name; scaler is None unless the model needs one."""
+    model_filename = next((f for key, f in MODEL_FILES.items() if key in model_name), None)
+    if model_filename is None:
+        raise ValueError(f"Unknown model name: {model_name}")
+
+    # the exported .npz evaluates with NumPy alone, no scikit-learn import or unpickling
+    compact_model_path = compact_path(model_filename)
+    if os.path.exists(compact_model_path):
+        print(f"Loading model from: {compact_model_path}")
+        return load_compact_model(compact_model_path), None
+
+    model_path = os.path.join(BASE_DIR, model_filename)
+    print(f"Loading model from: {model_path}")
+
+    with open(model_path, 'rb') as f:
+        model_obj = pickle.load(f)
+
+    if isinstance(model_obj, dict):
+        # trained on scaled features: the MLP, and the linear models once train_incremental.py updated them
+        return model_obj['model'], model_obj['scaler']
+    return model_obj, None
+
+
+@timed("inference")
+def score(model, scaler, input_features):
+    """Predict every row in one call; probabilities are None when the model has no predict_proba."""
+    X_input = scaler.transform(input_features) if scaler is not None else input_features
+
+    predictions = model.predict(X_input)
+
+    probabilities = None
+    if hasattr(model, "predict_proba"):
+        try:
+            probabilities = model.predict_proba(X_input)[:, 1]
+        except Exception:
+            pass
+    return predictions, probabilities
+
+
+def load_model_info():
+    """(name, accuracy, model, scaler) of the selected model, for callers that score many readings."""
+    model_name, model_accuracy = select_best_model()
+    model, scaler = load_model(model_name)
+    return model_name, model_accuracy, model, scaler
+
+
+def predict_with(model_name, input_features):
+    """Score through the warm model server when it is running, else load the model here."""
+    with span("model_server"):
+        served = model_client.predict(model_name, input_features)
+    if served is not None:
+        print(f"Scored by model server: {model_client.MODEL_SERVER_URL}")
+        predictions, probabilities = served
+        return np.asarray(predictions), (np.asarray(probabilities) if probabilities is not None else None)
+    model, scaler = load_model(model_name)
+    return score(model, scaler, input_features)
+
+
+def build_result(latest_row, input_features, prediction, probability, model_name, model_accuracy,
+                 forecast=None):
+    """The latest_flood_risk.json payload for one scored row; forecast comes from water_forecast.py."""
+    return {
+        "timestamp": latest_row['timestamp'].values[0] if 'timestamp' in latest_row.columns else "Unknown",
+        "prediction": int(prediction), # 0 or 1
+        "probability": float(probability) if probability is not None else None,
+        "model_used": model_name,
+        "model_accuracy": float(model_accuracy),
+        "input_data": {
+            "rainfall": float(input_features['rainfall'].values[0]),
+            "humidity": float(input_features['humidity'].values[0]),
+            "temperature": float(input_features['temperature'].values[0]),
+            "water_level": float(input_features['water_level'].values[0])
+        },
+        "forecast": forecast
+    }
+
+
+def predict_flood_risk(df=None):
     try:
-        df = pd.read_csv(SENSOR_DATA_PATH)
+        if df is None:
+            with span("load_input"):
+                df = load_latest_reading(SENSOR_DATA_PATH)
         if df.empty:
             print("Sensor data is empty.")
             return
 
-        latest_row = df.iloc[[-1]].copy() 
+        latest_row = df.iloc[[-1]].copy()
         print("Latest reading:")
         print(latest_row)
-        input_features = pd.DataFrame()
-        input_features['rainfall'] = latest_row['rainfall']
-        input_features['humidity'] = latest_row['humidity']
-        input_features['temperature'] = latest_row['temperature']
-        
-        if 'waterLevel' in latest_row.columns:
-            input_features['water_level'] = latest_row['waterLevel']
-        elif 'water_level' in latest_row.columns:
-            input_features['water_level'] = latest_row['water_level']
-        else:
-             print("Error: 'waterLevel' column missing.")
-             return
-
-        print(f"Loading metrics from: {METRICS_PATH}")
-        with open(METRICS_PATH, 'r') as f:
-            metrics = json.load(f)
-        
-        best_model_info = sorted(metrics, key=lambda x: x['accuracy'], reverse=True)[0]
-        best_model_name = best_model_info['name']
-        best_model_acc = best_model_info['accuracy']
-        
+        input_features = build_features(latest_row)
+        if input_features is None:
+            print("Error: 'waterLevel' column missing.")
+            return
+
+        best_model_name, best_model_acc = select_best_model()
         print(f"Best model selected: {best_model_name} (Accuracy: {best_model_acc:.2f})")
-        
-        model_filename = ""
-        if 'Logistic Regression' in best_model_name:
-            model_filename = "logistic_model.pkl"
-        elif 'Decision Tree' in best_model_name:
-            model_filename = "decision_tree_model.pkl"
-        elif 'SVM' in best_model_name:
-            model_filename = "svm_model.pkl"
-        elif 'Deep Learning' in best_model_name:
-            model_filename = "deep_model.pkl"
-        else:
-            print(f"Unknown model name: {best_model_name}")
+
+        try:
+            predictions, probabilities = predict_with(best_model_name, input_features)
+        except ValueError as e:
+            print(e)
             return
-            
-        model_path = os.path.join(BASE_DIR, model_filename)
-        print(f"Loading model from: {model_path}")
-        
-        with open(model_path, 'rb') as f:
-            model_obj = pickle.load(f)
-            
-        if 'Deep Learning' in best_model_name:
-            model = model_obj['model']
-            scaler = model_obj['scaler']
-            X_input = scaler.transform(input_features)
-        else:
-            model = model_obj
-            X_input = input_features
-
-        prediction = model.predict(X_input)[0]
-        
-        probability = None
-        if hasattr(model, "predict_proba"):
-             try:
-                probability = model.predict_proba(X_input)[0][1] 
-             except:
-                pass
-        
-        result = {
-            "timestamp": latest_row['timestamp'].values[0] if 'timestamp' in latest_row.columns else "Unknown",
-            "prediction": int(prediction), # 0 or 1
-            "probability": float(probability) if probability is not None else None,
-            "model_used": best_model_name,
-            "model_accuracy": float(best_model_acc),
-            "input_data": {
-                "rainfall": float(input_features['rainfall'].values[0]),
-                "humidity": float(input_features['humidity'].values[0]),
-                "temperature": float(input_features['temperature'].values[0]),
-                "water_level": float(input_features['water_level'].values[0])
-            }
-        }
-        
+
+        prediction = predictions[0]
+        probability = probabilities[0] if probabilities is not None else None
+
+        result = build_result(latest_row, input_features, prediction, probability,
+                              best_model_name, best_model_acc, latest_forecast(FORECAST_STATE_PATH))
+
         print("Prediction result:")
         print(json.dumps(result, indent=2))
-        
-        with open(OUTPUT_PATH, 'w') as f:
+
+        with span("write_output"), open(OUTPUT_PATH, 'w') as f:
             json.dump(result, f, indent=4)
         print(f"Saved result to: {OUTPUT_PATH}")
 
@@ -109,5 +251,119 @@ def predict_flood_risk():
         import traceback
         traceback.print_exc()
 
+
+def predict_reading(reading, model_info, output_path=OUTPUT_PATH, forecast_state=FORECAST_STATE_PATH):
+    """Score one reading dict with a model from load_model_info() and write latest_flood_risk.json."""
+    model_name, model_accuracy, model, scaler = model_info
+    row = pd.DataFrame([reading])
+    input_features = build_features(row)
+    if input_features is None:
+        print("Error: 'waterLevel' column missing.")
+        return None
+    predictions, probabilities = score(model, scaler, input_features)
+    probability = probabilities[0] if probabilities is not None else None
+    result = build_result(row, input_features, predictions[0], probability, model_name, model_accuracy,
+                          latest_forecast(forecast_state))
+    with span("write_output"):
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, indent=4)
+        os.replace(tmp_path, output_path)
+    return result
+
+
+# -------------------------------
+# Batch / Backfill Mode
+# -------------------------------
+def last_scored_timestamp(history_path=HISTORY_PATH):
+    # only the last line matters, so read the file from the end
+    if not os.path.exists(history_path) or os.path.getsize(history_path) == 0:
+        return None
+    with open(history_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") < 2:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    last_line = data.decode('utf-8').strip().splitlines()[-1]
+    timestamp = last_line.split(',')[0]
+    return None if timestamp == 'timestamp' else timestamp
+
+
+def load_history_range(start=None, end=None):
+    """Readings between start and end (inclusive) as a DataFrame, from the store or the csv."""
+    store = SensorStore(STORE_PATH)
+    if len(store) > 0:
+        return store.to_frame(store.range(start, end))
+
+    df = pd.read_csv(SENSOR_DATA_PATH)
+    epochs = df['timestamp'].map(to_epoch)
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= epochs >= to_epoch(start)
+    if end is not None:
+        mask &= epochs <= to_epoch(end)
+    return df[mask]
+
+
+def predict_flood_risk_batch(start=None, end=None, rebuild=False, history_path=HISTORY_PATH):
+    """Score every reading in [start, end] in one predict call and append it to the history csv.
+
+    Unless rebuild is set, rows at or before the last scored timestamp are
+    skipped, so each run only scores readings that arrived since the last one.
+    """
+    last_scored = None if rebuild else last_scored_timestamp(history_path)
+    if last_scored is not None:
+        # timestamps have one-second resolution, start right after the last scored one
+        after = to_epoch(last_scored) + 1
+        start = after if start is None else max(to_epoch(start), after)
+    with span("load_input"):
+        df = load_history_range(start, end)
+
+    if df.empty:
+        print("No new readings to score.")
+        return 0
+
+    input_features = build_features(df)
+    if input_features is None:
+        print("Error: 'waterLevel' column missing.")
+        return 0
+
+    best_model_name, best_model_acc = select_best_model()
+    print(f"Best model selected: {best_model_name} (Accuracy: {best_model_acc:.2f})")
+    predictions, probabilities = predict_with(best_model_name, input_features)
+    history = pd.DataFrame({
+        'timestamp': df['timestamp'].values,
+        'prediction': predictions.astype(int),
+        'probability': probabilities if probabilities is not None else np.nan,
+        'model_used': best_model_name,
+    }, columns=HISTORY_FIELDS)
+
+    append = not rebuild and os.path.exists(history_path) and os.path.getsize(history_path) > 0
+    with span("write_output"):
+        history.to_csv(history_path, mode='a' if append else 'w', header=not append, index=False)
+    print(f"Scored {len(history)} readings ({history['timestamp'].iloc[0]} to {history['timestamp'].iloc[-1]}). "
+          f"Saved to: {history_path}")
+    return len(history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict flood risk from the latest sensor reading or the whole history.")
+    parser.add_argument("--batch", action="store_true", help="score the sensor history into flood_risk_history.csv")
+    parser.add_argument("--start", help="first timestamp to score, e.g. '2026-01-01 00:00:00'")
+    parser.add_argument("--end", help="last timestamp to score")
+    parser.add_argument("--rebuild", action="store_true", help="rewrite the history instead of scoring only new rows")
+    args = parser.parse_args()
+
+    enable("predict_flood_risk_batch" if args.batch else "predict_flood_risk")
+    if args.batch:
+        predict_flood_risk_batch(args.start, args.end, args.rebuild)
+    else:
+        predict_flood_risk()
+
+
 if __name__ == "__main__":
-    predict_flood_risk()
+    main()
@@ -0,0 +1,228 @@
+"""
+Train every model family and a hyperparameter grid in parallel.
+
+The dataset is read and split once; the arrays are written to a temporary
+directory as .npy files that every worker process maps read-only, so nothing
+is re-parsed or copied per task. Each (family, params) task runs in a process
+pool and is scored on a validation split carved out of the training data
+(VALIDATION_SIZE of it). The best configuration of each family is then refit
+on the whole training split, saved under the file name predict_flood_risk.py
+expects, and scored once on the test split; model_metrics.json gets that test
+accuracy, so it is not biased by the grid search. The MLP's scaler follows the
+same rule: the search sees one fit on the fit rows only, the winner is saved
+with one fit on the whole training split. After the compact export every
+winner is benchmarked like evaluate_models.py does, so the latency and size
+numbers choose_model() budgets on describe the new models.
+
+Usage (from SensorDataMLAnalysis/):
+    python train_all_models.py [--grid grid.json] [--workers N]
+
+grid.json maps a family name to a list of parameter dicts, e.g.
+    {"Decision Tree": [{"max_depth": 5}, {"max_depth": 10}]}
+and replaces the default grid for the families it lists.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+
+from dataset import DATASET_PATH, FEATURES, load_split
+from evaluate_models import benchmark_inference, load_compact_timed
+from export_models import export_models
+from numpy_runtime import compact_path
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_PATH = os.path.join(BASE_DIR, 'model_metrics.json')
+VALIDATION_SIZE = 0.25     # of the training split, used to pick each family's configuration
+
+# family -> (estimator, artifact file, trains on scaled features)
+FAMILIES = {
+    'Logistic Regression': (LogisticRegression, 'logistic_model.pkl', False),
+    'Decision Tree': (DecisionTreeClassifier, 'decision_tree_model.pkl', False),
+    'SVM': (SVC, 'svm_model.pkl', False),
+    'Deep Learning (MLP)': (MLPClassifier, 'deep_model.pkl', True),
+}
+
+# the first entry of each family is the configuration the old scripts trained
+DEFAULT_GRID = {
+    'Logistic Regression': [{}, {'C': 0.1}, {'C': 10.0}],
+    'Decision Tree': [{}, {'max_depth': 5}, {'max_depth': 10}, {'min_samples_leaf': 20}],
+    'SVM': [{'kernel': 'linear'}, {'kernel': 'linear', 'C': 0.1}],
+    'Deep Learning (MLP)': [
+        {'hidden_layer_sizes': (10, 5), 'max_iter': 2000, 'random_state': 42},
+        {'hidden_layer_sizes': (20, 10), 'max_iter': 2000, 'random_state': 42},
+        {'hidden_layer_sizes': (10, 5), 'alpha': 1e-2, 'max_iter': 2000, 'random_state': 42},
+    ],
+}
+
+
+def load_data(dataset_path=DATASET_PATH):
+    print("Loading data...")
+    # split same as the single-family training scripts
+    return load_split(dataset_path, FEATURES)
+
+
+# -------------------------------
+# Worker side
+# -------------------------------
+_shared = {}
+
+
+SPLITS = ['fit', 'val', 'train', 'test']
+
+
+def _init_worker(array_dir):
+    # map the arrays once per worker process, read-only
+    for split in SPLITS:
+        for name in [f'X_{split}', f'X_{split}_scaled', f'y_{split}']:
+            _shared[name] = np.load(os.path.join(array_dir, f"{name}.npy"), mmap_mode='r')
+
+
+def _train_one(family, params, fit_on='fit', score_on='val'):
+    """Fit on one split and score on another: 'fit'/'val' while searching, 'train'/'test' for the winner."""
+    estimator, _, scaled = FAMILIES[family]
+    suffix = '_scaled' if scaled else ''
+    X_fit = np.asarray(_shared[f'X_{fit_on}{suffix}'])
+    X_score = np.asarray(_shared[f'X_{score_on}{suffix}'])
+    if not scaled:
+        # these models are fed DataFrames at prediction time, keep the feature names
+        X_fit = pd.DataFrame(X_fit, columns=FEATURES)
+        X_score = pd.DataFrame(X_score, columns=FEATURES)
+
+    started = time.perf_counter()
+    model = estimator(**params)
+    model.fit(X_fit, np.asarray(_shared[f'y_{fit_on}']))
+    accuracy = float((model.predict(X_score) == _shared[f'y_{score_on}']).mean())
+    return {
+        'family': family,
+        'params': params,
+        'accuracy': accuracy,
+        'fit_seconds': time.perf_counter() - started,
+        'model': pickle.dumps(model),
+    }
+
+
+# -------------------------------
+# Driver
+# -------------------------------
+def train_all_models(grid=None, workers=None, output_dir=BASE_DIR, metrics_path=METRICS_PATH):
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    X_train, X_test, y_train, y_test = load_data()
+
+    # the test split is only used for the final score of each winner
+    fit_rows, val_rows = train_test_split(np.arange(len(X_train)), test_size=VALIDATION_SIZE, random_state=42)
+    frames = {
+        'fit': (X_train.iloc[fit_rows], y_train.iloc[fit_rows]),
+        'val': (X_train.iloc[val_rows], y_train.iloc[val_rows]),
+        'train': (X_train, y_train),
+        'test': (X_test, y_test),
+    }
+    # the validation rows must not leak into the scaling the search is scored with
+    scalers = {'fit': StandardScaler().fit(frames['fit'][0]), 'train': StandardScaler().fit(X_train)}
+    scalers['val'], scalers['test'] = scalers['fit'], scalers['train']
+    scaler = scalers['train']
+    arrays = {}
+    for split, (X, y) in frames.items():
+        arrays[f'X_{split}'] = X.to_numpy(dtype=np.float64)
+        arrays[f'X_{split}_scaled'] = scalers[split].transform(X)
+        arrays[f'y_{split}'] = y.to_numpy()
+
+    tasks = [(family, params) for family, configs in grid.items() for params in configs]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    print(f"Training {len(tasks)} configurations on {workers} worker processes...")
+
+    array_dir = tempfile.mkdtemp(prefix="flood-train-")
+    results = []
+    started = time.perf_counter()
+    try:
+        for name, values in arrays.items():
+            np.save(os.path.join(array_dir, f"{name}.npy"), values)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(array_dir,)) as pool:
+            futures = [pool.submit(_train_one, family, params) for family, params in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"  {result['family']} {result['params']}: validation accuracy {result['accuracy']:.4f} "
+                      f"({result['fit_seconds']:.1f}s)")
+
+            # keep the best configuration of each family, earlier grid entries win ties
+            order = {(family, json.dumps(params, sort_keys=True)): i for i, (family, params) in enumerate(tasks)}
+            winners = {}
+            for family in grid:
+                candidates = [r for r in results if r['family'] == family]
+                if candidates:
+                    winners[family] = min(candidates, key=lambda r: (
+                        -r['accuracy'], order[(family, json.dumps(r['params'], sort_keys=True))]))
+
+            print(f"Refitting {len(winners)} winners on the whole training split...")
+            finals = {family: pool.submit(_train_one, family, best['params'], 'train', 'test')
+                      for family, best in winners.items()}
+            finals = {family: future.result() for family, future in finals.items()}
+    finally:
+        shutil.rmtree(array_dir, ignore_errors=True)
+    print(f"All configurations trained in {time.perf_counter() - started:.1f}s")
+
+    metrics_export = []
+    for family, final in finals.items():
+        model = pickle.loads(final['model'])
+        _, filename, scaled = FAMILIES[family]
+        with open(os.path.join(output_dir, filename), 'wb') as f:
+            pickle.dump({'model': model, 'scaler': scaler} if scaled else model, f)
+        print(f"Saved {family} {final['params']} to '{filename}' (test accuracy {final['accuracy']:.4f})")
+        metrics_export.append({
+            'name': family,
+            'accuracy': final['accuracy'],
+            'validation_accuracy': winners[family]['accuracy'],
+            'params': final['params'],
+        })
+
+    # refresh the NumPy-only copies used by predict_flood_risk.py, then time them: the grid can
+    # change a model's shape, so the previous latency/size numbers no longer apply
+    compact_dir = os.path.join(output_dir, 'compact_models')
+    export_models(output_dir, compact_dir)
+    for entry in metrics_export:
+        _, filename, _ = FAMILIES[entry['name']]
+        model, load_stats = load_compact_timed(compact_path(filename, compact_dir))
+        entry.update({**load_stats, **benchmark_inference(model, X_test)})
+
+    with open(metrics_path, 'w') as f:
+        json.dump(metrics_export, f, indent=4)
+    print(f"Saved '{os.path.basename(metrics_path)}'")
+    return metrics_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train every model family and grid configuration in parallel.")
+    parser.add_argument("--grid", help="JSON file mapping family names to lists of parameter dicts")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    grid = None
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+        # JSON has no tuples, MLPClassifier wants one for hidden_layer_sizes
+        for configs in grid.values():
+            for params in configs:
+                if 'hidden_layer_sizes' in params:
+                    params['hidden_layer_sizes'] = tuple(params['hidden_layer_sizes'])
+    train_all_models(grid, args.workers)
+
+
+if __name__ == "__main__":
+    main()
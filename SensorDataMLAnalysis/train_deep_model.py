@@ -1,29 +1,13 @@
-import pandas as pd
 import pickle
 from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
+from dataset import DATASET_FILE, load_split
+from export_models import export_models
+
 def train_deep_model():
     print("Loading data...")
-    df = pd.read_csv('flood_risk_dataset_india_modified.csv')
-    
-    column_mapping = {
-        'Rainfall (mm)': 'rainfall',
-        'Humidity (%)': 'humidity',
-        'Water Level (m)': 'water_level',
-        'Flood Occurred': 'flood'
-    }
-    for col in df.columns:
-        if 'Temperature' in col:
-            column_mapping[col] = 'temperature'
-            break
-    df.rename(columns=column_mapping, inplace=True)
-    
-    X = df[['rainfall', 'humidity', 'temperature', 'water_level']]
-    y = df['flood']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = load_split(DATASET_FILE)
     
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
@@ -38,5 +22,8 @@ def train_deep_model():
         
     print("Deep Learning model trained and saved as 'deep_model.pkl'!")
 
+    # predict_flood_risk.py prefers compact_models/*.npz, refresh them or the old model keeps serving
+    export_models('.', 'compact_models')
+
 if __name__ == "__main__":
     train_deep_model()
@@ -0,0 +1,341 @@
+"""
+Update the models with newly labeled readings instead of retraining them.
+
+Each csv passed in is a batch of new rows with the four sensor features and
+the flood label (the dataset's headers or the sensor csv's, e.g. waterLevel,
+plus a 'flood' / 'Flood Occurred' column). The values must be in the
+dataset's units (water level in metres, not the sensors' centimetres): a
+batch whose median of a feature lies outside the training range is
+rejected, and single rows more than RANGE_MARGIN of the range outside it
+are dropped as glitches. Only those rows are used:
+
+    scaler      StandardScaler.partial_fit, running mean and variance
+    Logistic    SGDClassifier(loss='log_loss').partial_fit
+    SVM         SGDClassifier(loss='hinge').partial_fit, a linear SVM
+    MLP         MLPClassifier.partial_fit, one more pass of its optimizer
+
+so an update costs the size of the batch, not of the whole history. The
+decision tree cannot be updated this way and is left as it is.
+
+The models work on scaled features, so when partial_fit moves the scaler's
+mean and scale their input weights are rewritten for the new statistics
+first (w' = w * new_scale / old_scale, b' = b + w.(new_mean - old_mean) /
+old_scale, the first layer of the MLP alike): the models give the same
+output for the same raw reading before they learn from the batch.
+
+The first update starts the two SGD models from the current
+LogisticRegression and linear SVC coefficients (rewritten for the scaled
+features), so nothing is relearned from scratch. After that
+logistic_model.pkl and svm_model.pkl hold {'model', 'scaler'} like
+deep_model.pkl, all three sharing the same scaler statistics.
+
+Every update is a new version: the models, model_metrics.json and a manifest
+are written to model_versions/v<N>.tmp-<pid>/ and renamed to
+model_versions/v<N>/ when complete, then copied over the live files one
+atomic os.replace at a time (the manifest last, as model_manifest.json) and
+exported for the NumPy runtime. The last KEEP_VERSIONS versions are kept
+locally; model_versions/ is not committed, the live model_manifest.json is.
+It carries the version counter, the sha256 of every batch applied so far and
+of the live model files, so a fresh checkout skips batches already folded
+into the committed models and continues the numbering. When the live models
+no longer match it (retrained by another script) the batches count as not
+applied again. Accuracy is measured on the dataset's held-out test split
+(same split as training), plus on each batch before the models have seen it.
+
+Usage (from SensorDataMLAnalysis/):
+    python train_incremental.py new_labels.csv [more.csv ...] [--epochs N]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pickle
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from dataset import DATASET_FILE, FEATURES, TARGET, column_name, file_hash, load_dataset, load_split
+from export_models import export_models
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSIONS_DIR = 'model_versions'
+MANIFEST_FILE = 'model_manifest.json'
+KEEP_VERSIONS = 10
+CLASSES = np.array([0, 1])
+
+# family (as in model_metrics.json) -> (artifact file, SGD loss or None for the MLP)
+INCREMENTAL = {
+    'Logistic Regression': ('logistic_model.pkl', 'log_loss'),
+    'SVM': ('svm_model.pkl', 'hinge'),
+    'Deep Learning (MLP)': ('deep_model.pkl', None),
+}
+# a fixed small step, a batch nudges the coefficients instead of rewriting them
+SGD_PARAMS = {'learning_rate': 'constant', 'eta0': 0.001, 'alpha': 1e-4, 'random_state': 42}
+RANGE_MARGIN = 0.1     # of a feature's training range, rows further outside it are dropped
+
+
+def training_ranges(model_dir=BASE_DIR):
+    """feature -> (min, max) over the training dataset."""
+    columns = load_dataset(os.path.join(model_dir, DATASET_FILE)).columns
+    return {f: (float(columns[f].min()), float(columns[f].max())) for f in FEATURES}
+
+
+def read_batch(path, ranges=None):
+    """Features and labels of a csv of newly labeled rows, rows with missing values dropped.
+
+    With ranges (see training_ranges) a batch in other units raises ValueError
+    and rows far outside the training range are dropped.
+    """
+    frame = pd.read_csv(path)
+    frame.columns = [column_name(c) for c in frame.columns]
+    missing = [c for c in FEATURES + [TARGET] if c not in frame.columns]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column")
+    frame = frame[FEATURES + [TARGET]].dropna()
+    if ranges is not None and len(frame):
+        keep = np.ones(len(frame), dtype=bool)
+        for feature, (low, high) in ranges.items():
+            values = frame[feature].astype(np.float64)
+            median = float(values.median())
+            if not low <= median <= high:
+                raise ValueError(f"{path}: median {feature} {median:g} is outside the training range "
+                                 f"[{low:g}, {high:g}], check the units (water_level is in metres)")
+            margin = RANGE_MARGIN * (high - low)
+            keep &= values.between(low - margin, high + margin).to_numpy()
+        if not keep.all():
+            print(f"  {path}: dropping {int((~keep).sum())} rows outside the training range")
+            frame = frame[keep]
+    return frame[FEATURES].astype(np.float64), frame[TARGET].astype(int).to_numpy()
+
+
+# -------------------------------
+# Models
+# -------------------------------
+def _sgd_from(model, scaler, loss):
+    """An SGDClassifier carrying on from a LogisticRegression / linear SVC fitted on raw features."""
+    sgd = SGDClassifier(loss=loss, **SGD_PARAMS)
+    # w.x + b == (w * scale).((x - mean) / scale) + b + w.mean
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    sgd.coef_ = coef * scaler.scale_
+    sgd.intercept_ = np.asarray(model.intercept_, dtype=np.float64) + coef @ scaler.mean_
+    # fitted already as far as partial_fit and predict are concerned
+    sgd.classes_ = np.asarray(model.classes_)
+    sgd.n_features_in_ = coef.shape[1]
+    return sgd
+
+
+def load_models(model_dir=BASE_DIR):
+    """family -> (model, scaler) with one shared scaler, ready for partial_fit."""
+    models = {}
+    for family, (filename, _) in INCREMENTAL.items():
+        with open(os.path.join(model_dir, filename), 'rb') as f:
+            models[family] = pickle.load(f)
+
+    deep = models['Deep Learning (MLP)']
+    scaler = deep['scaler'] if isinstance(deep, dict) else None
+    if scaler is None:
+        # no scaler stored anywhere, start the statistics from the training split once
+        X_train, _, _, _ = load_split(os.path.join(model_dir, DATASET_FILE))
+        scaler = StandardScaler().fit(X_train.astype(np.float64))
+
+    loaded = {}
+    for family, model_obj in models.items():
+        model = model_obj['model'] if isinstance(model_obj, dict) else model_obj
+        loss = INCREMENTAL[family][1]
+        if loss is not None and not isinstance(model, SGDClassifier):
+            print(f"Starting {family} as SGDClassifier(loss='{loss}') from the current coefficients")
+            model = _sgd_from(model, scaler, loss)
+        loaded[family] = model
+    return loaded, scaler
+
+
+def rescale_inputs(model, old_mean, old_scale, new_mean, new_scale):
+    """Rewrite a model's input weights so it scores raw features the same after the scaler moved."""
+    # z_old = (new_scale * z_new + new_mean - old_mean) / old_scale
+    ratio = new_scale / old_scale
+    shift = (new_mean - old_mean) / old_scale
+    if isinstance(model, SGDClassifier):
+        model.intercept_ = model.intercept_ + model.coef_ @ shift
+        model.coef_ = model.coef_ * ratio
+    else:
+        # MLP, only the first layer sees the features
+        model.intercepts_[0] = model.intercepts_[0] + shift @ model.coefs_[0]
+        model.coefs_[0] = model.coefs_[0] * ratio[:, np.newaxis]
+
+
+def update(models, scaler, X, y, epochs=1):
+    """Fold one labeled batch into the scaler and every model."""
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    scaler.partial_fit(X)
+    for model in models.values():
+        rescale_inputs(model, old_mean, old_scale, scaler.mean_, scaler.scale_)
+    X_scaled = scaler.transform(X)
+    for model in models.values():
+        for _ in range(epochs):
+            model.partial_fit(X_scaled, y, classes=CLASSES)
+
+
+def _accuracy(model, scaler, X, y):
+    return float((model.predict(scaler.transform(X)) == y).mean()) if len(y) else None
+
+
+# -------------------------------
+# Versions
+# -------------------------------
+def _versions(versions_dir):
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(int(m.group(1)) for m in map(re.compile(r"v(\d+)$").match, os.listdir(versions_dir)) if m)
+
+
+def latest_manifest(model_dir=BASE_DIR):
+    """The manifest of the live models, or None before the first update."""
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _artifact_hashes(model_dir, filenames):
+    return {filename: file_hash(os.path.join(model_dir, filename)) for filename in filenames}
+
+
+def _replace(source, target):
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def write_version(models, scaler, metrics, manifest, model_dir=BASE_DIR):
+    """Write a complete new version next to the others, then make it the live one."""
+    versions_dir = os.path.join(model_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    version_dir = os.path.join(versions_dir, f"v{manifest['version']:04d}")
+    tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir)
+    try:
+        for family, model in models.items():
+            with open(os.path.join(tmp_dir, INCREMENTAL[family][0]), 'wb') as f:
+                pickle.dump({'model': model, 'scaler': scaler}, f)
+        with open(os.path.join(tmp_dir, 'model_metrics.json'), 'w') as f:
+            json.dump(metrics, f, indent=4)
+        manifest['artifacts'] = _artifact_hashes(tmp_dir, [INCREMENTAL[family][0] for family in models])
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=4)
+        # fails if another run already wrote this version
+        os.rename(tmp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    for family in models:
+        filename = INCREMENTAL[family][0]
+        _replace(os.path.join(version_dir, filename), os.path.join(model_dir, filename))
+    _replace(os.path.join(version_dir, 'model_metrics.json'), os.path.join(model_dir, 'model_metrics.json'))
+    # last: it names the batches the live files now contain
+    _replace(os.path.join(version_dir, MANIFEST_FILE), os.path.join(model_dir, MANIFEST_FILE))
+    print(f"Saved version {manifest['version']} to '{os.path.relpath(version_dir, model_dir)}'")
+
+    for old in _versions(versions_dir)[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(versions_dir, f"v{old:04d}"), ignore_errors=True)
+    return version_dir
+
+
+# -------------------------------
+# Driver
+# -------------------------------
+def train_incremental(batch_paths, epochs=1, model_dir=BASE_DIR):
+    previous = latest_manifest(model_dir)
+    applied = {b['sha256'] for b in previous['batches']} if previous else set()
+    history = previous['batches'] if previous else []
+    if previous and _artifact_hashes(model_dir, previous['artifacts']) != previous['artifacts']:
+        print(f"The models changed since version {previous['version']} (retrained?), no batch counts as applied.")
+        applied, history = set(), []
+
+    ranges = training_ranges(model_dir)
+    batches = []
+    for path in batch_paths:
+        digest = file_hash(path)
+        if digest in applied:
+            print(f"Skipping {path}, already applied")
+            continue
+        X, y = read_batch(path, ranges)
+        batches.append({'path': path, 'sha256': digest, 'X': X, 'y': y})
+        applied.add(digest)
+    if not batches:
+        print("No new labeled rows, nothing to do.")
+        return None
+
+    print("Loading models...")
+    models, scaler = load_models(model_dir)
+    batch_correct = {family: 0 for family in models}
+    for batch in batches:
+        X, y = batch['X'], batch['y']
+        # score the batch before learning from it
+        for family, model in models.items():
+            batch_correct[family] += int((model.predict(scaler.transform(X)) == y).sum())
+        update(models, scaler, X, y, epochs)
+        print(f"  {batch['path']}: {len(y)} rows")
+    rows = sum(len(b['y']) for b in batches)
+
+    _, X_test, _, y_test = load_split(os.path.join(model_dir, DATASET_FILE))
+    X_test, y_test = X_test.astype(np.float64), y_test.to_numpy()
+
+    version = (previous['version'] if previous else 0) + 1
+    metrics_path = os.path.join(model_dir, 'model_metrics.json')
+    metrics = []
+    if os.path.exists(metrics_path):
+        with open(metrics_path, 'r') as f:
+            metrics = json.load(f)
+    by_name = {m['name']: m for m in metrics}
+    for family, model in models.items():
+        entry = by_name.get(family)
+        if entry is None:
+            entry = by_name[family] = {'name': family}
+            metrics.append(entry)
+        # the grid params described the estimator this one replaced
+        entry.pop('params', None)
+        entry.update({
+            'accuracy': _accuracy(model, scaler, X_test, y_test),
+            'batch_accuracy': batch_correct[family] / rows,
+            'version': version,
+            'samples_seen': int(scaler.n_samples_seen_),
+        })
+        # latency and artifact_bytes stay as evaluate_models.py measured them on the compact export,
+        # which keeps its shape when only the coefficients move
+        print(f"  {family}: accuracy {entry['accuracy']:.4f}, on the new rows {entry['batch_accuracy']:.4f}")
+
+    manifest = {
+        'version': version,
+        'parent': previous['version'] if previous else None,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'rows': rows,
+        'epochs': epochs,
+        'samples_seen': int(scaler.n_samples_seen_),
+        # every batch folded in so far, the newest last
+        'batches': history
+                   + [{'path': os.path.basename(b['path']), 'sha256': b['sha256'], 'rows': len(b['y'])}
+                      for b in batches],
+    }
+    write_version(models, scaler, metrics, manifest, model_dir)
+    # refresh the NumPy-only copies used by predict_flood_risk.py
+    export_models(model_dir, os.path.join(model_dir, 'compact_models'))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the models with newly labeled readings.")
+    parser.add_argument("batches", nargs="+", help="csv files of new labeled rows")
+    parser.add_argument("--epochs", type=int, default=1, help="passes over each batch (default 1)")
+    args = parser.parse_args()
+    train_incremental(args.batches, args.epochs)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,17 @@
-import pandas as pd
 import pickle
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.svm import SVC
-from sklearn.model_selection import train_test_split
+
+from dataset import DATASET_FILE, load_split
+from export_models import export_models
 
 def train_models():
     
     print("Loading data...")
     
-    # read the csv file
-    df = pd.read_csv('flood_risk_dataset_india_modified.csv')
-    
-    # rename columns so they are easier to use
-        'Rainfall (mm)': 'rainfall',
-        'Humidity (%)': 'humidity',
-        'Water Level (m)': 'water_level',
-        'Flood Occurred': 'flood'
-    }
-    
-    for col in df.columns:
-        if 'Temperature' in col:
-            column_mapping[col] = 'temperature'
-            break
-            
-    df.rename(columns=column_mapping, inplace=True)
-
-    X = df[['rainfall', 'humidity', 'temperature', 'water_level']]
-    y = df['flood']
-    
-    # split data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # parsed once, later runs read the binary cache (see dataset.py)
+    X_train, X_test, y_train, y_test = load_split(DATASET_FILE)
     
     print("Training models...")
     
@@ -57,5 +38,8 @@ def train_models():
         
     print("All models trained and saved as .pkl files!")
 
+    # predict_flood_risk.py prefers compact_models/*.npz, refresh them or the old models keep serving
+    export_models('.', 'compact_models')
+
 if __name__ == "__main__":
     train_models()
@@ -0,0 +1,205 @@
+import bisect
+import json
+import os
+from datetime import datetime, timedelta
+
+try:
+    from PIL import Image, ImageFile
+    # same as waste_thumbnails.py, the camera uploads often miss the last few bytes
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+except ImportError:  # without Pillow every photo is kept
+    Image = None
+
+# The camera uploads bursts of nearly identical frames seconds apart. Every
+# photo gets a 64 bit difference hash (dHash); a photo taken within
+# BURST_SECONDS of an earlier one whose hash is at most MAX_DISTANCE bits away
+# is folded into it. The first frame of a burst stays the representative:
+#
+#   {"id": ..., "duplicates": 2, "duplicate_ids": ["...", "..."]}
+#
+# and the other frames get "duplicate_of": <representative id>. Only the
+# representatives are archived and get thumbnails. The hashes are kept with
+# the history, one shard per month like the photos themselves, so a photo is
+# only hashed once:
+#
+#   history/phash/2026-01.json   {"reps": {id: {"hash", "at", "duplicate_ids"}}, "members": {id: rep id}}
+#
+# A shard holds the representatives taken that month and the frames folded
+# into them. A frame is at most BURST_SECONDS younger than its representative,
+# so a run only opens the shards of the months its photos (and BURST_SECONDS
+# before them) fall into, never the whole history.
+
+MAX_DISTANCE = 10
+BURST_SECONDS = 300
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+MONTH_FORMAT = "%Y-%m"
+
+
+def dhash(path):
+    """64 bit difference hash: is each pixel of a 9x8 grey thumbnail brighter than its right neighbour."""
+    with Image.open(path) as im:
+        im.draft("L", (64, 64))
+        pixels = im.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = value << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def taken_at(photo):
+    return datetime.strptime(f"{photo['date']} {photo['time']}", TIME_FORMAT)
+
+
+def burst_months(when):
+    """Months whose shard can hold this photo: its own, and the one BURST_SECONDS earlier."""
+    return {when.strftime(MONTH_FORMAT), (when - timedelta(seconds=BURST_SECONDS)).strftime(MONTH_FORMAT)}
+
+
+def load_index(index_path):
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Error decoding {index_path}. Rebuilding it.")
+    return {"reps": {}, "members": {}}
+
+
+def write_index(index_path, index):
+    # one representative per line, keeps the git diffs of a shard small
+    def lines(d):
+        return "{\n" + ",\n".join(f"{json.dumps(k)}: {json.dumps(v)}" for k, v in d.items()) + "\n}" if d else "{}"
+    with open(index_path + ".tmp", "w") as f:
+        f.write(f'{{"reps": {lines(index["reps"])},\n"members": {lines(index["members"])}}}\n')
+    os.replace(index_path + ".tmp", index_path)
+
+
+def split_legacy_index(legacy_path, index_dir):
+    """Move the old single-file history/phash.json into month shards, once."""
+    if not os.path.exists(legacy_path) or os.path.isdir(index_dir):
+        return
+    legacy = load_index(legacy_path)
+    shards = {}
+    for rep_id, rep in legacy["reps"].items():
+        shards.setdefault(rep["at"][:7], {"reps": {}, "members": {}})["reps"][rep_id] = rep
+    for member_id, rep_id in legacy["members"].items():
+        rep = legacy["reps"].get(rep_id)
+        if rep is not None:
+            shards[rep["at"][:7]]["members"][member_id] = rep_id
+    os.makedirs(index_dir, exist_ok=True)
+    for month, shard in shards.items():
+        write_index(os.path.join(index_dir, f"{month}.json"), shard)
+    os.remove(legacy_path)
+    print(f"Split {legacy_path} into {len(shards)} month shards under {index_dir}")
+
+
+def collapse_duplicates(photos, index_dir, public_dir="public", legacy_path=None):
+    """Mark near-duplicate photos in place.
+
+    Returns {rep id: {"at": ..., "duplicate_ids": [...]}} for every
+    representative that took new frames, so its archived record can be updated.
+
+    Only photos that are not in the index yet are hashed. They are compared
+    with the representatives taken within BURST_SECONDS of them, found by
+    bisecting the loaded representatives sorted by time.
+    """
+    if Image is None:
+        print("Pillow is not installed, skipping duplicate detection.")
+        return {}
+
+    if legacy_path:
+        split_legacy_index(legacy_path, index_dir)
+    shards = {}
+
+    def shard(month):
+        if month not in shards:
+            shards[month] = load_index(os.path.join(index_dir, f"{month}.json"))
+        return shards[month]
+
+    def find(photo_id, months):
+        # (month, shard) holding photo_id as a representative or a member
+        for month in months:
+            index = shard(month)
+            if photo_id in index["reps"] or photo_id in index["members"]:
+                return month, index
+        return None, None
+
+    dated, new_photos = [], []
+    for photo in photos:
+        try:
+            when = taken_at(photo)
+        except (KeyError, ValueError) as e:
+            print(f"Could not date {photo.get('id')}: {e}")
+            continue
+        dated.append((when, photo))
+        if find(photo["id"], burst_months(when))[1] is not None:
+            continue
+        src_path = os.path.join(public_dir, photo.get("url", ""))
+        if not photo.get("url") or not os.path.exists(src_path):
+            continue
+        try:
+            new_photos.append((when, photo, dhash(src_path)))
+        except OSError as e:
+            print(f"Could not hash {photo['id']}: {e}")
+
+    changed, dirty = {}, set()
+    if new_photos:
+        # earliest first, so the first frame of a burst becomes the representative
+        new_photos.sort(key=lambda x: x[0])
+        window = timedelta(seconds=BURST_SECONDS)
+        months = set()
+        for when, _, _ in new_photos:
+            months |= burst_months(when) | {(when + window).strftime(MONTH_FORMAT)}
+        # the representatives that can still take a frame of this batch, sorted by time
+        rep_month = {}
+        timeline = []
+        for month in months:
+            for rep_id, rep in shard(month)["reps"].items():
+                rep_month[rep_id] = month
+                timeline.append((rep["at"], rep_id))
+        timeline.sort()
+
+        for when, photo, value in new_photos:
+            lo = bisect.bisect_left(timeline, ((when - window).strftime(TIME_FORMAT),))
+            hi = bisect.bisect_right(timeline, ((when + window).strftime(TIME_FORMAT), "\uffff"))
+            candidates = [(hamming(value, int(shard(rep_month[rep_id])["reps"][rep_id]["hash"], 16)), at, rep_id)
+                          for at, rep_id in timeline[lo:hi]]
+            candidates = [c for c in candidates if c[0] <= MAX_DISTANCE]
+            if not candidates:
+                at = when.strftime(TIME_FORMAT)
+                month = when.strftime(MONTH_FORMAT)
+                shard(month)["reps"][photo["id"]] = {"hash": f"{value:016x}", "at": at, "duplicate_ids": []}
+                rep_month[photo["id"]] = month
+                bisect.insort(timeline, (at, photo["id"]))
+                dirty.add(month)
+            else:
+                rep_id = min(candidates)[2]
+                month = rep_month[rep_id]
+                index = shard(month)
+                index["members"][photo["id"]] = rep_id
+                index["reps"][rep_id]["duplicate_ids"].append(photo["id"])
+                changed[rep_id] = {"at": index["reps"][rep_id]["at"],
+                                   "duplicate_ids": index["reps"][rep_id]["duplicate_ids"]}
+                dirty.add(month)
+                print(f"{photo['id']} ({photo['date']} {photo['time']}) is a near-duplicate of {rep_id}")
+
+        os.makedirs(index_dir, exist_ok=True)
+        for month in sorted(dirty):
+            write_index(os.path.join(index_dir, f"{month}.json"), shards[month])
+
+    # mark the records from the index, so photos seen on earlier runs are marked too
+    for when, photo in dated:
+        _, index = find(photo["id"], burst_months(when))
+        if index is None:
+            continue
+        if photo["id"] in index["members"]:
+            photo["duplicate_of"] = index["members"][photo["id"]]
+        elif index["reps"][photo["id"]].get("duplicate_ids"):
+            photo["duplicates"] = len(index["reps"][photo["id"]]["duplicate_ids"])
+            photo["duplicate_ids"] = index["reps"][photo["id"]]["duplicate_ids"]
+    return changed
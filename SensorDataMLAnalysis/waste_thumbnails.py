@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageFile, ImageOps
+    # the camera uploads often miss the last few bytes; browsers show them anyway
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+except ImportError:  # thumbnails are optional, the Gallery falls back to the originals
+    Image = None
+
+# Smaller copies of the detected waste photos for the Gallery, written next to them:
+#
+#   public/detected_waste_photos/thumbs/<id>/<hash>-320.webp   (and .jpg)
+#   public/detected_waste_photos/thumbs/index.json              id -> hash, sizes, urls
+#
+# Each photo is keyed by its id and a hash of the file, so an image is only
+# resized once; a replaced image gets new file names (and so new urls that no
+# browser has cached). A photo is only hashed again when its size or mtime
+# moved since the last run:
+#
+#   public/detected_waste_photos/thumbs/.stat.json              id -> [size, mtime_ns, hash]
+#
+# It stays out of git (a checkout gives every file a new mtime, so it would
+# change on every commit); without it each photo is hashed once to rebuild it.
+# The results are added to the photo records:
+#
+#   "width": 720, "height": 480,
+#   "thumbnails": [{"width": 160, "height": 107, "webp": "...", "jpeg": "..."}, ...]
+
+WIDTHS = [160, 320, 640]
+WEBP_QUALITY = 75
+JPEG_QUALITY = 80
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def load_stats(stat_path):
+    if os.path.exists(stat_path):
+        try:
+            with open(stat_path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Error decoding {stat_path}. Hashing every photo again.")
+    return {}
+
+
+def stat_hash(photo_id, src_path, stats):
+    """Content hash of src_path, taken from stats while its size and mtime are unchanged."""
+    st = os.stat(src_path)
+    cached = stats.get(photo_id)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    digest = file_hash(src_path)
+    stats[photo_id] = [st.st_size, st.st_mtime_ns, digest]
+    return digest
+
+
+def make_thumbnails(src_path, out_dir, url_prefix, digest):
+    """Resize one photo to every width in WIDTHS (never upscaled); returns its thumbnail record."""
+    with Image.open(src_path) as im:
+        width, height = im.size
+        if im.getexif().get(0x0112) in (5, 6, 7, 8):  # stored on its side, shown rotated
+            width, height = height, width
+        # let the JPEG decoder skip most of the pixels, the largest thumbnail is much smaller
+        im.draft("RGB", (max(WIDTHS), max(WIDTHS)))
+        im = ImageOps.exif_transpose(im).convert("RGB")
+
+        os.makedirs(out_dir, exist_ok=True)
+        thumbnails = []
+        for target in WIDTHS:
+            if target >= width and thumbnails:
+                break
+            w = min(target, width)
+            h = max(1, round(height * w / width))
+            small = im.resize((w, h), Image.LANCZOS)
+            name = f"{digest}-{w}"
+            small.save(os.path.join(out_dir, name + ".webp"), "WEBP", quality=WEBP_QUALITY, method=4)
+            small.save(os.path.join(out_dir, name + ".jpg"), "JPEG", quality=JPEG_QUALITY,
+                       optimize=True, progressive=True)
+            thumbnails.append({"width": w, "height": h,
+                               "webp": f"{url_prefix}/{name}.webp", "jpeg": f"{url_prefix}/{name}.jpg"})
+
+    # thumbnails of an older version of the image
+    for name in os.listdir(out_dir):
+        if not name.startswith(digest + "-"):
+            os.remove(os.path.join(out_dir, name))
+    return {"hash": digest, "width": width, "height": height, "thumbnails": thumbnails}
+
+
+def _make_task(task):
+    photo_id, src_path, out_dir, url_prefix, digest = task
+    try:
+        return photo_id, make_thumbnails(src_path, out_dir, url_prefix, digest)
+    except OSError as e:
+        print(f"Could not make thumbnails for {photo_id}: {e}")
+        return photo_id, None
+
+
+def add_thumbnails(photos, public_dir="public", workers=None):
+    """Add width/height/thumbnails to every photo record that has an image on disk.
+
+    Only new or changed images are resized, in a process pool. Returns the
+    number of photos that were processed.
+    """
+    if Image is None:
+        print("Pillow is not installed, skipping thumbnails.")
+        return 0
+
+    thumbs_dir = os.path.join(public_dir, "detected_waste_photos", "thumbs")
+    index_path = os.path.join(thumbs_dir, "index.json")
+    index = {}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+        except json.JSONDecodeError:
+            print("Error decoding thumbs/index.json. Rebuilding it.")
+
+    # 1. hash the images that changed on disk, only the ones we have not seen (or that changed) need work
+    stat_path = os.path.join(thumbs_dir, ".stat.json")
+    stats = load_stats(stat_path)
+    before = dict(stats)
+    tasks = []
+    for photo in photos:
+        src_path = os.path.join(public_dir, photo.get("url", ""))
+        if not photo.get("url") or not os.path.exists(src_path):
+            continue
+        digest = stat_hash(photo["id"], src_path, stats)
+        entry = index.get(photo["id"])
+        if entry and entry["hash"] == digest:
+            continue
+        url_prefix = f"detected_waste_photos/thumbs/{photo['id']}"
+        tasks.append((photo["id"], src_path, os.path.join(thumbs_dir, photo["id"]), url_prefix, digest))
+
+    # 2. resize them, in parallel when there is more than one
+    if len(tasks) > 1 and (workers is None or workers > 1):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_make_task, tasks))
+    else:
+        results = [_make_task(task) for task in tasks]
+    for photo_id, entry in results:
+        if entry is not None:
+            index[photo_id] = entry
+            print(f"Made {len(entry['thumbnails'])} thumbnails for {photo_id}")
+
+    if results:
+        os.makedirs(thumbs_dir, exist_ok=True)
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(index_path + ".tmp", index_path)
+    if stats != before:
+        os.makedirs(thumbs_dir, exist_ok=True)
+        with open(stat_path + ".tmp", "w") as f:
+            json.dump(stats, f, indent=1, sort_keys=True)
+        os.replace(stat_path + ".tmp", stat_path)
+
+    # 3. copy the derivatives onto the records
+    for photo in photos:
+        entry = index.get(photo["id"])
+        if entry:
+            photo["width"] = entry["width"]
+            photo["height"] = entry["height"]
+            photo["thumbnails"] = entry["thumbnails"]
+    return len(results)
+
@@ -13,11 +13,13 @@ This script:
 import os
 import json
 import sys
+import shutil
+import hashlib
+import argparse
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-import firebase_admin
-from firebase_admin import credentials, db
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend for server environments
@@ -25,82 +27,49 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.figure import Figure
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_access import get_client
+from instrumentation import enable, span
+from water_forecast import latest_forecast
+# flood risk thresholds (adjust them in thresholds.py)
+from analysis.thresholds import (WATER_LEVEL_SAFE, WATER_LEVEL_WARNING, WATER_LEVEL_DANGER,
+                                 RAINFALL_SAFE, RAINFALL_WARNING, RAINFALL_DANGER,
+                                 HUMIDITY_NORMAL_MIN, HUMIDITY_NORMAL_MAX)
+
 # Configuration
 FIREBASE_DB_PATH = "sensors/latest"
-# Path to latest sensor readings
-FIREBASE_DATABASE_URL = "https://aura-data-cb5bf-default-rtdb.asia-southeast1.firebasedatabase.app"
 OUTPUT_GRAPH = "analysis_graph.png"
 OUTPUT_SUMMARY_JSON = "analysis_summary.json"
 OUTPUT_SUMMARY_TXT = "analysis_summary.txt"
+# written by the sensor logger (water_forecast.py)
+FORECAST_STATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "forecast_state.json")
 
-# Flood risk thresholds (adjust based on your sensor calibration)
-WATER_LEVEL_SAFE = 50      # cm - below this is safe
-WATER_LEVEL_WARNING = 100  # cm - warning level
-WATER_LEVEL_DANGER = 150   # cm - danger/flood level
-
-RAINFALL_SAFE = 5          # mm - light rain
-RAINFALL_WARNING = 20     # mm - moderate rain
-RAINFALL_DANGER = 50      # mm - heavy rain
-
-HUMIDITY_NORMAL_MIN = 40  # %
-HUMIDITY_NORMAL_MAX = 80  # %
-
-
-def initialize_firebase() -> None:
-    """Initialize Firebase Admin SDK with service account credentials."""
-    if firebase_admin._apps:
-        return
-
-    service_account_json = os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")
-
-    if service_account_json:
-        try:
-            cred_dict = json.loads(service_account_json)
-            database_url = (
-                cred_dict.get("databaseURL")
-                or os.environ.get("FIREBASE_DATABASE_URL")
-                or FIREBASE_DATABASE_URL
-            )
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"databaseURL": database_url} if database_url else None,
-            )
-            print("✓ Firebase initialized from FIREBASE_SERVICE_ACCOUNT_JSON")
-            return
-        except json.JSONDecodeError as error:
-            print(f"⚠ Warning: Failed to parse FIREBASE_SERVICE_ACCOUNT_JSON: {error}")
-
-    service_account_file = "serviceAccountKey.json"
-    if os.path.exists(service_account_file):
-        cred = credentials.Certificate(service_account_file)
-        database_url = (
-            os.environ.get("FIREBASE_DATABASE_URL")
-            or FIREBASE_DATABASE_URL
-        )
-        firebase_admin.initialize_app(
-            cred,
-            {"databaseURL": database_url} if database_url else None,
-        )
-        print("✓ Firebase initialized from serviceAccountKey.json")
-        return
-
-    raise RuntimeError(
-        "Firebase credentials not found. "
-        "Set FIREBASE_SERVICE_ACCOUNT_JSON (for GitHub Actions) or place "
-        "serviceAccountKey.json in the project root for local testing."
-    )
+# Rendered graphs are cached by a hash of the reading and the thresholds
+CACHE_DIR = ".analysis_cache"
+CACHE_INDEX = "index.json"
+CACHE_MAX_ENTRIES = 32     # least recently used graphs beyond this are evicted
+
+# Table-driven form of the rules in analyze_flood_risk(), used by the batch API.
+# A reading at or above thresholds[i] (strictly above for humidity) scores scores[i + 1].
+RISK_RULES = {
+    'water_level': {'thresholds': [WATER_LEVEL_SAFE, WATER_LEVEL_WARNING, WATER_LEVEL_DANGER],
+                    'scores': [0, 10, 30, 50], 'side': 'right'},
+    'rainfall': {'thresholds': [RAINFALL_SAFE, RAINFALL_WARNING, RAINFALL_DANGER],
+                 'scores': [0, 5, 25, 40], 'side': 'right'},
+    'humidity': {'thresholds': [HUMIDITY_NORMAL_MAX],
+                 'scores': [0, 5], 'side': 'left'},
+}
+RISK_LEVEL_THRESHOLDS = [30, 50, 70]
+RISK_LEVELS = np.array(['low', 'moderate', 'high', 'critical'])
 
 
-def fetch_sensor_data() -> Optional[Dict[str, Any]]:
-    """Fetch the latest sensor readings from Firebase."""
+def fetch_sensor_data(path: str = FIREBASE_DB_PATH) -> Optional[Dict[str, Any]]:
+    """Fetch the latest sensor readings through the shared data-access client."""
     try:
-        ref = db.reference(FIREBASE_DB_PATH)
-        print(ref)
-        data = ref.get()
-        print(data)
-        
+        data = get_client().fetch(path)
+
         if data is None:
-            print("⚠ Warning: No data found at path 'sensors/latest'")
+            print(f"⚠ Warning: No data found at path '{path}'")
             return None
         
         print(f"✓ Fetched sensor data: {json.dumps(data, indent=2)}")
@@ -209,6 +178,48 @@ def analyze_flood_risk(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _rule_scores(values: np.ndarray, rule: Dict[str, Any]) -> np.ndarray:
+    """Score an array against one threshold table; NaN scores 0 like the scalar rules."""
+    values = np.asarray(values, dtype=float)
+    bins = np.searchsorted(rule['thresholds'], values, side=rule['side'])
+    bins = np.where(np.isnan(values), 0, bins)
+    return np.asarray(rule['scores'])[bins]
+
+
+def analyze_flood_risk_batch(
+    water_level: np.ndarray,
+    rainfall: np.ndarray,
+    humidity: np.ndarray,
+    rules: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized analyze_flood_risk() over column arrays of readings.
+
+    Returns {'risk_score': int array, 'risk_level': str array} with the same
+    values analyze_flood_risk() gives row by row. Pass `rules` (same shape as
+    RISK_RULES, partial overrides allowed) to evaluate what-if thresholds.
+    """
+    rules = {**RISK_RULES, **(rules or {})}
+    risk_score = (
+        _rule_scores(water_level, rules['water_level'])
+        + _rule_scores(rainfall, rules['rainfall'])
+        + _rule_scores(humidity, rules['humidity'])
+    )
+    risk_level = RISK_LEVELS[np.searchsorted(RISK_LEVEL_THRESHOLDS, risk_score, side='right')]
+    return {
+        'risk_score': np.minimum(risk_score, 100),
+        'risk_level': risk_level,
+    }
+
+
+def analyze_history(df: pd.DataFrame, rules: Optional[Dict[str, Dict[str, Any]]] = None) -> pd.DataFrame:
+    """Add risk_score/risk_level columns to a sensor_data.csv-shaped DataFrame in one pass."""
+    result = analyze_flood_risk_batch(
+        df['waterLevel'].to_numpy(), df['rainfall'].to_numpy(), df['humidity'].to_numpy(), rules
+    )
+    return df.assign(risk_score=result['risk_score'], risk_level=result['risk_level'])
+
+
 def generate_graph(data: Dict[str, Any], analysis: Dict[str, Any]) -> Figure:
     """
     Generate a visualization graph showing sensor readings and risk assessment.
@@ -328,17 +339,155 @@ def create_summary(analysis: Dict[str, Any]) -> str:
     return "\n".join(summary_lines)
 
 
+def analysis_cache_key(data: Dict[str, Any]) -> str:
+    """Hash of the sensor values and the threshold configuration that drive the outputs."""
+    payload = {
+        'reading': {key: data.get(key, 0) for key in ('waterLevel', 'rainfall', 'humidity', 'temperature')},
+        'rules': RISK_RULES,
+        'levels': RISK_LEVEL_THRESHOLDS,
+        'humidity_min': HUMIDITY_NORMAL_MIN,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def load_cache_index(cache_dir: str = CACHE_DIR) -> Dict[str, Any]:
+    """Load the cache index ({key: {'last_used': ..., 'analysis': ...}}), empty if missing or unreadable."""
+    index_path = os.path.join(cache_dir, CACHE_INDEX)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_cache_index(index: Dict[str, Any], cache_dir: str = CACHE_DIR,
+                     max_entries: int = CACHE_MAX_ENTRIES) -> None:
+    """Evict least recently used entries beyond max_entries, then write the index."""
+    os.makedirs(cache_dir, exist_ok=True)
+    by_age = sorted(index, key=lambda key: index[key]['last_used'])
+    for key in by_age[:max(0, len(index) - max_entries)]:
+        del index[key]
+        graph_path = os.path.join(cache_dir, f"{key}.png")
+        if os.path.exists(graph_path):
+            os.remove(graph_path)
+    tmp_path = os.path.join(cache_dir, CACHE_INDEX + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(cache_dir, CACHE_INDEX))
+
+
+def clear_cache(cache_dir: str = CACHE_DIR) -> None:
+    """Remove every cached graph and the index."""
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+        print(f"✓ Cleared analysis cache in {cache_dir}")
+
+
+def write_summaries(analysis: Dict[str, Any], txt_path: str = OUTPUT_SUMMARY_TXT,
+                    json_path: str = OUTPUT_SUMMARY_JSON, forecast: Optional[Dict[str, Any]] = None) -> None:
+    """Write the text and JSON summaries; both carry fresh timestamps. forecast goes into the JSON as is."""
+    summary_text = create_summary(analysis)
+
+    # Save text summary
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write(summary_text)
+    print(f"✓ Text summary saved to {txt_path}")
+
+    # Save JSON summary (for programmatic access)
+    summary_json = {
+        'summary': summary_text,
+        'risk_level': analysis['risk_level'],
+        'risk_score': analysis['risk_score'],
+        'water_level': analysis['water_level'],
+        'rainfall': analysis['rainfall'],
+        'humidity': analysis['humidity'],
+        'temperature': analysis.get('temperature'),
+        'factors': analysis['factors'],
+        'recommendations': analysis['recommendations'],
+        'forecast': forecast,
+        'updatedAt': datetime.now().isoformat() + 'Z',
+        'timestamp': datetime.now().isoformat() + 'Z',
+        'generatedAt': datetime.now().isoformat() + 'Z',
+        'lastUpdated': datetime.now().isoformat() + 'Z'
+    }
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(summary_json, f, indent=2, ensure_ascii=False)
+    print(f"✓ JSON summary saved to {json_path}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AURA flood risk analysis")
+    parser.add_argument('--force', action='store_true',
+                        help='re-run the analysis and re-render the graph even if the reading is unchanged')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='delete all cached graphs before running')
+    parser.add_argument('--cache-size', type=int, default=CACHE_MAX_ENTRIES,
+                        help=f'number of cached graphs to keep (default {CACHE_MAX_ENTRIES})')
+    return parser.parse_args()
+
+
+def run_analysis(data: Dict[str, Any], force: bool = False, clear: bool = False,
+                 cache_size: int = CACHE_MAX_ENTRIES) -> Dict[str, Any]:
+    """Analyse one snapshot, render (or reuse) its graph and write the summaries."""
+    if clear:
+        clear_cache()
+
+    # Same reading and thresholds as a cached run: reuse its analysis and graph
+    cache_key = analysis_cache_key(data)
+    cache_index = load_cache_index()
+    cached = cache_index.get(cache_key)
+    cached_graph = os.path.join(CACHE_DIR, f"{cache_key}.png")
+    if cached and os.path.exists(cached_graph) and not force:
+        print("\n[2/4] Reading unchanged, reusing cached analysis...")
+        analysis = cached['analysis']
+        print(f"✓ Risk Level: {analysis['risk_level'].upper()}")
+        print(f"✓ Risk Score: {analysis['risk_score']}/100")
+
+        print("\n[3/4] Skipping graph rendering...")
+        shutil.copyfile(cached_graph, OUTPUT_GRAPH)
+        print(f"✓ Cached graph copied to {OUTPUT_GRAPH}")
+    else:
+        # Perform analysis
+        print("\n[2/4] Performing flood risk analysis...")
+        with span("analysis"):
+            analysis = analyze_flood_risk(data)
+        print(f"✓ Risk Level: {analysis['risk_level'].upper()}")
+        print(f"✓ Risk Score: {analysis['risk_score']}/100")
+
+        # Generate graph
+        print("\n[3/4] Generating visualization graph...")
+        with span("render"):
+            fig = generate_graph(data, analysis)
+            fig.savefig(OUTPUT_GRAPH, dpi=150, bbox_inches='tight', facecolor='white')
+            plt.close(fig)
+        print(f"✓ Graph saved to {OUTPUT_GRAPH}")
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        shutil.copyfile(OUTPUT_GRAPH, cached_graph)
+
+    cache_index[cache_key] = {'last_used': datetime.now().isoformat(), 'analysis': analysis}
+    save_cache_index(cache_index, max_entries=cache_size)
+
+    # Create summary
+    print("\n[4/4] Creating analysis summary...")
+    with span("write_output"):
+        write_summaries(analysis, forecast=latest_forecast(FORECAST_STATE))
+    return analysis
+
+
 def main():
     """Main execution function."""
+    args = parse_args()
+    enable("analyze")
     print("=" * 60)
     print("AURA Flood Risk Prediction Analysis")
     print("=" * 60)
     print()
     
     try:
-        # Initialize Firebase
-        initialize_firebase()
-        
         # Fetch sensor data
         print("\n[1/4] Fetching sensor data from Firebase...")
         data = fetch_sensor_data()
@@ -347,49 +496,8 @@ def main():
             print("✗ Cannot proceed without sensor data. Exiting.")
             sys.exit(1)
         
-        # Perform analysis
-        print("\n[2/4] Performing flood risk analysis...")
-        analysis = analyze_flood_risk(data)
-        print(f"✓ Risk Level: {analysis['risk_level'].upper()}")
-        print(f"✓ Risk Score: {analysis['risk_score']}/100")
-        
-        # Generate graph
-        print("\n[3/4] Generating visualization graph...")
-        fig = generate_graph(data, analysis)
-        fig.savefig(OUTPUT_GRAPH, dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close(fig)
-        print(f"✓ Graph saved to {OUTPUT_GRAPH}")
-        
-        # Create summary
-        print("\n[4/4] Creating analysis summary...")
-        summary_text = create_summary(analysis)
-        
-        # Save text summary
-        with open(OUTPUT_SUMMARY_TXT, 'w', encoding='utf-8') as f:
-            f.write(summary_text)
-        print(f"✓ Text summary saved to {OUTPUT_SUMMARY_TXT}")
-        
-        # Save JSON summary (for programmatic access)
-        summary_json = {
-            'summary': summary_text,
-            'risk_level': analysis['risk_level'],
-            'risk_score': analysis['risk_score'],
-            'water_level': analysis['water_level'],
-            'rainfall': analysis['rainfall'],
-            'humidity': analysis['humidity'],
-            'temperature': analysis.get('temperature'),
-            'factors': analysis['factors'],
-            'recommendations': analysis['recommendations'],
-            'updatedAt': datetime.now().isoformat() + 'Z',
-            'timestamp': datetime.now().isoformat() + 'Z',
-            'generatedAt': datetime.now().isoformat() + 'Z',
-            'lastUpdated': datetime.now().isoformat() + 'Z'
-        }
-        
-        with open(OUTPUT_SUMMARY_JSON, 'w', encoding='utf-8') as f:
-            json.dump(summary_json, f, indent=2, ensure_ascii=False)
-        print(f"✓ JSON summary saved to {OUTPUT_SUMMARY_JSON}")
-        
+        run_analysis(data, force=args.force, clear=args.clear_cache, cache_size=args.cache_size)
+
         print("\n" + "=" * 60)
         print("✓ Analysis complete! All outputs generated successfully.")
         print("=" * 60)
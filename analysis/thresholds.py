@@ -0,0 +1,17 @@
+"""
+Flood risk thresholds (adjust based on your sensor calibration).
+
+Kept apart from analyze.py so the prediction and forecasting scripts can
+use them without importing matplotlib.
+"""
+
+WATER_LEVEL_SAFE = 50      # cm - below this is safe
+WATER_LEVEL_WARNING = 100  # cm - warning level
+WATER_LEVEL_DANGER = 150   # cm - danger/flood level
+
+RAINFALL_SAFE = 5          # mm - light rain
+RAINFALL_WARNING = 20     # mm - moderate rain
+RAINFALL_DANGER = 50      # mm - heavy rain
+
+HUMIDITY_NORMAL_MIN = 40  # %
+HUMIDITY_NORMAL_MAX = 80  # %
@@ -1,67 +1,63 @@
 # analysis_firebase_detailed.py
 
-import firebase_admin
-from firebase_admin import credentials, db
+import argparse
+
 import joblib
 import numpy as np
 import pandas as pd
-import os
-import json
 
-# -------------------------------
-# Firebase Initialization
-# -------------------------------
-'''
-try:
-    firebase_admin.get_app()
-except ValueError:
-    cred = credentials.Certificate("")
-    firebase_admin.initialize_app(cred, {
-        "databaseURL": "https://aura-data-cb5bf-default-rtdb.asia-southeast1.firebasedatabase.app"
-    })
-'''
-# Load Firebase key from environment variable
-# check if key exists
-firebase_key_json = os.environ.get("FIREBASE_KEY")
-if not firebase_key_json:
-    raise ValueError("FIREBASE_KEY not found in environment variables!")
-
-# Convert string to dictionary
-firebase_key_dict = json.loads(firebase_key_json)
-
-# connect to firebase
-cred = credentials.Certificate(firebase_key_dict)
-firebase_admin.initialize_app(cred, {
-    "databaseURL": "https://aura-data-cb5bf-default-rtdb.asia-southeast1.firebasedatabase.app"
-})
+import model_client
+from data_access import get_client
+from instrumentation import enable, span, timed
+from streaming_anomaly import STATE_FILE, detect, peek
+
+# streaming: adaptive per-channel baseline (streaming_anomaly.py), learns from every reading
+# isolation-forest: the offline trained flood_unsupervised.pkl, kept for comparison
+DETECTORS = ["streaming", "isolation-forest"]
+
 # -------------------------------
 # Load Model
 # -------------------------------
-# load our trained ai model
-model = joblib.load("flood_unsupervised.pkl")
+# load our trained ai model once, the ingest daemon reuses it for every reading
+model = None
+
+
+@timed("model_load")
+def load_model():
+    global model
+    if model is None:
+        model = joblib.load("flood_unsupervised.pkl")
+    return model
 
 # -------------------------------
 # Fetch Sensor Data From Firebase
 # -------------------------------
-def get_sensor_data():
-    # get latest data from sensor path
-    ref = db.reference("sensors/latest")
-    data = ref.get()
-    return data
+def get_sensor_data(path="sensors/latest"):
+    # get latest data from sensor path, shared with the other scripts in the same tick
+    return get_client().fetch(path)
 
 
 # -------------------------------
 # Prediction Function (with detailed explanation)
 # -------------------------------
-def predict_flood(humidity, rainfall, temperature, waterLevel):
+def predict_flood_isolation_forest(humidity, rainfall, temperature, waterLevel):
     features = pd.DataFrame([[humidity, rainfall, temperature, waterLevel]],
                             columns=['humidity', 'rainfall', 'temperature', 'waterLevel'])
 
+    # use the warm model server when it is running
+    with span("model_server"):
+        served = model_client.score_anomaly(features)
+    if served is not None:
+        prediction_raw, score = served[0][0], served[1][0]
+    else:
+        model = load_model()
+        with span("inference"):
+            prediction_raw = model.predict(features)[0]
+            score = model.score_samples(features)[0]
+
     # IsolationForest: 1 = safe, -1 = flood
-    prediction_raw = model.predict(features)[0]
     prediction = 0 if prediction_raw == 1 else 1
 
-    score = model.score_samples(features)[0]
     probability = 1 / (1 + np.exp(-score))
     if prediction == 1:
         probability = 1 - probability
@@ -69,38 +65,34 @@ def predict_flood(humidity, rainfall, temperature, waterLevel):
     return prediction, float(probability)
 
 
+def predict_flood(humidity, rainfall, temperature, waterLevel, detector="streaming", state_path=STATE_FILE,
+                  learn=True):
+    if detector == "isolation-forest":
+        return predict_flood_isolation_forest(humidity, rainfall, temperature, waterLevel)
+
+    # O(1) update of the baseline checkpointed at state_path, learn=False only scores against it
+    reading = {'humidity': humidity, 'rainfall': rainfall, 'temperature': temperature, 'waterLevel': waterLevel}
+    with span("streaming"):
+        prediction, confidence, _ = (detect if learn else peek)(reading, state_path)
+    return prediction, float(confidence)
+
+
 # -------------------------------
 # Upload Detailed Result to Firebase
 # -------------------------------
-def upload_result_to_firebase(result_text, prediction, confidence):
-    ref = db.reference("sensors/floodResult")
-    ref.set({
+def upload_result_to_firebase(result_text, prediction, confidence, path="sensors/floodResult", detector="streaming"):
+    get_client().set(path, {
         "prediction": prediction,
         "confidence": confidence,
-        "message": result_text
+        "message": result_text,
+        "detector": detector
     })
 
 
 # -------------------------------
-# Main Execution (every 1 minute)
+# Detailed Explanation (same as original)
 # -------------------------------
-def main():
-    data = get_sensor_data()
-
-    if not data:
-        print("No data found in Firebase.")
-        return
-
-    humidity = float(data["humidity"])
-    rainfall = float(data["rainfall"])
-    temperature = float(data["temperature"])
-    waterLevel = float(data["waterLevel"])
-
-    flood, confidence = predict_flood(humidity, rainfall, temperature, waterLevel)
-
-    # -------------------------------
-    # Detailed Explanation (same as original)
-    # -------------------------------
+def build_result_text(flood, confidence):
     if flood == 1:
         result_text = (
             "FLOOD RISK DETECTED\n"
@@ -135,13 +127,52 @@ def main():
             "  These readings suggest minimal surface runoff pressure and adequate drainage\n"
             "  capacity, indicating low likelihood of flooding under current conditions."
         )
+    return result_text
+
+
+def analyse_reading(data, result_path="sensors/floodResult", detector="streaming", state_path=STATE_FILE,
+                    compare=False):
+    humidity = float(data["humidity"])
+    rainfall = float(data["rainfall"])
+    temperature = float(data["temperature"])
+    waterLevel = float(data["waterLevel"])
+
+    flood, confidence = predict_flood(humidity, rainfall, temperature, waterLevel, detector, state_path)
+    result_text = build_result_text(flood, confidence)
 
     # Upload to Firebase
-    upload_result_to_firebase(result_text, flood, confidence)
+    upload_result_to_firebase(result_text, flood, confidence, result_path, detector)
 
-    print("Uploaded to Firebase:")
+    print(f"Uploaded to Firebase ({detector} detector):")
     print(result_text)
 
+    if compare:
+        # the other detector on the same reading, printed only (the streaming baseline is not touched)
+        other = "isolation-forest" if detector == "streaming" else "streaming"
+        other_flood, other_confidence = predict_flood(humidity, rainfall, temperature, waterLevel, other, state_path,
+                                                      learn=False)
+        print(f"{other} detector: prediction {other_flood}, confidence {other_confidence:.2f}")
+
+
+# -------------------------------
+# Main Execution (every 1 minute)
+# -------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Score the latest reading for anomalies and upload the result.")
+    parser.add_argument("--detector", choices=DETECTORS, default="streaming")
+    parser.add_argument("--compare", action="store_true", help="also print what the other detector says")
+    parser.add_argument("--state", default=STATE_FILE, help="checkpoint of the streaming detector")
+    args = parser.parse_args()
+
+    enable("analysis_firebase")
+    data = get_sensor_data()
+
+    if not data:
+        print("No data found in Firebase.")
+        return
+
+    analyse_reading(data, detector=args.detector, state_path=args.state, compare=args.compare)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,391 @@
+"""
+Benchmarks for every stage of the sensor pipeline, with regression gates.
+
+Each stage runs on fixed synthetic datasets (seeded, so every run sees the
+same data) at 1k, 100k and, opt-in, 10M rows:
+
+    store_append     store_sensor_data.store_readings, one reading on top of N rows of history
+    predict_single   predict_flood_risk.predict_flood_risk on the latest reading
+    predict_batch    predict_flood_risk.predict_flood_risk_batch over N stored readings
+    analyze_single   analyze_flood_risk + generate_graph (rendered to PNG) for one reading
+    analyze_batch    analyze_history over N readings
+    archive_merge    archive_waste_history.archive_history, 50 photos into N entries of sharded history
+    train_simple     train_simple_models.train_models on N training rows
+    train_deep       train_deep_model.train_deep_model on N training rows
+
+Stages that do not depend on N run once. Training is capped (see MAX_ROWS)
+because linear SVC and the MLP grow much faster than linearly; pass
+--no-limits to lift the caps.
+
+Results are JSON: {"meta": {...}, "results": {"<stage>@<rows>": {"median_s", "min_s", "runs"}}}.
+compare fails (exit code 1) when a stage's median is more than --threshold
+slower than the baseline.
+
+Usage (from the repository root):
+    python benchmarks/bench.py run                              # 1k and 100k
+    python benchmarks/bench.py run --sizes 1k,100k,10m --output results.json
+    python benchmarks/bench.py run --compare benchmarks/baselines/baseline.json
+    python benchmarks/bench.py compare benchmarks/baselines/baseline.json results.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_DIR = os.path.join(ROOT_DIR, "SensorDataMLAnalysis")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, ML_DIR)
+# measure the local prediction path, not a model server that may be running
+os.environ.setdefault("MODEL_SERVER_URL", "off")
+
+import numpy as np
+import pandas as pd
+
+SIZES = {"1k": 1000, "100k": 100000, "10m": 10000000}
+DEFAULT_SIZES = ["1k", "100k"]
+SEED = 42
+MAX_RUNS = 50          # timed runs per stage...
+TIME_BUDGET = 2.0      # ...but stop once this many seconds have been spent (after the first run)
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA_S = 0.002    # differences below this are noise, never a regression
+MAX_ROWS = {
+    "archive_merge": 100000,
+    "train_simple": 10000,
+    "train_deep": 100000,
+}
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+
+# -------------------------------
+# Synthetic datasets
+# -------------------------------
+def sensor_frame(rows, seed=SEED):
+    """sensor_data.csv-shaped readings, one every 10 seconds from 2024-01-01."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-01-01", periods=rows, freq="10s").strftime("%Y-%m-%d %H:%M:%S")
+    return pd.DataFrame({
+        "humidity": rng.uniform(40, 100, rows).round(1),
+        "rainfall": rng.gamma(1.5, 8, rows).round(1),
+        "temperature": rng.uniform(22, 34, rows).round(1),
+        "waterLevel": rng.uniform(0, 200, rows).round(1),
+        "timestamp": timestamps,
+    })
+
+
+def training_frame(rows, seed=SEED):
+    """Same columns as flood_risk_dataset_india_modified.csv uses for training."""
+    rng = np.random.default_rng(seed)
+    rainfall = rng.uniform(0, 300, rows)
+    humidity = rng.uniform(20, 100, rows)
+    temperature = rng.uniform(15, 45, rows)
+    water_level = rng.uniform(0, 10, rows)
+    logit = 0.01 * rainfall + 0.5 * water_level + 0.01 * humidity - 4 + rng.normal(0, 1, rows)
+    return pd.DataFrame({
+        "Rainfall (mm)": rainfall,
+        "Temperature (°C)": temperature,
+        "Humidity (%)": humidity,
+        "Water Level (m)": water_level,
+        "Flood Occurred": (logit > 0).astype(int),
+    })
+
+
+def waste_photos(rows, start=0):
+    """photos.json-shaped records, one photo every 10 minutes from 2024-01-01."""
+    taken = pd.date_range("2024-01-01", periods=start + rows, freq="10min")[start:]
+    return [{"id": f"photo-{i:08d}", "date": t.strftime("%Y-%m-%d"), "time": t.strftime("%H:%M:%S"),
+             "url": f"detected_waste_photos/photo-{i:08d}.jpg"}
+            for i, t in zip(range(start, start + rows), taken)]
+
+
+# -------------------------------
+# Stages
+# -------------------------------
+# each setup(rows, workdir) returns (run, reset); reset (or None) runs untimed before every run
+
+def seed_history(frame, workdir):
+    """Sensor log, columnar store and csv view holding `frame`, like a long-running deployment."""
+    from sensor_log import SensorLog
+    from sensor_store import SensorStore
+
+    log_dir = os.path.join(workdir, "sensor_log")
+    store_dir = os.path.join(workdir, "sensor_store")
+    log = SensorLog(log_dir)
+    chunk_rows = 1000000
+    for i in range(0, len(frame), chunk_rows):
+        chunk_path = os.path.join(workdir, "chunk.csv")
+        frame.iloc[i:i + chunk_rows].to_csv(chunk_path, index=False)
+        log.import_csv(chunk_path)
+        SensorStore(store_dir).append(frame.iloc[i:i + chunk_rows].to_dict("records"))
+    os.remove(chunk_path)
+    csv_file = os.path.join(workdir, "public", "sensor_data.csv")
+    os.makedirs(os.path.dirname(csv_file))
+    log.write_csv_view(csv_file)
+    return csv_file, log_dir, store_dir
+
+
+def setup_store_append(rows, workdir):
+    from rolling_features import update_features
+    from sensor_rollups import update_rollups
+    from sensor_store import SensorStore
+    from store_sensor_data import store_readings
+
+    frame = sensor_frame(rows)
+    csv_file, log_dir, store_dir = seed_history(frame, workdir)
+    # build the rollups up front, the timed runs only add to them
+    rollup_dir = os.path.join(workdir, "rollups")
+    update_rollups([], rollup_dir, history=lambda: frame.to_dict("records"))
+    feature_state = os.path.join(workdir, "feature_state.json")
+    update_features(SensorStore(store_dir), feature_state)
+    forecast_state = os.path.join(workdir, "forecast_state.json")
+    next_time = pd.Timestamp(frame["timestamp"].iloc[-1])
+    reading = frame.iloc[-1].to_dict()
+
+    def run():
+        nonlocal next_time
+        next_time += pd.Timedelta(seconds=10)
+        store_readings([{**reading, "timestamp": next_time.strftime("%Y-%m-%d %H:%M:%S")}],
+                       csv_file=csv_file, log_dir=log_dir, store_dir=store_dir, rollup_dir=rollup_dir,
+                       feature_state=feature_state, forecast_state=forecast_state)
+    return run, None
+
+
+def setup_predict_single(rows, workdir):
+    import predict_flood_risk
+
+    predict_flood_risk.OUTPUT_PATH = os.path.join(workdir, "latest_flood_risk.json")
+    latest = sensor_frame(1)
+    return lambda: predict_flood_risk.predict_flood_risk(latest), None
+
+
+def setup_predict_batch(rows, workdir):
+    import predict_flood_risk
+
+    _, _, store_dir = seed_history(sensor_frame(rows), workdir)
+    predict_flood_risk.STORE_PATH = store_dir
+    history_path = os.path.join(workdir, "flood_risk_history.csv")
+    return lambda: predict_flood_risk.predict_flood_risk_batch(rebuild=True, history_path=history_path), None
+
+
+def setup_analyze_single(rows, workdir):
+    from analysis.analyze import analyze_flood_risk, generate_graph, plt
+
+    reading = sensor_frame(1).iloc[0].to_dict()
+    graph_path = os.path.join(workdir, "analysis_graph.png")
+
+    def run():
+        analysis = analyze_flood_risk(reading)
+        fig = generate_graph(reading, analysis)
+        fig.savefig(graph_path, dpi=150, bbox_inches='tight', facecolor='white')
+        plt.close(fig)
+    return run, None
+
+
+def setup_analyze_batch(rows, workdir):
+    from analysis.analyze import analyze_history
+
+    frame = sensor_frame(rows)
+    return lambda: analyze_history(frame), None
+
+
+def setup_archive_merge(rows, workdir):
+    from archive_waste_history import archive_history
+
+    photos_dir = os.path.join(workdir, "public", "detected_waste_photos")
+    history_dir = os.path.join(photos_dir, "history")
+    template_dir = os.path.join(workdir, "history_template")
+    os.makedirs(photos_dir)
+    # shard N photos once, every run starts again from a copy of these shards
+    with open(os.path.join(photos_dir, "photos.json"), "w") as f:
+        json.dump(waste_photos(rows), f)
+    with working_directory(workdir), contextlib.redirect_stdout(io.StringIO()):
+        archive_history()
+    shutil.move(history_dir, template_dir)
+    # half of the current photos are already archived
+    photos_text = json.dumps(waste_photos(50, start=rows - 25))
+
+    def reset():
+        shutil.rmtree(history_dir, ignore_errors=True)
+        shutil.copytree(template_dir, history_dir)
+        with open(os.path.join(photos_dir, "photos.json"), "w") as f:
+            f.write(photos_text)
+
+    def run():
+        with working_directory(workdir):
+            archive_history()
+    return run, reset
+
+
+def setup_training(train):
+    def setup(rows, workdir):
+        training_frame(rows).to_csv(os.path.join(workdir, "flood_risk_dataset_india_modified.csv"), index=False)
+
+        def run():
+            with working_directory(workdir):
+                train()
+        return run, None
+    return setup
+
+
+def _train_simple():
+    from train_simple_models import train_models
+    train_models()
+
+
+def _train_deep():
+    from train_deep_model import train_deep_model
+    train_deep_model()
+
+
+# name -> (setup, depends on the number of rows)
+STAGES = {
+    "store_append": (setup_store_append, True),
+    "predict_single": (setup_predict_single, False),
+    "predict_batch": (setup_predict_batch, True),
+    "analyze_single": (setup_analyze_single, False),
+    "analyze_batch": (setup_analyze_batch, True),
+    "archive_merge": (setup_archive_merge, True),
+    "train_simple": (setup_training(_train_simple), True),
+    "train_deep": (setup_training(_train_deep), True),
+}
+
+
+# -------------------------------
+# Running
+# -------------------------------
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def measure(run, reset=None, max_runs=MAX_RUNS, budget=TIME_BUDGET):
+    timings = []
+    # fast stages get many runs for a stable median, slow ones a single run
+    while len(timings) < max_runs and (not timings or sum(timings) < budget):
+        if reset is not None:
+            reset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "runs": len(timings)}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=None, limits=True):
+    import sklearn
+
+    results = {}
+    for name in stages or STAGES:
+        setup, scales = STAGES[name]
+        for size in (sizes if scales else sizes[:1]):
+            rows = SIZES[size] if scales else 1
+            key = f"{name}@{size if scales else 1}"
+            if limits and rows > MAX_ROWS.get(name, rows):
+                print(f"{key:<24} skipped (above {MAX_ROWS[name]} rows, use --no-limits)")
+                continue
+            workdir = tempfile.mkdtemp(prefix="aura-bench-")
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run, reset = setup(rows, workdir)
+                results[key] = measure(run, reset)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            r = results[key]
+            print(f"{key:<24} median {r['median_s'] * 1000:10.2f} ms   min {r['min_s'] * 1000:10.2f} ms   runs {r['runs']}")
+
+    meta = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "sizes": list(sizes),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Print the stage-by-stage comparison; returns the keys that regressed."""
+    regressions = []
+    print(f"{'stage':<24} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for key, now in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            print(f"{key:<24} {'-':>12} {now['median_s'] * 1000:12.2f} {'new':>8}")
+            continue
+        change = now["median_s"] / before["median_s"] - 1 if before["median_s"] else 0.0
+        regressed = change > threshold and now["median_s"] - before["median_s"] > MIN_DELTA_S
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<24} {before['median_s'] * 1000:12.2f} {now['median_s'] * 1000:12.2f} "
+              f"{change:+8.0%}{'  REGRESSION' if regressed else ''}")
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed by more than {threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"No stage regressed by more than {threshold:.0%}.")
+    return regressions
+
+
+def _load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages and gate on regressions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help=f"comma separated ({', '.join(SIZES)})")
+    run_parser.add_argument("--stages", help=f"comma separated subset of: {', '.join(STAGES)}")
+    run_parser.add_argument("--no-limits", action="store_true", help="ignore the per-stage row caps")
+    run_parser.add_argument("--output", help="results file (default benchmarks/results/<date>.json)")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline afterwards")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="allowed slowdown as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(1 if compare(_load(args.baseline), _load(args.current), args.threshold) else 0)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    stages = [s for s in args.stages.split(",") if s] if args.stages else None
+    unknown = [s for s in sizes if s not in SIZES] + [s for s in stages or [] if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown sizes/stages: {', '.join(unknown)}")
+
+    report = run_benchmarks(sizes, stages, limits=not args.no_limits)
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        print()
+        sys.exit(1 if compare(_load(args.compare), report, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
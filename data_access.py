@@ -0,0 +1,352 @@
+"""
+Shared access to the Realtime Database for every script.
+
+One authenticated client per process and one read of each path per tick.
+store_sensor_data.py, analysis_firebase.py and analysis/analyze.py all used
+to initialise firebase_admin themselves and download sensors/latest on their
+own; now they go through get_client(), and run_tick.py fetches the snapshot
+once and hands it to all of them.
+
+Reads are conditional: the ETag of the last snapshot of every path is kept
+(in memory and in CACHE_DIR, so the next cron run has it too) and the
+database only sends the value again when it changed.
+
+Backends are pluggable:
+    FirebaseBackend   firebase_admin.db, the default
+    MemoryBackend     a dict tree with the same get/set/ETag and listen
+                      behaviour, for running the pipeline without a network
+With FIREBASE_DATABASE_EMULATOR_HOST set, FirebaseBackend talks to a local
+rtdb_emulator.py instead of the live database.
+
+Usage:
+    from data_access import get_client
+    client = get_client()
+    data = client.fetch("sensors/latest")
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from instrumentation import span
+
+DATABASE_URL = "https://aura-data-cb5bf-default-rtdb.asia-southeast1.firebasedatabase.app"
+SERVICE_ACCOUNT_FILE = "serviceAccountKey.json"
+CACHE_DIR = ".data_access_cache"
+
+
+# -------------------------------
+# Firebase Initialization
+# -------------------------------
+def initialize_firebase():
+    """Initialise firebase_admin once, from whichever credentials are available.
+
+    FIREBASE_KEY (the workflows), FIREBASE_SERVICE_ACCOUNT_JSON or a
+    serviceAccountKey.json in the working directory, in that order.
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return
+
+    # the SDK talks to a local emulator (rtdb_emulator.py) without credentials
+    emulator_host = os.environ.get("FIREBASE_DATABASE_EMULATOR_HOST")
+    if emulator_host:
+        firebase_admin.initialize_app(options={"databaseURL": os.environ.get("FIREBASE_DATABASE_URL") or DATABASE_URL})
+        print(f"✓ Firebase initialized against the emulator at {emulator_host}")
+        return
+
+    env_name = next((name for name in ("FIREBASE_KEY", "FIREBASE_SERVICE_ACCOUNT_JSON") if os.environ.get(name)), None)
+    if env_name:
+        key_dict = json.loads(os.environ[env_name])
+        cred = credentials.Certificate(key_dict)
+        source = env_name
+    elif os.path.exists(SERVICE_ACCOUNT_FILE):
+        key_dict = {}
+        cred = credentials.Certificate(SERVICE_ACCOUNT_FILE)
+        source = SERVICE_ACCOUNT_FILE
+    else:
+        raise ValueError("Firebase credentials not found. Set FIREBASE_KEY (or FIREBASE_SERVICE_ACCOUNT_JSON) "
+                         f"or place {SERVICE_ACCOUNT_FILE} in the working directory.")
+
+    database_url = key_dict.get("databaseURL") or os.environ.get("FIREBASE_DATABASE_URL") or DATABASE_URL
+    firebase_admin.initialize_app(cred, {"databaseURL": database_url})
+    print(f"✓ Firebase initialized from {source}")
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+class FirebaseBackend:
+    """firebase_admin.db; the app is initialised on first use."""
+
+    def _ref(self, path):
+        from firebase_admin import db
+
+        initialize_firebase()
+        return db.reference(path)
+
+    def get(self, path):
+        # (value, etag)
+        return self._ref(path).get(etag=True)
+
+    def get_if_changed(self, path, etag):
+        # (changed, value, etag); value is None when nothing changed
+        return self._ref(path).get_if_changed(etag)
+
+    def keys(self, path):
+        return sorted(self._ref(path).get(shallow=True) or {})
+
+    def set(self, path, value):
+        self._ref(path).set(value)
+
+    def listen(self, path, callback):
+        return self._ref(path).listen(callback)
+
+
+def _etag(value):
+    return hashlib.md5(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MemoryEvent:
+    """What a listen() callback receives, like firebase_admin.db.Event."""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class MemoryRegistration:
+    """Returned by MemoryBackend.listen(); close() stops the callbacks."""
+
+    def __init__(self, backend, listener):
+        self._backend = backend
+        self._listener = listener
+
+    def close(self):
+        with self._backend._lock:
+            if self._listener in self._backend._listeners:
+                self._backend._listeners.remove(self._listener)
+
+
+class MemoryBackend:
+    """In-process database tree with content-hash ETags.
+
+    `latency` seconds are slept on every call to stand in for the network.
+    listen() callbacks run on the thread that called set() or delete(),
+    after the change is applied.
+    """
+
+    def __init__(self, data=None, latency=0.0):
+        self.data = data if data is not None else {}
+        self.latency = latency
+        self.reads = 0            # reads that returned a value
+        self._lock = threading.Lock()
+        self._listeners = []      # (path parts, callback)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _parts(self, path):
+        return [part for part in path.strip("/").split("/") if part]
+
+    def _node(self, path):
+        node = self.data
+        for part in self._parts(path):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def get(self, path):
+        self._wait()
+        with self._lock:
+            value = json.loads(json.dumps(self._node(path)))
+            self.reads += 1
+        return value, _etag(value)
+
+    def get_if_changed(self, path, etag):
+        self._wait()
+        with self._lock:
+            value = self._node(path)
+            current = _etag(value)
+            if current == etag:
+                return False, None, etag
+            self.reads += 1
+            return True, json.loads(json.dumps(value)), current
+
+    def keys(self, path):
+        self._wait()
+        with self._lock:
+            node = self._node(path)
+            return sorted(node) if isinstance(node, dict) else []
+
+    def _events(self, parts):
+        # 'put' events for the listeners at, above or below the changed path; call with the lock held
+        events = []
+        for listen_parts, callback in self._listeners:
+            if parts[:len(listen_parts)] == listen_parts:
+                relative = "/" + "/".join(parts[len(listen_parts):])
+                data = self._node("/".join(parts))
+            elif listen_parts[:len(parts)] == parts:
+                relative = "/"
+                data = self._node("/".join(listen_parts))
+            else:
+                continue
+            events.append((callback, MemoryEvent("put", relative, json.loads(json.dumps(data)))))
+        return events
+
+    def _notify(self, events):
+        # outside the lock, a callback may read or write the tree
+        for callback, event in events:
+            callback(event)
+
+    def set(self, path, value):
+        self._wait()
+        parts = self._parts(path)
+        with self._lock:
+            if not parts:
+                self.data = json.loads(json.dumps(value))
+            else:
+                node = self.data
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {})
+                node[parts[-1]] = json.loads(json.dumps(value))
+            events = self._events(parts)
+        self._notify(events)
+
+    def delete(self, path):
+        self._wait()
+        parts = self._parts(path)
+        with self._lock:
+            if not parts:
+                self.data = {}
+            else:
+                parent = self._node("/".join(parts[:-1]))
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+            events = self._events(parts)
+        self._notify(events)
+
+    def listen(self, path, callback):
+        """Call callback(event) with the current value now and again on every change under path."""
+        listener = (self._parts(path), callback)
+        with self._lock:
+            self._listeners.append(listener)
+            initial = MemoryEvent("put", "/", json.loads(json.dumps(self._node(path))))
+        callback(initial)
+        return MemoryRegistration(self, listener)
+
+
+# -------------------------------
+# Client
+# -------------------------------
+class DataAccess:
+    """Conditional, per-tick cached reads on top of a backend.
+
+    Within one tick a path is read at most once; call new_tick() at the start
+    of every polling cycle. Across ticks the stored ETag turns a read of an
+    unchanged path into a "not modified" answer.
+    """
+
+    def __init__(self, backend=None, cache_dir=CACHE_DIR):
+        self.backend = backend or FirebaseBackend()
+        self.cache_dir = cache_dir
+        self.stats = {"full_reads": 0, "not_modified": 0, "tick_hits": 0}
+        self._known = {}      # path -> (etag, value), survives ticks
+        self._tick = {}       # path -> changed flag, cleared by new_tick()
+        self._lock = threading.Lock()
+
+    def new_tick(self):
+        with self._lock:
+            self._tick = {}
+
+    def _cache_file(self, path):
+        name = path.strip("/").replace("/", "__") or "root"
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def _load_known(self, path):
+        if path in self._known or not self.cache_dir:
+            return self._known.get(path)
+        try:
+            with open(self._cache_file(path), "r") as f:
+                cached = json.load(f)
+            self._known[path] = (cached["etag"], cached["value"])
+        except (OSError, ValueError, KeyError):
+            return None
+        return self._known[path]
+
+    def _save_known(self, path, etag, value):
+        self._known[path] = (etag, value)
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        target = self._cache_file(path)
+        with open(target + ".tmp", "w") as f:
+            json.dump({"etag": etag, "value": value}, f)
+        os.replace(target + ".tmp", target)
+
+    def fetch(self, path="sensors/latest"):
+        """The value at `path`, reading the database at most once per tick."""
+        with self._lock:
+            if path in self._tick:
+                self.stats["tick_hits"] += 1
+                return self._known[path][1]
+            known = self._load_known(path)
+
+        # the network call runs outside the lock so different paths are read concurrently
+        with span("fetch"):
+            if known is None:
+                value, etag = self.backend.get(path)
+                changed = True
+            else:
+                changed, value, etag = self.backend.get_if_changed(path, known[0])
+                if not changed:
+                    value = known[1]
+
+        with self._lock:
+            self.stats["full_reads" if changed else "not_modified"] += 1
+            if changed:
+                self._save_known(path, etag, value)
+            self._tick[path] = changed
+        return value
+
+    def changed(self, path="sensors/latest"):
+        """Whether this tick's fetch(path) returned a different value than the last one."""
+        return self._tick.get(path, True)
+
+    def keys(self, path):
+        return self.backend.keys(path)
+
+    def set(self, path, value):
+        with span("upload"):
+            self.backend.set(path, value)
+
+    def listen(self, path, callback):
+        return self.backend.listen(path, callback)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide DataAccess, created with the Firebase backend on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DataAccess()
+        return _client
+
+
+def set_client(client):
+    """Replace the process-wide client, e.g. with DataAccess(MemoryBackend(...))."""
+    global _client
+    with _client_lock:
+        _client = client
+    return client
@@ -0,0 +1,328 @@
+"""
+Long-running ingest mode for sensor readings.
+
+Instead of polling sensors/latest from cron, the daemon subscribes to change
+events from an event source, micro-batches the readings into storage
+(segmented log, columnar store and the sensor_data.csv view) and then fans
+every reading out to the downstream stages.
+
+Event sources are pluggable so the daemon can run without a network:
+    FirebaseEventSource   listens to a Realtime Database path
+    MemoryEventSource     readings pushed in-process (tests, other producers)
+    ReplayEventSource     replays a sensor_data.csv-style file
+
+Usage:
+    python ingest_daemon.py                                  # listen to Firebase
+    python ingest_daemon.py --replay public/sensor_data.csv  # replay a file
+
+A replay writes to a fresh temporary directory (log, store, csv view,
+rollups and state files) and only runs the rules stage, so it never adds the
+replayed rows to the production history. --output-dir picks the directory,
+--log-dir/--store-dir/--csv redirect single outputs.
+"""
+
+import argparse
+import csv
+import os
+import functools
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+import instrumentation
+from store_sensor_data import make_reading, store_readings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "SensorDataMLAnalysis"))
+from predict_flood_risk import load_model_info, predict_reading
+
+BATCH_SIZE = 20           # flush after this many readings...
+FLUSH_INTERVAL = 5.0      # ...or after this many seconds, whichever comes first
+FIREBASE_PATH = "sensors/latest"
+
+
+# -------------------------------
+# Event Sources
+# -------------------------------
+class MemoryEventSource:
+    """In-process source; push() snapshots and they are delivered in order."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def push(self, data, timestamp=None):
+        self._queue.put((data, timestamp))
+
+    def close(self):
+        # tells the delivery thread that no more events will come
+        self._queue.put(None)
+
+    def start(self, callback):
+        def run():
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                callback(*item)
+
+        self._thread = threading.Thread(target=run, name="memory-event-source", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.close()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class ReplayEventSource(MemoryEventSource):
+    """Replays rows of a sensor_data.csv file, optionally paced by `delay` seconds."""
+
+    def __init__(self, csv_path, delay=0.0):
+        super().__init__()
+        self.csv_path = csv_path
+        self.delay = delay
+
+    def start(self, callback):
+        super().start(callback)
+
+        def feed():
+            with open(self.csv_path, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self.push(row, row.get("timestamp"))
+                    if self.delay:
+                        time.sleep(self.delay)
+            self.close()
+
+        threading.Thread(target=feed, name="replay-feeder", daemon=True).start()
+
+
+class FirebaseEventSource:
+    """Subscribes to a Realtime Database path with Reference.listen()."""
+
+    def __init__(self, path=FIREBASE_PATH):
+        self.path = path
+        self._registration = None
+        self._snapshot = {}
+
+    def start(self, callback):
+        from data_access import get_client
+
+        def listener(event):
+            # 'put' on the root replaces the snapshot, other events update one child
+            if event.path == "/":
+                if event.event_type == "put" or not isinstance(event.data, dict):
+                    self._snapshot = dict(event.data or {})
+                else:
+                    self._snapshot.update(event.data)
+            else:
+                key = event.path.strip("/").split("/")[0]
+                if event.event_type == "patch" and isinstance(event.data, dict):
+                    self._snapshot.setdefault(key, {}).update(event.data)
+                else:
+                    self._snapshot[key] = event.data
+            if self._snapshot:
+                callback(dict(self._snapshot), None)
+
+        self._registration = get_client().listen(self.path, listener)
+
+    def stop(self):
+        if self._registration is not None:
+            self._registration.close()
+            self._registration = None
+
+    def join(self, timeout=None):
+        # listen() runs until stop() is called
+        while self._registration is not None:
+            time.sleep(1 if timeout is None else min(timeout, 1))
+
+
+# -------------------------------
+# Micro-batching
+# -------------------------------
+class IngestDaemon:
+    """Collects readings from a source and flushes them in micro-batches.
+
+    `store` receives each batch (a list of readings) once; every stage in
+    `stages` is then called with each reading of the batch, in order.
+    """
+
+    def __init__(self, source, store=store_readings, stages=None,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.source = source
+        self.store = store
+        self.stages = stages or []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.readings_in = 0
+        self.batches_out = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        # one flush at a time: the log, store and state files have a single writer
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher = None
+
+    def _on_event(self, data, timestamp):
+        if not data:
+            return
+        reading = make_reading(data, timestamp)
+        with self._lock:
+            self._pending.append(reading)
+            self.readings_in += 1
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        # a full batch (event thread) and the timer (flusher thread) can both get here,
+        # the batches are stored and staged one after the other, in the order they were taken
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            with instrumentation.span("store"):
+                self.store(batch)
+            self.batches_out += 1
+            for reading in batch:
+                for stage in self.stages:
+                    try:
+                        with instrumentation.span(getattr(stage, "__name__", "stage")):
+                            stage(reading)
+                    except Exception as e:
+                        # one failing stage should not stop ingestion
+                        print(f"Stage {getattr(stage, '__name__', stage)} failed: {e}")
+            return len(batch)
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        self._flusher = threading.Thread(target=self._flush_periodically, name="ingest-flusher", daemon=True)
+        self._flusher.start()
+        self.source.start(self._on_event)
+
+    def stop(self):
+        self.source.stop()
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def run_until_done(self):
+        """Block until the source is exhausted (or Ctrl+C), then flush what is left."""
+        self.start()
+        try:
+            self.source.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+# -------------------------------
+# Downstream Stages
+# -------------------------------
+_model_info = None
+
+
+def load_prediction_model():
+    """Select and load the model once; every reading is scored with it until the daemon restarts."""
+    global _model_info
+    if _model_info is None:
+        _model_info = load_model_info()
+        print(f"Prediction model: {_model_info[0]} (Accuracy: {_model_info[1]:.2f})")
+    return _model_info
+
+
+def prediction_stage(reading):
+    # supervised model on the reading -> public/latest_flood_risk.json
+    predict_reading(reading, load_prediction_model())
+
+
+def anomaly_stage(reading):
+    # IsolationForest result -> sensors/floodResult
+    from analysis_firebase import analyse_reading
+
+    analyse_reading(reading)
+
+
+def rule_stage(reading):
+    # threshold-based risk from analysis/analyze.py
+    from analysis.analyze import analyze_flood_risk
+
+    analysis = analyze_flood_risk(reading)
+    print(f"Rule-based risk at {reading['timestamp']}: {analysis['risk_level'].upper()} ({analysis['risk_score']}/100)")
+
+
+STAGES = {
+    "predict": prediction_stage,
+    "anomaly": anomaly_stage,
+    "rules": rule_stage,
+}
+
+
+def output_paths(output_dir):
+    """store_readings() paths for everything written under output_dir instead of data/ and public/."""
+    return {
+        "csv_file": os.path.join(output_dir, "sensor_data.csv"),
+        "log_dir": os.path.join(output_dir, "sensor_log"),
+        "store_dir": os.path.join(output_dir, "sensor_store"),
+        "rollup_dir": os.path.join(output_dir, "rollups"),
+        "feature_state": os.path.join(output_dir, "feature_state.json"),
+        "forecast_state": os.path.join(output_dir, "forecast_state.json"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream sensor readings into storage and the analysis stages.")
+    parser.add_argument("--replay", metavar="CSV", help="replay a sensor_data.csv file instead of listening to Firebase")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between replayed rows")
+    parser.add_argument("--path", default=FIREBASE_PATH, help="Realtime Database path to listen to")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL)
+    parser.add_argument("--stages",
+                        help=f"comma separated stages to run per reading ({', '.join(STAGES)}); empty for none "
+                             "(default: all of them, only rules with --replay)")
+    parser.add_argument("--output-dir", help="write the log, store, csv view, rollups and state files here "
+                                             "(default: the production paths, a new temporary directory with --replay)")
+    parser.add_argument("--log-dir", help="segmented log directory")
+    parser.add_argument("--store-dir", help="columnar store directory")
+    parser.add_argument("--csv", help="sensor_data.csv view to write")
+    args = parser.parse_args()
+
+    if args.stages is None:
+        # predict and anomaly publish results, a replay should not overwrite the live ones
+        args.stages = "rules" if args.replay else "predict,anomaly,rules"
+    stages = [STAGES[name] for name in args.stages.split(",") if name]
+    if args.replay:
+        source = ReplayEventSource(args.replay, args.delay)
+        if args.output_dir is None:
+            args.output_dir = tempfile.mkdtemp(prefix="ingest-replay-")
+    else:
+        source = FirebaseEventSource(args.path)
+
+    paths = output_paths(args.output_dir) if args.output_dir else {}
+    for key, value in (("log_dir", args.log_dir), ("store_dir", args.store_dir), ("csv_file", args.csv)):
+        if value:
+            paths[key] = value
+    if args.output_dir:
+        print(f"Writing storage outputs under {args.output_dir}")
+
+    instrumentation.enable("ingest_daemon")
+    if prediction_stage in stages:
+        load_prediction_model()
+    daemon = IngestDaemon(source, store=functools.partial(store_readings, **paths), stages=stages,
+                          batch_size=args.batch_size, flush_interval=args.flush_interval)
+    print(f"Ingest daemon started (batch size {args.batch_size}, flush every {args.flush_interval}s)")
+    daemon.run_until_done()
+    print(f"Ingest daemon stopped. Readings: {daemon.readings_in}, batches: {daemon.batches_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Lightweight timing and resource spans for the pipeline scripts.
+
+    from instrumentation import enable, span
+
+    enable("predict_flood_risk")        # once, in main()
+    with span("model_load"):
+        ...
+
+Every span records wall time, CPU time of the calling thread and the
+process' peak RSS so far when it ends (process_peak_rss_bytes: ru_maxrss is
+process-wide and never goes down, so it is a high-water mark, not memory
+used by the span itself); nested spans are named parent/child and
+repeated spans are aggregated (count, total, max). Recording is a few
+microseconds per span, and nothing is written unless enable() was called.
+At exit the run is appended to a rolling metrics file (the last MAX_RUNS
+runs of every script):
+
+    public/pipeline_metrics.json        or $PIPELINE_METRICS_FILE
+
+and, when $PIPELINE_METRICS_PROM_DIR is set, to <dir>/aura_<script>.prom in
+the Prometheus text format for the node_exporter textfile collector.
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_FILE = os.environ.get("PIPELINE_METRICS_FILE") or os.path.join(ROOT_DIR, "public", "pipeline_metrics.json")
+PROM_DIR = os.environ.get("PIPELINE_METRICS_PROM_DIR")
+MAX_RUNS = 200
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans = {}
+_run = None
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _record(name, wall, cpu):
+    rss = peak_rss_bytes()
+    with _lock:
+        entry = _spans.get(name)
+        if entry is None:
+            _spans[name] = {"count": 1, "wall_s": wall, "cpu_s": cpu, "max_wall_s": wall,
+                            "process_peak_rss_bytes": rss}
+        else:
+            entry["count"] += 1
+            entry["wall_s"] += wall
+            entry["cpu_s"] += cpu
+            entry["max_wall_s"] = max(entry["max_wall_s"], wall)
+            entry["process_peak_rss_bytes"] = rss
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the enclosed block under `name` (prefixed by any enclosing span)."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    full_name = f"{stack[-1]}/{name}" if stack else name
+    stack.append(full_name)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        _record(full_name, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+        stack.pop()
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(script, metrics_file=None, prom_dir=None):
+    """Start a run for `script`; its metrics are written when the process exits."""
+    global _run
+    if _run is not None:
+        return
+    _run = {
+        "script": script,
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "wall_start": time.perf_counter(),
+        "cpu_start": time.process_time(),
+        "metrics_file": metrics_file or METRICS_FILE,
+        "prom_dir": prom_dir or PROM_DIR,
+    }
+    atexit.register(flush)
+
+
+def snapshot():
+    """The current run as it would be written."""
+    with _lock:
+        spans = [{"name": name, **values} for name, values in _spans.items()]
+    return {
+        "script": _run["script"] if _run else None,
+        "started": _run["started"] if _run else None,
+        "wall_s": time.perf_counter() - _run["wall_start"] if _run else None,
+        "cpu_s": time.process_time() - _run["cpu_start"] if _run else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "spans": spans,
+    }
+
+
+def _write_json(run, path):
+    runs = []
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                runs = json.load(f).get("runs", [])
+        except (OSError, ValueError):
+            runs = []
+    runs = (runs + [run])[-MAX_RUNS:]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"updated": run["started"], "runs": runs}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _prom_labels(**labels):
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in labels.values())
+    return ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped))
+
+
+def _write_prom(run, prom_dir):
+    script = run["script"]
+    lines = [
+        "# HELP aura_pipeline_run_wall_seconds Wall time of the last run.",
+        "# TYPE aura_pipeline_run_wall_seconds gauge",
+        f"aura_pipeline_run_wall_seconds{{{_prom_labels(script=script)}}} {run['wall_s']:.6f}",
+        "# HELP aura_pipeline_run_cpu_seconds CPU time of the last run.",
+        "# TYPE aura_pipeline_run_cpu_seconds gauge",
+        f"aura_pipeline_run_cpu_seconds{{{_prom_labels(script=script)}}} {run['cpu_s']:.6f}",
+        "# HELP aura_pipeline_run_timestamp_seconds When the last run finished.",
+        "# TYPE aura_pipeline_run_timestamp_seconds gauge",
+        f"aura_pipeline_run_timestamp_seconds{{{_prom_labels(script=script)}}} {time.time():.0f}",
+    ]
+    if run["peak_rss_bytes"] is not None:
+        lines += [
+            "# HELP aura_pipeline_peak_rss_bytes Peak resident memory of the last run.",
+            "# TYPE aura_pipeline_peak_rss_bytes gauge",
+            f"aura_pipeline_peak_rss_bytes{{{_prom_labels(script=script)}}} {run['peak_rss_bytes']}",
+        ]
+    for metric, key, help_text in (("span_wall_seconds", "wall_s", "Total wall time per span in the last run."),
+                                   ("span_cpu_seconds", "cpu_s", "Total thread CPU time per span in the last run."),
+                                   ("span_count", "count", "Times each span ran in the last run.")):
+        lines += [f"# HELP aura_pipeline_{metric} {help_text}", f"# TYPE aura_pipeline_{metric} gauge"]
+        for s in run["spans"]:
+            lines.append(f"aura_pipeline_{metric}{{{_prom_labels(script=script, span=s['name'])}}} {s[key]}")
+
+    os.makedirs(prom_dir, exist_ok=True)
+    path = os.path.join(prom_dir, f"aura_{script}.prom")
+    # the textfile collector may read at any time, so swap the file in whole
+    with open(path + ".tmp", "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def flush(restart=False):
+    """Write the run to the metrics file (and Prometheus file); called automatically at exit.
+
+    Long-running loops call flush(restart=True) after every tick, which writes
+    the tick as its own run and starts the next one.
+    """
+    if _run is None or _run.get("flushed"):
+        return
+    run = snapshot()
+    if restart:
+        with _lock:
+            _spans.clear()
+        _run.update(started=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    wall_start=time.perf_counter(), cpu_start=time.process_time())
+    else:
+        _run["flushed"] = True
+    try:
+        _write_json(run, _run["metrics_file"])
+        if _run["prom_dir"]:
+            _write_prom(run, _run["prom_dir"])
+    except OSError as e:
+        print(f"Could not write pipeline metrics: {e}")
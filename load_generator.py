@@ -0,0 +1,229 @@
+"""
+End-to-end load test of the station pipeline without the live database.
+
+Synthetic readings are written to stations/<id>/latest of an in-memory
+database (optionally served over localhost HTTP by rtdb_emulator.py, so the
+real firebase_admin client is in the loop) at a fixed rate, while the
+pipeline from stations.py polls, stores and scores them tick after tick.
+Each rate level reports:
+    offered/s     readings written per second
+    processed/s   readings that made it through the pipeline per second
+    dropped       readings overwritten before a tick picked them up
+    tick          time for one pass over all stations
+    e2e           write -> end of the tick that processed it
+    stages        p50/p95 per stage (fetch, store, predict, rules, anomaly)
+The first level where processed/s falls below 90% of offered/s is reported
+as the saturation point.
+
+Outputs go to a temporary directory, the repository data is not touched.
+
+Usage:
+    python load_generator.py --stations 20 --rates 10,50,100,200 --duration 10
+    python load_generator.py --http --latency-ms 20 --output load_report.json
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import stations
+from data_access import DataAccess, FirebaseBackend, MemoryBackend, set_client
+
+SATURATION_RATIO = 0.9
+
+
+def synthetic_reading(rng, sent_at):
+    return {
+        "humidity": round(rng.uniform(40, 100), 1),
+        "rainfall": round(rng.uniform(0, 80), 1),
+        "temperature": round(rng.uniform(22, 34), 1),
+        "waterLevel": round(rng.uniform(0, 200), 1),
+        "sentAt": sent_at,
+    }
+
+
+class Producer:
+    """Writes readings round-robin over the stations at `rate` per second."""
+
+    def __init__(self, backend, station_ids, rate, seed=0):
+        self.backend = backend
+        self.station_ids = station_ids
+        self.rate = rate
+        self.produced = 0
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = None
+        # writes go through a pool so backend latency does not throttle the rate
+        self._pool = ThreadPoolExecutor(max_workers=8)
+
+    def _run(self):
+        interval = 1.0 / self.rate
+        next_at = time.perf_counter()
+        for station_id in itertools.cycle(self.station_ids):
+            if self._stop.is_set():
+                break
+            reading = synthetic_reading(self._rng, time.time())
+            self._pool.submit(self.backend.set, stations.latest_path(station_id), reading)
+            self.produced += 1
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="load-producer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+
+def percentiles(values):
+    if not values:
+        return None
+    return {"p50_ms": float(np.percentile(values, 50)) * 1000, "p95_ms": float(np.percentile(values, 95)) * 1000}
+
+
+def run_level(client, backend, station_ids, rate, duration, model_info, workers, anomaly):
+    sent = {}
+
+    def fetch(path):
+        # remember when the reading we got was written, for the end-to-end latency
+        data = client.fetch(path)
+        if data and client.changed(path):
+            sent[path] = data.get("sentAt")
+        return data
+
+    producer = Producer(backend, station_ids, rate)
+    processed = 0
+    ticks, e2e, stage_times = [], [], {}
+    producer.start()
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        client.new_tick()
+        with contextlib.redirect_stdout(io.StringIO()):
+            index = stations.run_stations(station_ids, fetch=fetch, max_workers=workers, anomaly=anomaly,
+                                          skip_unchanged=True, model_info=model_info)
+        tick_end = time.time()
+        ticks.append(index["tick_seconds"])
+        for entry in index["stations"]:
+            if entry["status"] != "ok" or "stages" not in entry:
+                continue
+            # skip entries carried over from an earlier tick
+            sent_at = sent.pop(stations.latest_path(entry["station"]), None)
+            if sent_at is None:
+                continue
+            processed += 1
+            e2e.append(tick_end - sent_at)
+            for stage, seconds in entry["stages"].items():
+                stage_times.setdefault(stage, []).append(seconds)
+    elapsed = time.perf_counter() - started
+    producer.stop()
+
+    return {
+        "rate": rate,
+        "offered_per_s": producer.produced / elapsed,
+        "processed_per_s": processed / elapsed,
+        "produced": producer.produced,
+        "processed": processed,
+        "dropped": max(producer.produced - processed, 0),
+        "ticks": len(ticks),
+        "tick": percentiles(ticks),
+        "e2e": percentiles(e2e),
+        "stages": {stage: percentiles(values) for stage, values in stage_times.items()},
+    }
+
+
+def _ms(stats, key="p50_ms"):
+    return f"{stats[key]:.1f}" if stats else "-"
+
+
+def print_report(levels, saturation):
+    print(f"{'rate/s':>7} {'offered/s':>10} {'processed/s':>12} {'dropped':>8} {'tick p50':>9} "
+          f"{'e2e p50':>8} {'e2e p95':>8}  stages p50/p95 ms")
+    for level in levels:
+        stages_text = ", ".join(f"{stage} {_ms(s)}/{_ms(s, 'p95_ms')}" for stage, s in level["stages"].items())
+        print(f"{level['rate']:>7g} {level['offered_per_s']:>10.1f} {level['processed_per_s']:>12.1f} "
+              f"{level['dropped']:>8} {_ms(level['tick']):>9} {_ms(level['e2e']):>8} "
+              f"{_ms(level['e2e'], 'p95_ms'):>8}  {stages_text}")
+    if saturation is None:
+        print("The pipeline kept up with every rate tried.")
+    else:
+        print(f"Saturation at about {saturation['rate']:g} readings/s: "
+              f"processed {saturation['processed_per_s']:.1f}/s of {saturation['offered_per_s']:.1f}/s offered.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the station pipeline against a local database.")
+    parser.add_argument("--stations", type=int, default=20, help="number of synthetic stations")
+    parser.add_argument("--rates", default="10,50,100,200", help="comma separated readings/s to try, in order")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per rate level")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated database latency per call")
+    parser.add_argument("--http", action="store_true",
+                        help="serve the database with rtdb_emulator.py and go through firebase_admin")
+    parser.add_argument("--workers", type=int, default=stations.MAX_WORKERS)
+    parser.add_argument("--anomaly", action="store_true", help="include the anomaly detection stage")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    station_ids = [f"station-{i:03d}" for i in range(args.stations)]
+    backend = MemoryBackend({"stations": {sid: {} for sid in station_ids}}, latency=args.latency_ms / 1000)
+    server = None
+    if args.http:
+        from rtdb_emulator import start_emulator
+        server, host = start_emulator(backend)
+        os.environ["FIREBASE_DATABASE_EMULATOR_HOST"] = host
+        client = DataAccess(FirebaseBackend(), cache_dir=None)
+    else:
+        client = DataAccess(backend, cache_dir=None)
+    set_client(client)
+
+    # keep the per-station outputs out of the repository
+    workdir = tempfile.mkdtemp(prefix="aura-load-")
+    stations.DATA_DIR = os.path.join(workdir, "data")
+    stations.PUBLIC_DIR = os.path.join(workdir, "public")
+    stations.INDEX_FILE = os.path.join(stations.PUBLIC_DIR, "index.json")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        model_info = stations.load_model_info()
+    print(f"{args.stations} stations, {args.duration:g}s per level, model {model_info[0]}, "
+          f"{'HTTP emulator' if args.http else 'in-process database'}, latency {args.latency_ms:g} ms")
+
+    levels, saturation = [], None
+    try:
+        for rate in [float(r) for r in args.rates.split(",") if r]:
+            level = run_level(client, backend, station_ids, rate, args.duration, model_info, args.workers, args.anomaly)
+            levels.append(level)
+            print(f"  {rate:g}/s -> {level['processed_per_s']:.1f}/s processed")
+            if saturation is None and level["processed_per_s"] < SATURATION_RATIO * level["offered_per_s"]:
+                saturation = level
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_report(levels, saturation)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"stations": args.stations, "duration": args.duration, "latency_ms": args.latency_ms,
+                       "http": args.http, "levels": levels,
+                       "saturation_rate": saturation["rate"] if saturation else None}, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
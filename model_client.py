@@ -0,0 +1,68 @@
+"""
+Thin client for SensorDataMLAnalysis/model_server.py.
+
+Scripts call predict() / score_anomaly() first and only load the pickled
+models themselves when these return None (server not running or failing).
+Set MODEL_SERVER_URL to point at another server, or to "off" to disable.
+"""
+
+import json
+import os
+import urllib.error
+import urllib.request
+
+MODEL_SERVER_URL = os.environ.get("MODEL_SERVER_URL", "http://127.0.0.1:8765")
+TIMEOUT_SECONDS = 2.0
+ANOMALY_MODEL = "isolation_forest"
+
+# remember a dead server so a long run does not wait on it for every reading
+_unreachable = False
+
+
+def _post(model, columns):
+    global _unreachable
+    if _unreachable or MODEL_SERVER_URL == "off":
+        return None
+    body = json.dumps({"model": model, "columns": columns}).encode("utf-8")
+    request = urllib.request.Request(f"{MODEL_SERVER_URL}/predict", data=body,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT_SECONDS) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        print(f"Model server error for {model}: {e.code} {e.read().decode('utf-8', 'replace')}")
+        return None
+    except (urllib.error.URLError, OSError) as e:
+        # only a refused connection means nothing is listening, other errors may be transient
+        if isinstance(getattr(e, "reason", e), ConnectionRefusedError):
+            _unreachable = True
+        return None
+
+
+def _columns(frame):
+    return {name: [float(v) for v in frame[name]] for name in frame.columns}
+
+
+def predict(model_name, input_features):
+    """(predictions, probabilities) lists for a feature DataFrame, or None if the server is unavailable."""
+    result = _post(model_name, _columns(input_features))
+    if result is None:
+        return None
+    return result["predictions"], result["probabilities"]
+
+
+def score_anomaly(features):
+    """(raw IsolationForest predictions, score_samples) lists, or None if the server is unavailable."""
+    result = _post(ANOMALY_MODEL, _columns(features))
+    if result is None:
+        return None
+    return result["predictions"], result["scores"]
+
+
+def stats():
+    """The server's /stats counters, or None."""
+    try:
+        with urllib.request.urlopen(f"{MODEL_SERVER_URL}/stats", timeout=TIMEOUT_SECONDS) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError):
+        return None
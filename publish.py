@@ -0,0 +1,167 @@
+"""
+Publish step for the files the website fetches from public/.
+
+For every artifact (see ARTIFACTS) this records its content hash in
+public/publish_manifest.json:
+
+    {"generated": "...", "files": {"sensor_data.csv": {"sha256": "...", "etag": "\"1f0c...\"",
+                                   "bytes": 43127, "gzip": 9512, "br": 8120, "updated": "..."}}}
+
+The frontend fetches the manifest (small, always revalidated) and then asks
+for each artifact as <path>?v=<hash>, so an unchanged file is served from
+the browser cache without a request.
+
+With --variants it also writes precompressed copies next to each artifact,
+for a host that serves them directly (nginx gzip_static/brotli_static, most
+CDNs). GitHub Pages does not, it compresses on the fly and would only
+upload the copies, so the deploy workflow leaves them out:
+
+    public/sensor_data.csv.gz       gzip -9, no timestamp so unchanged input gives identical bytes
+    public/sensor_data.csv.br       only when the brotli package is installed
+
+An artifact whose hash matches the previous manifest (and whose variants
+exist) is not rewritten. The manifest is not committed, so that only helps
+where public/ outlives a run (a server, local runs); the deploy job starts
+from a fresh checkout and hashes everything again, which is cheap.
+
+Usage:
+    python publish.py               # hash manifest for everything in ARTIFACTS
+    python publish.py --variants    # plus .gz/.br copies
+    python publish.py --force       # rewrite even unchanged files
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from instrumentation import enable, span
+
+PUBLIC_DIR = "public"
+MANIFEST_FILE = "publish_manifest.json"
+
+# globs relative to public/
+ARTIFACTS = [
+    "sensor_data.csv",
+    "latest_flood_risk.json",
+    "analysis/analysis_summary.json",
+    "analysis/analysis_summary.txt",
+    "analysis/analysis_graph.png",
+    "rollups/*.json",
+    "detected_waste_photos/photos.json",
+    "detected_waste_photos/history/manifest.json",
+    "detected_waste_photos/history/[0-9][0-9][0-9][0-9]-[0-9][0-9].json",
+    "stations/index.json",
+]
+# already compressed, a variant would only add bytes
+NO_VARIANTS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def _write(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _variants(name, enabled=True):
+    if not enabled or name.endswith(NO_VARIANTS):
+        return {}
+    variants = {"gzip": ".gz"}
+    if brotli is not None:
+        variants["br"] = ".br"
+    return variants
+
+
+def load_manifest(public_dir=PUBLIC_DIR):
+    path = os.path.join(public_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"Could not read {path}, starting a new one.")
+    return {"generated": None, "files": {}}
+
+
+def publish_file(public_dir, name, previous=None, force=False, variants=True):
+    """Hash (and compress) one artifact; returns (manifest entry, changed)."""
+    path = os.path.join(public_dir, name)
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    variants = _variants(name, variants)
+
+    if (not force and previous and previous.get("sha256") == digest
+            and all(os.path.exists(path + ext) for ext in variants.values())):
+        return previous, False
+
+    entry = {"sha256": digest, "etag": f'"{digest[:16]}"', "bytes": len(data)}
+    if "gzip" in variants:
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        _write(path + ".gz", packed)
+        entry["gzip"] = len(packed)
+    if "br" in variants:
+        packed = brotli.compress(data, quality=11)
+        _write(path + ".br", packed)
+        entry["br"] = len(packed)
+    entry["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return entry, True
+
+
+def publish(public_dir=PUBLIC_DIR, patterns=ARTIFACTS, force=False, variants=False):
+    """Publish every artifact matching patterns; returns the names that changed."""
+    manifest = load_manifest(public_dir)
+    files = {}
+    changed = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(public_dir, pattern))):
+            name = os.path.relpath(path, public_dir).replace(os.sep, "/")
+            entry, was_changed = publish_file(public_dir, name, manifest["files"].get(name), force, variants)
+            files[name] = entry
+            if was_changed:
+                changed.append(name)
+
+    # artifacts that disappeared lose their variants too
+    removed = [name for name in manifest["files"] if name not in files]
+    for name in removed:
+        for ext in (".gz", ".br"):
+            if os.path.exists(os.path.join(public_dir, name + ext)):
+                os.remove(os.path.join(public_dir, name + ext))
+
+    if changed or removed or not os.path.exists(os.path.join(public_dir, MANIFEST_FILE)):
+        manifest = {"generated": datetime.now(timezone.utc).isoformat(timespec="seconds"), "files": files}
+        _write(os.path.join(public_dir, MANIFEST_FILE), json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a hash manifest (and precompressed variants) for public/ artifacts.")
+    parser.add_argument("--public-dir", default=PUBLIC_DIR)
+    parser.add_argument("--variants", action="store_true",
+                        help="also write .gz/.br copies, for a host that serves them (GitHub Pages does not)")
+    parser.add_argument("--force", action="store_true", help="rewrite unchanged artifacts too")
+    args = parser.parse_args()
+
+    enable("publish")
+    with span("publish"):
+        changed = publish(args.public_dir, force=args.force, variants=args.variants)
+    if changed:
+        for name in changed:
+            print(f"Published {name}")
+    else:
+        print("All artifacts unchanged.")
+    if args.variants and brotli is None:
+        print("brotli is not installed, wrote gzip variants only.")
+
+
+if __name__ == "__main__":
+    main()
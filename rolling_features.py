@@ -0,0 +1,347 @@
+"""
+Rolling-window features of the sensor history: rain accumulation, means,
+deltas and rate of rise over the last 1, 3 and 24 hours (see WINDOWS).
+
+Per window and reading:
+    count_1h                  readings in the window (the reading itself included)
+    rainfall_sum_1h           sum of the rainfall readings
+    <channel>_mean_1h         mean of the channel
+    <channel>_delta_1h        newest value minus the oldest one still in the window
+    <channel>_slope_1h        least squares slope in units per hour, 0 until the
+                              window spans MIN_SLOPE_SPAN seconds
+
+The window (t - width, t] is time based, readings arrive every 10-30 minutes.
+
+Online, RollingFeatures keeps running sums per window (count, t, t^2, x and
+t*x per channel) and the row index of the oldest reading in each window. A
+new reading is added to the sums and the readings that fell out of a window
+are subtracted, so each update is O(1) amortized. The window contents are not
+copied anywhere: the columnar store (sensor_store.py) already holds every
+reading, so the windows are ranges of store rows and the checkpoint stays a
+few hundred bytes:
+
+    {"version": 1, "rows": 812, "last": 1767225600,
+     "windows": {"1h": {"start": 809, "sums": [...]}, ...}, "latest": {...}}
+
+batch_features() computes the same features for a whole history with NumPy.
+It replays the exact sequence of additions and subtractions the online
+engine performs as one cumulative sum, so the two agree bit for bit, not just
+approximately, and it is also how a missing checkpoint is rebuilt.
+
+    python rolling_features.py --batch public/sensor_data.csv --output features.csv
+    python rolling_features.py --check public/sensor_data.csv     # online (resumed halfway) vs batch
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from sensor_store import CHANNELS, to_epoch
+
+STATE_FILE = os.path.join("data", "feature_state.json")
+STATE_VERSION = 1
+
+WINDOWS = {'1h': 3600, '3h': 3 * 3600, '24h': 24 * 3600}
+MIN_SLOPE_SPAN = 600     # seconds between the oldest and newest reading before a slope is reported
+# times are hours since this anchor, keeps t^2 small enough for the running sums
+ANCHOR = to_epoch("2025-01-01 00:00:00")
+# feature names follow the model inputs (water_level, not waterLevel)
+FEATURE_NAMES = {'humidity': 'humidity', 'rainfall': 'rainfall', 'temperature': 'temperature',
+                 'waterLevel': 'water_level'}
+
+# running sums per window, in this order: count, t, t^2, then x and t*x per channel
+SUMS = ['n', 't', 'tt'] + [f"{kind}:{c}" for c in CHANNELS for kind in ('x', 'tx')]
+
+
+def feature_columns():
+    columns = []
+    for window in WINDOWS:
+        columns += [f"count_{window}", f"rainfall_sum_{window}"]
+        for c in CHANNELS:
+            columns += [f"{FEATURE_NAMES[c]}_{stat}_{window}" for stat in ('mean', 'delta', 'slope')]
+    return columns
+
+
+FEATURES = feature_columns()
+
+
+def _terms(t, values):
+    """The per-reading terms added to the running sums (same order as SUMS), scalars or arrays."""
+    terms = [1.0 if np.isscalar(t) else np.ones_like(t), t, t * t]
+    for c in CHANNELS:
+        terms += [values[c], t * values[c]]
+    return terms
+
+
+def _hours(epoch):
+    return (epoch - ANCHOR) / 3600
+
+
+def _window_features(out, window, sums, newest, oldest, span):
+    """Fill out[...] for one window from its sums; works on scalars and arrays alike."""
+    n, st, stt = sums[0], sums[1], sums[2]
+    out[f"count_{window}"] = n
+    den = n * stt - st * st
+    for k, c in enumerate(CHANNELS):
+        sx, stx = sums[3 + 2 * k], sums[4 + 2 * k]
+        name = FEATURE_NAMES[c]
+        if c == 'rainfall':
+            out[f"rainfall_sum_{window}"] = sx
+        out[f"{name}_mean_{window}"] = sx / n
+        out[f"{name}_delta_{window}"] = newest[c] - oldest[c]
+        num = n * stx - st * sx
+        if np.isscalar(span):
+            out[f"{name}_slope_{window}"] = num / den if span >= MIN_SLOPE_SPAN else 0.0
+        else:
+            slope = np.zeros_like(num)
+            np.divide(num, den, out=slope, where=span >= MIN_SLOPE_SPAN)
+            out[f"{name}_slope_{window}"] = slope
+
+
+def _columns_of(columns):
+    """{'timestamp': int64 epochs, channel: float64} from a store, a DataFrame or a dict of arrays."""
+    if hasattr(columns, "column"):
+        return {name: columns.column(name) for name in ['timestamp'] + CHANNELS}
+    timestamps = np.asarray(columns['timestamp'])
+    if timestamps.dtype.kind not in "iu":
+        timestamps = np.array([to_epoch(t) for t in timestamps], dtype=np.int64)
+    data = {'timestamp': timestamps}
+    for c in CHANNELS:
+        data[c] = np.asarray(columns[c], dtype=np.float64)
+    return data
+
+
+class RollingFeatures:
+    def __init__(self, state=None):
+        self.state = state or {"version": STATE_VERSION, "rows": 0, "last": None,
+                               "windows": {w: {"start": 0, "sums": [0.0] * len(SUMS)} for w in WINDOWS},
+                               "latest": None}
+
+    # -------------------------------
+    # Checkpoint
+    # -------------------------------
+    @classmethod
+    def load(cls, path=STATE_FILE):
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("version") == STATE_VERSION and set(state["windows"]) == set(WINDOWS):
+                    return cls(state)
+                print(f"Ignoring {path}: written by a different version.")
+            except (OSError, ValueError, KeyError):
+                print(f"Could not read {path}, rebuilding the features.")
+        return cls()
+
+    def save(self, path=STATE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, path)
+
+    def follows(self, columns):
+        """True when the checkpoint was built from the first rows of these columns."""
+        rows, last = self.state["rows"], self.state["last"]
+        return 0 < rows <= len(columns['timestamp']) and int(columns['timestamp'][rows - 1]) == last
+
+    # -------------------------------
+    # Online update
+    # -------------------------------
+    def update(self, columns, i):
+        """Add row i (the row after the last one added) and return its features."""
+        state = self.state
+        if i != state["rows"]:
+            raise ValueError(f"Expected row {state['rows']}, got {i}")
+        timestamps = columns['timestamp']
+        epoch = int(timestamps[i])
+        if state["last"] is not None and epoch < state["last"]:
+            raise ValueError("Readings must be added in timestamp order")
+        newest = {c: float(columns[c][i]) for c in CHANNELS}
+        added = _terms(_hours(epoch), newest)
+
+        features = {}
+        for window, width in WINDOWS.items():
+            entry = state["windows"][window]
+            sums = entry["sums"]
+            start = entry["start"]
+            # readings that left (t - width, t], subtracted before the new one is added
+            while start < i and int(timestamps[start]) <= epoch - width:
+                evicted = _terms(_hours(int(timestamps[start])), {c: float(columns[c][start]) for c in CHANNELS})
+                for k, term in enumerate(evicted):
+                    sums[k] -= term
+                start += 1
+            for k, term in enumerate(added):
+                sums[k] += term
+            entry["start"] = start
+            oldest = {c: float(columns[c][start]) for c in CHANNELS}
+            _window_features(features, window, sums, newest, oldest, epoch - int(timestamps[start]))
+
+        features = {name: features[name] for name in FEATURES}
+        for window in WINDOWS:
+            features[f"count_{window}"] = int(features[f"count_{window}"])
+        state["rows"] = i + 1
+        state["last"] = epoch
+        state["latest"] = features
+        return features
+
+
+# -------------------------------
+# Batch equivalent
+# -------------------------------
+def batch_features(columns):
+    """Features of every row, as the online engine would produce them one by one.
+
+    columns is a SensorStore, a DataFrame shaped like sensor_data.csv or a dict
+    of arrays. Returns (DataFrame with FEATURES, RollingFeatures positioned
+    after the last row).
+    """
+    import pandas as pd
+
+    data = _columns_of(columns)
+    epochs = data['timestamp'].astype(np.int64)
+    rows = len(epochs)
+    if np.any(np.diff(epochs) < 0):
+        raise ValueError("Readings must be in timestamp order")
+    engine = RollingFeatures()
+    if rows == 0:
+        return pd.DataFrame(columns=FEATURES), engine
+
+    values = {c: np.asarray(data[c], dtype=np.float64) for c in CHANNELS}
+    terms = _terms(_hours(epochs), values)
+    steps = np.arange(rows)
+    features = {}
+    for window, width in WINDOWS.items():
+        # first row inside (t - width, t] for every row
+        start = np.searchsorted(epochs, epochs - width, side="right")
+        # the online order of events: at row i the evictions of rows start[i-1]..start[i]-1,
+        # then the addition of row i. Row i is added at event start[i] + i, and row k
+        # (k < start[-1]) is evicted at event k + (the first row whose window starts after k).
+        added_at = start + steps
+        evicted = np.arange(start[-1])
+        evicted_at = evicted + np.searchsorted(start, evicted, side="right")
+        sums = []
+        for term in terms:
+            events = np.empty(rows + len(evicted))
+            events[added_at] = term
+            events[evicted_at] = -term[:len(evicted)]
+            # cumsum adds sequentially, the same float operations as the running sums
+            sums.append(np.cumsum(events)[added_at])
+
+        oldest = {c: values[c][start] for c in CHANNELS}
+        _window_features(features, window, sums, values, oldest, epochs - epochs[start])
+        engine.state["windows"][window] = {"start": int(start[-1]), "sums": [float(s[-1]) for s in sums]}
+
+    frame = pd.DataFrame({name: features[name] for name in FEATURES})
+    for window in WINDOWS:
+        frame[f"count_{window}"] = frame[f"count_{window}"].astype(np.int64)
+    engine.state["rows"] = rows
+    engine.state["last"] = int(epochs[-1])
+    engine.state["latest"] = {name: (int(v) if name.startswith("count_") else float(v))
+                              for name, v in frame.iloc[-1].items()}
+    return frame, engine
+
+
+def update_features(store, state_path=STATE_FILE):
+    """Bring the checkpoint at state_path up to date with the store; returns the newest features.
+
+    Only the rows added since the checkpoint are fed through, as long as the
+    store still starts with the rows it was built from. A store rebuilt from
+    a different history (in CI: the actions cache of data/sensor_store was
+    evicted and the log reseeded from public/sensor_data.csv) costs one batch
+    rebuild over that store, not over anything older.
+    """
+    columns = _columns_of(store)
+    rows = len(columns['timestamp'])
+    if rows == 0:
+        return None
+    engine = RollingFeatures.load(state_path)
+    if engine.follows(columns):
+        for i in range(engine.state["rows"], rows):
+            engine.update(columns, i)
+    else:
+        # first run, or the store was rebuilt: recompute from the whole history
+        _, engine = batch_features(columns)
+    engine.save(state_path)
+    return engine.state["latest"]
+
+
+def latest_features(state_path=STATE_FILE):
+    """The features of the newest stored reading, or None before the first update."""
+    if not os.path.exists(state_path):
+        return None
+    return RollingFeatures.load(state_path).state["latest"]
+
+
+# -------------------------------
+# Command line
+# -------------------------------
+def check(csv_path, resume_at=None):
+    """Feed a csv through the online engine row by row and compare with batch_features.
+
+    Halfway through (or at row resume_at) the engine is checkpointed and the
+    rest is fed to the engine loaded back from that file, as the next
+    scheduled run would.
+    """
+    import tempfile
+
+    import pandas as pd
+
+    columns = _columns_of(pd.read_csv(csv_path))
+    rows = len(columns['timestamp'])
+    resume_at = rows // 2 if resume_at is None else resume_at
+    started = time.perf_counter()
+    engine = RollingFeatures()
+    online = [engine.update(columns, i) for i in range(resume_at)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_path = os.path.join(tmp_dir, "feature_state.json")
+        engine.save(state_path)
+        engine = RollingFeatures.load(state_path)
+    online += [engine.update(columns, i) for i in range(resume_at, rows)]
+    online_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch, batch_engine = batch_features(columns)
+    batch_s = time.perf_counter() - started
+
+    mismatches = sum(1 for i, row in enumerate(online) for name in FEATURES
+                     if row[name] != batch[name].iat[i]
+                     and not (isinstance(row[name], float) and math.isnan(row[name]) and math.isnan(batch[name].iat[i])))
+    same_state = batch_engine.state == engine.state
+    print(f"{rows} readings, {len(FEATURES)} features")
+    print(f"  online {online_s / max(rows, 1) * 1e6:.1f} us/reading, batch {batch_s * 1e3:.1f} ms in total")
+    print(f"  mismatching values: {mismatches}, same checkpoint: {same_state}")
+    return mismatches == 0 and same_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-window features of the sensor readings.")
+    parser.add_argument("--batch", metavar="CSV", help="compute the features of every reading in a csv")
+    parser.add_argument("--output", help="where --batch writes the features (default: print the last rows)")
+    parser.add_argument("--check", metavar="CSV", help="check that online and batch features match")
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check(args.check) else 1)
+    if not args.batch:
+        parser.error("nothing to do, pass --batch or --check")
+
+    import pandas as pd
+
+    readings = pd.read_csv(args.batch)
+    features, _ = batch_features(readings)
+    features.insert(0, 'timestamp', readings['timestamp'].values)
+    if args.output:
+        features.to_csv(args.output, index=False)
+        print(f"Wrote {len(features)} rows of features to {args.output}")
+    else:
+        print(features.tail().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Local stand-in for the Realtime Database REST API.
+
+Serves a data_access.MemoryBackend over localhost HTTP with the subset of the
+REST protocol firebase_admin uses for reference().get()/set()/update()/
+delete(), ETag reads (X-Firebase-ETag, if-none-match) and shallow reads.
+Point the SDK at it with FIREBASE_DATABASE_EMULATOR_HOST and the unchanged
+scripts run against it instead of the live database:
+
+    python rtdb_emulator.py --port 9000 --seed seed.json
+    FIREBASE_DATABASE_EMULATOR_HOST=127.0.0.1:9000 python store_sensor_data.py
+
+Streaming (reference().listen()) is not supported.
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from data_access import MemoryBackend
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9000
+
+
+class EmulatorHTTPServer(ThreadingHTTPServer):
+    # the default backlog of 5 refuses connections under concurrent load
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, the SDK reuses its connections
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def _send(self, status, payload=None, etag=None):
+            body = b"" if status == 304 else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _target(self):
+            # /sensors/latest.json?ns=... -> (sensors/latest, {query})
+            url = urlparse(self.path)
+            path = url.path[:-len(".json")] if url.path.endswith(".json") else url.path
+            return path.strip("/"), parse_qs(url.query)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"null")
+
+        def do_GET(self):
+            path, query = self._target()
+            if self.headers.get("Accept") == "text/event-stream":
+                self._send(400, {"error": "streaming is not supported by the emulator"})
+                return
+            if query.get("shallow") == ["true"]:
+                value, _ = backend.get(path)
+                if isinstance(value, dict):
+                    value = {key: True for key in value}
+                self._send(200, value)
+                return
+
+            etag = self.headers.get("if-none-match")
+            if etag:
+                changed, value, current = backend.get_if_changed(path, etag)
+                if not changed:
+                    self._send(304, etag=etag)
+                    return
+            else:
+                value, current = backend.get(path)
+            self._send(200, value, etag=current)
+
+        def do_PUT(self):
+            path, _ = self._target()
+            try:
+                value = self._body()
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            backend.set(path, value)
+            self._send(200, value)
+
+        def do_PATCH(self):
+            path, _ = self._target()
+            try:
+                value = self._body()
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            if not isinstance(value, dict):
+                self._send(400, {"error": "update() needs an object"})
+                return
+            for key, child in value.items():
+                backend.set(f"{path}/{key}", child)
+            self._send(200, value)
+
+        def do_DELETE(self):
+            path, _ = self._target()
+            backend.delete(path)
+            self._send(200, None)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_emulator(backend=None, host=DEFAULT_HOST, port=0):
+    """Serve `backend` on a background thread; returns (server, "host:port")."""
+    server = EmulatorHTTPServer((host, port), make_handler(backend or MemoryBackend()))
+    threading.Thread(target=server.serve_forever, name="rtdb-emulator", daemon=True).start()
+    return server, f"{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an in-memory Realtime Database over localhost HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", help="JSON file with the initial database tree")
+    args = parser.parse_args()
+
+    data = None
+    if args.seed:
+        with open(args.seed, "r") as f:
+            data = json.load(f)
+    server = EmulatorHTTPServer((args.host, args.port), make_handler(MemoryBackend(data)))
+    print(f"RTDB emulator listening on http://{args.host}:{args.port}")
+    print(f"Use it with FIREBASE_DATABASE_EMULATOR_HOST={args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+One polling cycle of the whole pipeline on a single snapshot.
+
+sensors/latest is fetched once through data_access (a conditional read, so an
+unchanged node is not downloaded again) and the same snapshot is handed to
+every consumer:
+    store     store_sensor_data   -> sensor log/store and public/sensor_data.csv
+    predict   predict_flood_risk  -> public/latest_flood_risk.json
+    anomaly   analysis_firebase   -> sensors/floodResult
+    analyze   analysis/analyze.py -> analysis graph and summaries
+
+The predict step selects and loads the model on the first tick and keeps it
+for every later one, restart the loop to pick up retrained models.
+
+Usage:
+    python run_tick.py                          # one tick, every step
+    python run_tick.py --steps store,predict    # only some steps
+    python run_tick.py --loop 60 --skip-unchanged
+    python run_tick.py --loop 60 --publish      # also refresh the public/ hash manifest
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import instrumentation
+from data_access import get_client
+from store_sensor_data import make_reading, store_readings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "SensorDataMLAnalysis"))
+from predict_flood_risk import load_model_info, predict_reading
+
+SENSOR_PATH = "sensors/latest"
+STEPS = ["store", "predict", "anomaly", "analyze"]
+
+# the selected model, loaded by the first predict step and kept for every later tick
+_model_info = None
+
+
+def run_step(step, data, reading):
+    global _model_info
+    if step == "store":
+        store_readings([reading])
+    elif step == "predict":
+        if _model_info is None:
+            _model_info = load_model_info()
+        predict_reading(reading, _model_info)
+    elif step == "anomaly":
+        from analysis_firebase import analyse_reading
+        analyse_reading(data)
+    elif step == "analyze":
+        from analysis.analyze import run_analysis
+        run_analysis(data)
+
+
+def tick(steps=STEPS, path=SENSOR_PATH, skip_unchanged=False):
+    """Fetch the snapshot once and run every step on it; returns False when there was nothing to do."""
+    client = get_client()
+    client.new_tick()
+    data = client.fetch(path)
+    if not data:
+        print("No data found in Firebase.")
+        return False
+    if skip_unchanged and not client.changed(path):
+        print(f"{path} unchanged since the last tick, skipping.")
+        return False
+
+    reading = make_reading(data)
+    for step in steps:
+        try:
+            with instrumentation.span(step):
+                run_step(step, data, reading)
+        except Exception as e:
+            # a failing consumer should not stop the others
+            print(f"Step {step} failed: {e}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the sensor snapshot once and run every pipeline step on it.")
+    parser.add_argument("--steps", default=",".join(STEPS), help=f"comma separated steps ({', '.join(STEPS)})")
+    parser.add_argument("--path", default=SENSOR_PATH, help="Realtime Database path of the snapshot")
+    parser.add_argument("--loop", type=float, metavar="SECONDS", help="keep polling at this interval")
+    parser.add_argument("--skip-unchanged", action="store_true", help="do nothing when the snapshot has not changed")
+    parser.add_argument("--publish", action="store_true", help="run publish.py after every tick that did something")
+    args = parser.parse_args()
+
+    steps = [step for step in args.steps.split(",") if step]
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        parser.error(f"unknown steps: {', '.join(sorted(unknown))}")
+
+    instrumentation.enable("run_tick")
+    while True:
+        ran = tick(steps, args.path, args.skip_unchanged)
+        if ran and args.publish:
+            from publish import publish
+            with instrumentation.span("publish"):
+                changed = publish()
+            print(f"Published {len(changed)} changed artifacts")
+        print(f"Reads: {get_client().stats}")
+        if not args.loop:
+            break
+        # every tick is its own run in the metrics file
+        instrumentation.flush(restart=True)
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Append-only segmented log for sensor readings.
+
+Each reading is appended as one CSV line to the active segment file, so the
+cost of storing a reading does not depend on how much history we keep.
+When the active segment grows past SEGMENT_BYTES it is sealed and listed in
+index.json. Sealed segments are merged into larger ones by compaction, which
+can run in a background thread; every file and index change is written to a
+temporary file first and swapped in with os.replace, so readers never see a
+half-written file.
+
+Layout of the log directory:
+    index.json          sealed segments with their row counts and time range
+    seg-000001.csv      segment files (no header, one reading per line)
+    seg-000002.csv      ...the highest sequence not in the index is active
+    seg-000003-000006.csv
+                        a compacted segment, the rows of seg-000003 to seg-000006
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import threading
+
+FIELDS = ['humidity', 'rainfall', 'temperature', 'waterLevel', 'timestamp']
+
+LOG_DIR = os.path.join("data", "sensor_log")
+INDEX_FILE = "index.json"
+
+SEGMENT_BYTES = 1024 * 1024       # seal the active segment after ~1 MiB
+COMPACT_MIN_SEGMENTS = 4          # compact once this many small segments are sealed
+COMPACTED_ROWS = 500000           # target row count of a compacted segment
+MAX_ROWS = 5000000                # retention cap, oldest segments are dropped first
+VIEW_ROWS = 1001                  # rows in the public sensor_data.csv view
+
+_SEGMENT_RE = re.compile(r"^seg-(\d{6})\.csv$")
+_COMPACTED_RE = re.compile(r"^seg-(\d{6})-(\d{6})\.csv$")
+
+
+def _atomic_write(path, text):
+    # write to a temp file next to the target and swap it in
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _format_row(reading):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow([reading[field] for field in FIELDS])
+    return buf.getvalue()
+
+
+class SensorLog:
+    def __init__(self, log_dir=LOG_DIR, segment_bytes=SEGMENT_BYTES,
+                 max_rows=MAX_ROWS, compact_min_segments=COMPACT_MIN_SEGMENTS,
+                 compacted_rows=COMPACTED_ROWS):
+        self.log_dir = log_dir
+        self.segment_bytes = segment_bytes
+        self.max_rows = max_rows
+        self.compact_min_segments = compact_min_segments
+        self.compacted_rows = compacted_rows
+        # guards index.json against the background compaction thread
+        self._lock = threading.Lock()
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    # -------------------------------
+    # Index and segment bookkeeping
+    # -------------------------------
+    def _path(self, name):
+        return os.path.join(self.log_dir, name)
+
+    def _load_index(self):
+        index_path = self._path(INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {"segments": []}
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_index(self, index):
+        _atomic_write(self._path(INDEX_FILE), json.dumps(index, indent=2))
+
+    def _segment_names(self):
+        names = [name for name in os.listdir(self.log_dir) if _SEGMENT_RE.match(name)]
+        return sorted(names)
+
+    def _active_segment(self, index):
+        sealed = {seg["name"] for seg in index["segments"]}
+        names = self._segment_names()
+        if names and names[-1] not in sealed:
+            return names[-1]
+        # start a new segment after the highest sequence number on disk, compacted ones included
+        last_seq = int(_SEGMENT_RE.match(names[-1]).group(1)) if names else 0
+        for name in os.listdir(self.log_dir):
+            match = _COMPACTED_RE.match(name)
+            if match:
+                last_seq = max(last_seq, int(match.group(2)))
+        return f"seg-{last_seq + 1:06d}.csv"
+
+    @staticmethod
+    def _sequence_range(name):
+        match = _SEGMENT_RE.match(name)
+        if match:
+            return int(match.group(1)), int(match.group(1))
+        match = _COMPACTED_RE.match(name)
+        return int(match.group(1)), int(match.group(2))
+
+    def _read_segment(self, name):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            return [row for row in csv.reader(f) if len(row) == len(FIELDS)]
+
+    def _read_segment_tail(self, name, n):
+        # seek back from the end in blocks so big compacted segments stay cheap
+        path = self._path(name)
+        if n <= 0 or not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(64 * 1024, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.decode("utf-8").splitlines()
+        if pos > 0:
+            # the first line may be cut in half
+            lines = lines[1:]
+        rows = [row for row in csv.reader(lines) if len(row) == len(FIELDS)]
+        return rows[-n:]
+
+    def _describe(self, name, rows):
+        return {
+            "name": name,
+            "rows": len(rows),
+            "first": rows[0][-1] if rows else None,
+            "last": rows[-1][-1] if rows else None,
+        }
+
+    # -------------------------------
+    # Writing
+    # -------------------------------
+    def is_empty(self):
+        return not self._segment_names()
+
+    def append(self, reading):
+        """Append one reading (dict with FIELDS keys) to the active segment."""
+        with self._lock:
+            index = self._load_index()
+            name = self._active_segment(index)
+            path = self._path(name)
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                f.write(_format_row(reading))
+                f.flush()
+                os.fsync(f.fileno())
+
+            if os.path.getsize(path) >= self.segment_bytes:
+                # seal it, the next append starts a fresh segment
+                index["segments"].append(self._describe(name, self._read_segment(name)))
+                self._apply_retention(index)
+                self._save_index(index)
+
+    def import_csv(self, csv_path):
+        """Seed the log from an existing sensor_data.csv (one-off migration)."""
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.DictReader(f)]
+        if not rows:
+            return 0
+        text = "".join(_format_row(row) for row in rows)
+        with self._lock:
+            index = self._load_index()
+            name = self._active_segment(index)
+            _atomic_write(self._path(name), text)
+            index["segments"].append(self._describe(name, self._read_segment(name)))
+            self._save_index(index)
+        return len(rows)
+
+    def _apply_retention(self, index):
+        # drop whole segments from the front while we are over the cap
+        total = sum(seg["rows"] for seg in index["segments"])
+        while len(index["segments"]) > 1 and total - index["segments"][0]["rows"] >= self.max_rows:
+            dropped = index["segments"].pop(0)
+            total -= dropped["rows"]
+            try:
+                os.remove(self._path(dropped["name"]))
+            except FileNotFoundError:
+                pass
+
+    # -------------------------------
+    # Compaction
+    # -------------------------------
+    def compact(self):
+        """Merge runs of small sealed segments into one larger segment.
+
+        The merged rows go to a new file named after the sequence range it
+        covers (never the active-segment pattern, so appends cannot pick it
+        up), then the index is swapped to point at it, and only then are the
+        merged-away files removed. A crash before the index swap leaves an
+        unreferenced file, never rows that are listed twice. Returns the
+        number of segments that were merged away.
+        """
+        with self._lock:
+            index = self._load_index()
+        segments = index["segments"]
+
+        # collect the trailing run of segments that are still small
+        run = []
+        for seg in reversed(segments):
+            if seg["rows"] >= self.compacted_rows:
+                break
+            run.insert(0, seg)
+        if len(run) < self.compact_min_segments:
+            return 0
+
+        # keep each merged segment below the compacted size
+        batch, rows = [], 0
+        for seg in run:
+            if batch and rows + seg["rows"] > self.compacted_rows:
+                break
+            batch.append(seg)
+            rows += seg["rows"]
+        if len(batch) < 2:
+            return 0
+
+        merged = []
+        for seg in batch:
+            merged.extend(self._read_segment(seg["name"]))
+        first, last = self._sequence_range(batch[0]["name"])[0], self._sequence_range(batch[-1]["name"])[1]
+        target = f"seg-{first:06d}-{last:06d}.csv"
+        tmp_path = self._path(f"{target}.tmp")
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f, lineterminator="\n").writerows(merged)
+            f.flush()
+            os.fsync(f.fileno())
+        # not in the index yet, readers do not see it
+        os.replace(tmp_path, self._path(target))
+
+        with self._lock:
+            index = self._load_index()
+            merged_names = {seg["name"] for seg in batch}
+            if not merged_names <= {seg["name"] for seg in index["segments"]}:
+                # retention dropped part of the batch meanwhile, try again next run
+                os.remove(self._path(target))
+                return 0
+            new_segments = []
+            for seg in index["segments"]:
+                if seg["name"] == batch[0]["name"]:
+                    new_segments.append(self._describe(target, merged))
+                elif seg["name"] not in merged_names:
+                    new_segments.append(seg)
+            index["segments"] = new_segments
+            self._save_index(index)
+
+        for seg in batch:
+            try:
+                os.remove(self._path(seg["name"]))
+            except FileNotFoundError:
+                pass
+        return len(batch) - 1
+
+    def compact_in_background(self):
+        """Run compact() on a worker thread; join the returned thread before exit."""
+        thread = threading.Thread(target=self.compact, name="sensor-log-compaction")
+        thread.start()
+        return thread
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def row_count(self):
+        with self._lock:
+            index = self._load_index()
+            active = self._active_segment(index)
+            active_rows = len(self._read_segment(active))
+        return sum(seg["rows"] for seg in index["segments"]) + active_rows
+
+    def tail(self, n):
+        """Return the newest n rows as lists of strings, oldest first."""
+        # read under the lock: a compaction swaps the merged file in and deletes the merged-away
+        # segments, with a stale index we would read rows twice or miss them. Only n rows are read.
+        with self._lock:
+            index = self._load_index()
+            active = self._active_segment(index)
+            rows = self._read_segment_tail(active, n)
+            # walk sealed segments backwards until we have enough rows
+            for seg in reversed(index["segments"]):
+                if len(rows) >= n:
+                    break
+                rows = self._read_segment_tail(seg["name"], n - len(rows)) + rows
+        return rows
+
+    def iter_rows(self):
+        """Yield every row in the log as a dict, oldest first.
+
+        Not safe against a compaction running at the same time (the index is
+        only read once); store_readings() only starts compacting after its
+        full reads.
+        """
+        with self._lock:
+            index = self._load_index()
+            active = self._active_segment(index)
+        for name in [seg["name"] for seg in index["segments"]] + [active]:
+            for row in self._read_segment(name):
+                yield dict(zip(FIELDS, row))
+
+    def write_csv_view(self, csv_path, rows=VIEW_ROWS):
+        """Publish the newest rows in the sensor_data.csv format, atomically."""
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(FIELDS)
+        tail = self.tail(rows)
+        writer.writerows(tail)
+        _atomic_write(csv_path, buf.getvalue())
+        return len(tail)
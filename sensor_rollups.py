@@ -0,0 +1,170 @@
+"""
+Hourly and daily rollups of the sensor channels for the Analytics dashboard.
+
+Every reading updates the min/max/sum/count/last of its hour and day
+bucket in place (the mean is sum / count), so adding a reading costs
+the same no matter how much history there is. Only the newest buckets are
+kept, which bounds the published files to a few kilobytes each:
+
+    public/rollups/hourly.json      last HOURLY_BUCKETS hours
+    public/rollups/daily.json       last DAILY_BUCKETS days
+
+The files are column oriented (one array per statistic) to keep them small:
+    {"resolution": "hour", "updated": "...", "buckets": ["2026-01-05 16:00", ...],
+     "count": [12, ...],
+     "channels": {"waterLevel": {"min": [...], "max": [...], "mean": [...], "sum": [...], "last": [...]}, ...}}
+
+Bucket labels are in the local time of the sensor timestamps. The published
+files are the state too; when they are missing they are rebuilt from the
+sensor log. The sums carry the state, so the mean rounded for the file is
+never read back into it.
+"""
+
+import bisect
+import json
+import os
+from datetime import datetime, timezone
+
+ROLLUP_DIR = os.path.join("public", "rollups")
+CHANNELS = ['humidity', 'rainfall', 'temperature', 'waterLevel']
+STATS = ['min', 'max', 'mean', 'sum', 'last']
+
+HOURLY_BUCKETS = 24 * 7           # a week of hours
+DAILY_BUCKETS = 366               # a year of days
+RESOLUTIONS = {
+    # name -> (file, bucket label length in the timestamp, kept buckets, label suffix)
+    'hour': ("hourly.json", len("YYYY-mm-dd HH"), HOURLY_BUCKETS, ":00"),
+    'day': ("daily.json", len("YYYY-mm-dd"), DAILY_BUCKETS, ""),
+}
+
+
+def _empty(resolution):
+    return {"resolution": resolution, "updated": None, "buckets": [], "count": [],
+            "channels": {channel: {stat: [] for stat in STATS} for channel in CHANNELS}}
+
+
+class Rollup:
+    """The rollup of one resolution; add() is O(1) for a reading in the newest bucket."""
+
+    def __init__(self, rollup_dir, resolution):
+        file_name, self.label_length, self.max_buckets, self.suffix = RESOLUTIONS[resolution]
+        self.resolution = resolution
+        self.path = os.path.join(rollup_dir, file_name)
+        self.data = self._load()
+        # bucket label -> position, only needed for readings that arrive late
+        self._positions = None
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return _empty(self.resolution)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"Could not read {self.path}, rebuilding it.")
+            return _empty(self.resolution)
+        if set(data.get("channels", {})) != set(CHANNELS):
+            return _empty(self.resolution)
+        for stats in data["channels"].values():
+            if "sum" not in stats:
+                # written before the sums were kept, start them from the rounded means
+                stats["sum"] = [m * c for m, c in zip(stats["mean"], data["count"])]
+        return data
+
+    def is_empty(self):
+        return not self.data["buckets"]
+
+    def _bucket(self, timestamp):
+        return timestamp[:self.label_length] + self.suffix
+
+    def _new_bucket(self, position, label, values):
+        data = self.data
+        data["buckets"].insert(position, label)
+        data["count"].insert(position, 1)
+        for channel in CHANNELS:
+            value = values[channel]
+            for stat in STATS:
+                data["channels"][channel][stat].insert(position, value)
+
+    def add(self, reading):
+        data = self.data
+        label = self._bucket(str(reading['timestamp']))
+        values = {channel: round(float(reading[channel]), 4) for channel in CHANNELS}
+        buckets = data["buckets"]
+
+        if buckets and buckets[-1] == label:
+            position = len(buckets) - 1
+        elif not buckets or buckets[-1] < label:
+            # a new hour/day, the usual way a bucket starts
+            self._new_bucket(len(buckets), label, values)
+            self._positions = None
+            self._trim()
+            return
+        else:
+            # a late reading for an older bucket
+            if buckets[0] > label and len(buckets) >= self.max_buckets:
+                return
+            if self._positions is None:
+                self._positions = {b: i for i, b in enumerate(buckets)}
+            position = self._positions.get(label)
+            if position is None:
+                position = bisect.bisect(buckets, label)
+                self._new_bucket(position, label, values)
+                self._positions = None
+                self._trim()
+                return
+
+        count = data["count"][position] + 1
+        data["count"][position] = count
+        for channel in CHANNELS:
+            value = values[channel]
+            stats = data["channels"][channel]
+            if value < stats["min"][position]:
+                stats["min"][position] = value
+            if value > stats["max"][position]:
+                stats["max"][position] = value
+            stats["sum"][position] += value
+            stats["mean"][position] = stats["sum"][position] / count
+            stats["last"][position] = value
+
+    def _trim(self):
+        extra = len(self.data["buckets"]) - self.max_buckets
+        if extra <= 0:
+            return
+        data = self.data
+        del data["buckets"][:extra]
+        del data["count"][:extra]
+        for channel in CHANNELS:
+            for stat in STATS:
+                del data["channels"][channel][stat][:extra]
+        self._positions = None
+
+    def save(self):
+        self.data["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        # rounded in the written copy only, the values are 4 decimals already so the sums stay exact
+        data = dict(self.data, channels={
+            channel: dict(stats, mean=[round(m, 4) for m in stats["mean"]], sum=[round(v, 4) for v in stats["sum"]])
+            for channel, stats in self.data["channels"].items()})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def update_rollups(readings, rollup_dir=ROLLUP_DIR, history=None):
+    """Add readings to the hourly and daily rollups and publish them.
+
+    history is a callable returning every stored row (e.g. SensorLog.iter_rows);
+    it is only used to rebuild a rollup that does not exist yet, in which case
+    the readings are expected to be part of it already.
+    """
+    for resolution in RESOLUTIONS:
+        rollup = Rollup(rollup_dir, resolution)
+        rows = history() if rollup.is_empty() and history is not None else readings
+        for reading in rows:
+            try:
+                rollup.add(reading)
+            except (KeyError, ValueError):
+                continue
+        rollup.save()
@@ -0,0 +1,182 @@
+"""
+Memory-mapped columnar store for the sensor history.
+
+Every channel is kept in its own flat binary file (one little-endian value per
+reading) next to a small header.json holding the row count and dtypes.
+Opening the store only reads the header; columns are mapped with np.memmap on
+first use, so a range query touches only the pages it slices and the returned
+arrays are views into the mapping rather than copies.
+
+Timestamps are stored as epoch seconds (int64) and must be appended in
+non-decreasing order, which lets range queries use a binary search.
+
+Layout of the store directory:
+    header.json         {"version": 1, "rows": N, "columns": {name: dtype}}
+    timestamp.bin       int64 epoch seconds
+    humidity.bin        float64 values, same for the other channels
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+STORE_DIR = os.path.join("data", "sensor_store")
+HEADER_FILE = "header.json"
+STORE_VERSION = 1
+
+CHANNELS = ['humidity', 'rainfall', 'temperature', 'waterLevel']
+COLUMNS = {
+    'timestamp': '<i8',
+    'humidity': '<f8',
+    'rainfall': '<f8',
+    'temperature': '<f8',
+    'waterLevel': '<f8',
+}
+
+# sensor timestamps are written in Asia/Kuala_Lumpur time, which has no DST
+LOCAL_TZ = timezone(timedelta(hours=8))
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_epoch(value):
+    """Convert a 'YYYY-mm-dd HH:MM:SS' local timestamp (or a number) to epoch seconds."""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    return int(datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=LOCAL_TZ).timestamp())
+
+
+def from_epoch(seconds):
+    """Format epoch seconds back into the local timestamp string used in sensor_data.csv."""
+    return datetime.fromtimestamp(int(seconds), LOCAL_TZ).strftime(TIMESTAMP_FORMAT)
+
+
+class SensorStore:
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self._maps = {}
+        self.header = self._load_header()
+
+    # -------------------------------
+    # Header and column files
+    # -------------------------------
+    def _path(self, name):
+        return os.path.join(self.store_dir, name)
+
+    def _load_header(self):
+        header_path = self._path(HEADER_FILE)
+        if not os.path.exists(header_path):
+            return {"version": STORE_VERSION, "rows": 0, "columns": dict(COLUMNS)}
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported sensor store version: {header.get('version')}")
+        return header
+
+    def _save_header(self):
+        # the header row count is the commit point for appended bytes
+        header_path = self._path(HEADER_FILE)
+        tmp_path = f"{header_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.header, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, header_path)
+
+    def __len__(self):
+        return self.header["rows"]
+
+    def column(self, name):
+        """Return the whole column as a read-only memory-mapped array."""
+        rows = len(self)
+        dtype = np.dtype(self.header["columns"][name])
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        mapped = self._maps.get(name)
+        if mapped is None or len(mapped) != rows:
+            mapped = np.memmap(self._path(f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+            self._maps[name] = mapped
+        return mapped
+
+    # -------------------------------
+    # Writing
+    # -------------------------------
+    def append(self, readings):
+        """Append readings (dicts with a timestamp and the four channels).
+
+        Returns the number of rows written. Readings older than the newest
+        stored timestamp are rejected so the timestamp column stays sorted.
+        """
+        readings = list(readings)
+        if not readings:
+            return 0
+        timestamps = np.array([to_epoch(r["timestamp"]) for r in readings], dtype=COLUMNS['timestamp'])
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError("Readings must be appended in timestamp order")
+        rows = len(self)
+        if rows and timestamps[0] < self.column('timestamp')[-1]:
+            raise ValueError("Reading is older than the newest stored timestamp")
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._maps.clear()
+        values = {'timestamp': timestamps}
+        for name in CHANNELS:
+            values[name] = np.array([float(r.get(name, 0) or 0) for r in readings],
+                                    dtype=self.header["columns"][name])
+
+        for name, dtype in self.header["columns"].items():
+            path = self._path(f"{name}.bin")
+            itemsize = np.dtype(dtype).itemsize
+            with open(path, "ab") as f:
+                # drop bytes from an append that never made it into the header
+                if f.tell() != rows * itemsize:
+                    f.truncate(rows * itemsize)
+                f.write(values[name].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.header["rows"] = rows + len(readings)
+        self._save_header()
+        return len(readings)
+
+    def import_rows(self, rows, batch_size=100000):
+        """Bulk-load rows (e.g. from SensorLog.iter_rows) in batches."""
+        total, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += self.append(batch)
+                batch = []
+        return total + self.append(batch)
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def slice_index(self, start=None, end=None):
+        """Row bounds [i0, i1) for readings with start <= timestamp <= end."""
+        timestamps = self.column('timestamp')
+        i0 = 0 if start is None else int(np.searchsorted(timestamps, to_epoch(start), side="left"))
+        i1 = len(timestamps) if end is None else int(np.searchsorted(timestamps, to_epoch(end), side="right"))
+        return i0, max(i0, i1)
+
+    def range(self, start=None, end=None, columns=None):
+        """Return {column: array view} for the readings between start and end (inclusive)."""
+        i0, i1 = self.slice_index(start, end)
+        names = columns or list(self.header["columns"])
+        return {name: self.column(name)[i0:i1] for name in names}
+
+    def tail(self, n=1, columns=None):
+        """Return {column: array view} for the newest n readings."""
+        rows = len(self)
+        names = columns or list(self.header["columns"])
+        return {name: self.column(name)[max(0, rows - n):] for name in names}
+
+    def to_frame(self, data):
+        """Turn a range()/tail() result into a DataFrame shaped like sensor_data.csv."""
+        import pandas as pd
+
+        frame = pd.DataFrame({name: np.asarray(data[name]) for name in CHANNELS if name in data})
+        if 'timestamp' in data:
+            frame['timestamp'] = [from_epoch(t) for t in data['timestamp']]
+        return frame
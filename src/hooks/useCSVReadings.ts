@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react';
+import { artifactUrl } from '@/lib/artifacts';
 
 export type SensorReading = {
     timestamp: number;
@@ -17,11 +18,8 @@ export const useCSVReadings = () => {
     useEffect(() => {
         const fetchCSV = async () => {
             try {
-                // Use Vite's BASE_URL to handle deployment subpaths correctly
-                const baseUrl = import.meta.env.BASE_URL;
-                // Remove trailing slash from baseUrl if present to avoid double slashes
-                const cleanBaseUrl = baseUrl.endsWith('/') ? baseUrl.slice(0, -1) : baseUrl;
-                const response = await fetch(`${cleanBaseUrl}/sensor_data.csv`);
+                // fingerprinted url (handles Vite's BASE_URL too), an unchanged csv comes from the browser cache
+                const response = await fetch(await artifactUrl('sensor_data.csv'));
                 if (!response.ok) {
                     if (response.status === 404) {
                         // File might not exist yet if the action hasn't run
@@ -0,0 +1,88 @@
+import { useState, useEffect } from 'react';
+import { artifactUrl } from '@/lib/artifacts';
+
+export type RollupResolution = 'hour' | 'day';
+
+export type RollupChannel = 'humidity' | 'rainfall' | 'temperature' | 'waterLevel';
+
+// one point per hour or day, see sensor_rollups.py
+export type RollupPoint = {
+    bucket: string;
+    timestamp: number;
+    count: number;
+} & {
+    [K in RollupChannel as `${K}Mean`]: number;
+} & {
+    [K in RollupChannel as `${K}Range`]: [number, number];
+} & {
+    [K in RollupChannel as `${K}Last`]: number;
+};
+
+type RollupFile = {
+    resolution: RollupResolution;
+    updated: string | null;
+    buckets: string[];
+    count: number[];
+    channels: Record<RollupChannel, { min: number[]; max: number[]; mean: number[]; last: number[] }>;
+};
+
+const CHANNELS: RollupChannel[] = ['humidity', 'rainfall', 'temperature', 'waterLevel'];
+const FILES: Record<RollupResolution, string> = { hour: 'hourly.json', day: 'daily.json' };
+
+export const useRollups = (resolution: RollupResolution) => {
+    const [data, setData] = useState<RollupPoint[]>([]);
+    const [loading, setLoading] = useState(true);
+    const [error, setError] = useState<string | null>(null);
+
+    useEffect(() => {
+        const fetchRollups = async () => {
+            try {
+                const response = await fetch(await artifactUrl(`rollups/${FILES[resolution]}`));
+                if (!response.ok) {
+                    if (response.status === 404) {
+                        // not published until the logger has run once
+                        setData([]);
+                        setLoading(false);
+                        return;
+                    }
+                    throw new Error('Failed to fetch rollups');
+                }
+
+                // the file is column oriented, turn it into one object per bucket for recharts
+                const file: RollupFile = await response.json();
+                const points = file.buckets.map((bucket, i) => {
+                    const point: Record<string, unknown> = {
+                        bucket,
+                        // "YYYY-MM-DD HH:00" or "YYYY-MM-DD", local time of the sensor
+                        timestamp: new Date(bucket.length > 10 ? bucket.replace(' ', 'T') : `${bucket}T00:00`).getTime(),
+                        count: file.count[i],
+                    };
+                    CHANNELS.forEach((channel) => {
+                        const stats = file.channels[channel];
+                        point[`${channel}Mean`] = stats.mean[i];
+                        point[`${channel}Range`] = [stats.min[i], stats.max[i]];
+                        point[`${channel}Last`] = stats.last[i];
+                    });
+                    return point as RollupPoint;
+                });
+
+                setData(points);
+                setError(null);
+                setLoading(false);
+            } catch (err) {
+                console.error('Error fetching rollups:', err);
+                setError(err instanceof Error ? err.message : 'Unknown error');
+                setLoading(false);
+            }
+        };
+
+        setLoading(true);
+        fetchRollups();
+
+        // the rollups change at most once per logger run
+        const interval = setInterval(fetchRollups, 5 * 60000);
+        return () => clearInterval(interval);
+    }, [resolution]);
+
+    return { data, loading, error };
+};
@@ -0,0 +1,39 @@
+// URLs of the files the pipeline publishes into public/, see publish.py.
+//
+// publish_manifest.json lists a content hash per artifact. Asking for
+// `<path>?v=<hash>` lets the browser keep an unchanged file in its cache and
+// skip the request entirely; only the small manifest is revalidated. Without a
+// manifest (e.g. `npm run dev`) the plain path is used.
+
+type PublishManifest = {
+	generated: string | null;
+	files: Record<string, { sha256: string; etag: string; bytes: number }>;
+};
+
+// re-read the manifest at most this often, pages poll their data every minute
+const MANIFEST_TTL_MS = 30000;
+
+const baseUrl = import.meta.env.BASE_URL.endsWith("/")
+	? import.meta.env.BASE_URL
+	: `${import.meta.env.BASE_URL}/`;
+
+let cached: { at: number; manifest: Promise<PublishManifest | null> } | null = null;
+
+const loadManifest = () => {
+	if (!cached || Date.now() - cached.at > MANIFEST_TTL_MS) {
+		cached = {
+			at: Date.now(),
+			manifest: fetch(`${baseUrl}publish_manifest.json`, { cache: "no-cache" })
+				.then((res) => (res.ok ? (res.json() as Promise<PublishManifest>) : null))
+				.catch(() => null),
+		};
+	}
+	return cached.manifest;
+};
+
+// path is relative to public/, e.g. "sensor_data.csv" or "rollups/daily.json"
+export const artifactUrl = async (path: string): Promise<string> => {
+	const manifest = await loadManifest();
+	const entry = manifest?.files[path];
+	return entry ? `${baseUrl}${path}?v=${entry.sha256.slice(0, 16)}` : `${baseUrl}${path}`;
+};
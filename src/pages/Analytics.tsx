@@ -5,9 +5,11 @@ import FloodAlert from "@/components/FloodAlert";
 import RainMeter from "@/components/RainMeter";
 import TempHumidity from "@/components/TempHumidity";
 import { useCSVReadings } from "@/hooks/useCSVReadings";
+import { useRollups, type RollupResolution } from "@/hooks/useRollups";
+import { artifactUrl } from "@/lib/artifacts";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { ChartContainer, ChartTooltip, ChartTooltipContent } from "@/components/ui/chart";
-import { Area, AreaChart, CartesianGrid, ReferenceLine, XAxis, YAxis } from "recharts";
+import { Area, AreaChart, CartesianGrid, ComposedChart, Line, ReferenceLine, XAxis, YAxis } from "recharts";
 import { Info, TriangleAlert } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import {
@@ -133,6 +135,17 @@ type ChartDatum = {
 	temperature?: number;
 };
 
+// see water_forecast.py, missing until the logger has run with it
+interface WaterLevelForecast {
+	issued: string;
+	step_minutes: number;
+	horizon_hours: number;
+	water_level: { at: string; minutes: number; water_level: number }[];
+	one_step_rmse: number | null;
+	minutes_to_warning: number | null;
+	minutes_to_danger: number | null;
+}
+
 interface PredictionResult {
 	timestamp: string;
 	prediction: number;
@@ -145,8 +158,18 @@ interface PredictionResult {
 		temperature: number;
 		water_level: number;
 	};
+	forecast?: WaterLevelForecast | null;
 }
 
+// "reached", "in ~1 h 20 min" or "not within 6 h"
+const formatLeadTime = (minutes: number | null, horizonHours: number) => {
+	if (minutes === null) return `not within ${horizonHours} h`;
+	if (minutes <= 0) return "reached";
+	const hours = Math.floor(minutes / 60);
+	const rest = minutes % 60;
+	return `in ~${hours > 0 ? `${hours} h ` : ""}${rest} min`;
+};
+
 const chartSections = [
 	{
 		key: "waterLevel" as const,
@@ -191,6 +214,10 @@ const chartSections = [
 const Analytics = () => {
 	const { data: csvReadings, loading: csvLoading, error: csvError } = useCSVReadings();
 
+	// hourly (last week) or daily (last year) min/max/mean, precomputed by the logger
+	const [rollupResolution, setRollupResolution] = useState<RollupResolution>("day");
+	const { data: rollupData, loading: rollupLoading, error: rollupError } = useRollups(rollupResolution);
+
 	// Use the CSV data directly for charts
 	const readingsForCharts = csvReadings;
 
@@ -298,6 +325,13 @@ const Analytics = () => {
 					["Input Humidity (%)", prediction.input_data.humidity],
 					["Input Temperature (°C)", prediction.input_data.temperature]
 				];
+				if (prediction.forecast) {
+					const { forecast } = prediction;
+					predictionData.push(
+						["Time to Warning Level", formatLeadTime(forecast.minutes_to_warning, forecast.horizon_hours)],
+						["Time to Danger Level", formatLeadTime(forecast.minutes_to_danger, forecast.horizon_hours)],
+					);
+				}
 				const insightSheet = XLSX.utils.aoa_to_sheet(predictionData);
 				XLSX.utils.book_append_sheet(wb, insightSheet, "Analysis");
 			} else {
@@ -329,12 +363,9 @@ const Analytics = () => {
 	// get the latest flood prediction from ai
 	useEffect(() => {
 		setInsightLoading(true);
-		// Prepend base URL to fetching from public folder in production
-		const baseUrl = import.meta.env.BASE_URL.endsWith('/')
-			? import.meta.env.BASE_URL
-			: `${import.meta.env.BASE_URL}/`;
-
-		fetch(`${baseUrl}latest_flood_risk.json`)
+		// fingerprinted url from publish_manifest.json, prepends the base URL too
+		artifactUrl("latest_flood_risk.json")
+			.then(url => fetch(url))
 			.then(res => {
 				if (!res.ok) throw new Error("Failed to fetch prediction");
 				return res.json();
@@ -537,6 +568,100 @@ const Analytics = () => {
 						</CardContent>
 					</Card>
 
+					<Card>
+						<CardHeader className="flex flex-row items-start justify-between space-y-0">
+							<div className="space-y-1.5">
+								<CardTitle>Long-term Trends</CardTitle>
+								<p className="text-sm text-muted-foreground">
+									{rollupResolution === "day" ? "Daily" : "Hourly"} average with the lowest and highest reading as a band.
+								</p>
+							</div>
+							<div className="flex gap-2">
+								<Button
+									size="sm"
+									variant={rollupResolution === "hour" ? "default" : "outline"}
+									onClick={() => setRollupResolution("hour")}
+								>
+									Last week
+								</Button>
+								<Button
+									size="sm"
+									variant={rollupResolution === "day" ? "default" : "outline"}
+									onClick={() => setRollupResolution("day")}
+								>
+									Last year
+								</Button>
+							</div>
+						</CardHeader>
+						<CardContent>
+							{rollupError ? (
+								<p className="text-sm text-red-500">Failed to load long-term data: {rollupError}</p>
+							) : rollupLoading && rollupData.length === 0 ? (
+								<p className="text-sm text-muted-foreground">Loading long-term trends…</p>
+							) : rollupData.length === 0 ? (
+								<p className="text-sm text-muted-foreground">No long-term data has been published yet.</p>
+							) : (
+								<div className="grid gap-6 md:grid-cols-2">
+									{chartSections.map((section) => (
+										<Card key={`rollup-${section.key}`} className="border-slate-200 dark:border-slate-800">
+											<CardHeader>
+												<CardTitle>{section.title}</CardTitle>
+											</CardHeader>
+											<CardContent>
+												<ChartContainer
+													config={{
+														[`${section.key}Mean`]: { label: `Average ${section.title}`, color: section.color },
+														[`${section.key}Range`]: { label: "Min – Max", color: section.color },
+													}}
+													className="h-64"
+												>
+													<ComposedChart data={rollupData} margin={{ top: 10, right: 10, left: 0, bottom: 20 }}>
+														<CartesianGrid strokeDasharray="3 3" />
+														<XAxis
+															dataKey="timestamp"
+															type="number"
+															scale="time"
+															domain={['dataMin', 'dataMax']}
+															tickFormatter={(unixTime) =>
+																rollupResolution === "day"
+																	? new Date(unixTime).toLocaleDateString([], { day: "numeric", month: "short" })
+																	: new Date(unixTime).toLocaleString([], { weekday: "short", hour: "2-digit" })
+															}
+															tickLine={false}
+															axisLine={false}
+														/>
+														<YAxis
+															width={50}
+															tickLine={false}
+															axisLine={false}
+															tickFormatter={(value) => `${Number(value).toFixed(1)}`}
+															label={{ value: `${section.title} (${section.unit})`, angle: -90, position: "insideLeft", style: { textAnchor: 'middle' } }}
+														/>
+														<ChartTooltip content={<ChartTooltipContent />} />
+														<Area
+															type="monotone"
+															dataKey={`${section.key}Range`}
+															stroke="none"
+															fill={`var(--color-${section.key}Range)`}
+															fillOpacity={0.15}
+														/>
+														<Line
+															type="monotone"
+															dataKey={`${section.key}Mean`}
+															stroke={`var(--color-${section.key}Mean)`}
+															strokeWidth={2}
+															dot={false}
+														/>
+													</ComposedChart>
+												</ChartContainer>
+											</CardContent>
+										</Card>
+									))}
+								</div>
+							)}
+						</CardContent>
+					</Card>
+
 					{/* AI-generated Environmental Insight - placed immediately below the graphs */}
 					{/* Machine Learning Prediction Result */}
 					<Card>
@@ -578,6 +703,23 @@ const Analytics = () => {
 											<li>Temperature: {prediction.input_data.temperature.toFixed(1)}°C</li>
 										</ul>
 									</div>
+									{prediction.forecast && prediction.forecast.water_level.length > 0 && (
+										<div className="text-sm text-black bg-slate-100 p-4 rounded-lg">
+											<p className="font-semibold mb-2">Water Level Forecast (next {prediction.forecast.horizon_hours} h):</p>
+											<ul className="grid grid-cols-2 gap-2 mb-2">
+												<li>Warning ({WATER_LEVEL_THRESHOLDS.warning} cm): {formatLeadTime(prediction.forecast.minutes_to_warning, prediction.forecast.horizon_hours)}</li>
+												<li>Danger ({WATER_LEVEL_THRESHOLDS.danger} cm): {formatLeadTime(prediction.forecast.minutes_to_danger, prediction.forecast.horizon_hours)}</li>
+											</ul>
+											{/* one point per hour is enough here */}
+											<ul className="grid grid-cols-3 gap-1 text-xs text-slate-600">
+												{prediction.forecast.water_level
+													.filter((_, i, points) => (i + 1) % Math.max(1, Math.round(60 / prediction.forecast!.step_minutes)) === 0 || i === points.length - 1)
+													.map((point) => (
+														<li key={point.at}>{point.at.slice(11, 16)}: {point.water_level.toFixed(1)} cm</li>
+													))}
+											</ul>
+										</div>
+									)}
 								</div>
 							) : insightError ? (
 								<p className="text-sm text-red-500">{insightError}</p>
@@ -1,10 +1,11 @@
-import { useState, useMemo } from "react";
+import { useState, useMemo, useEffect } from "react";
 import { X } from "lucide-react";
 import Navigation from "@/components/Navigation";
 import Footer from "@/components/Footer";
+import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
+import { artifactUrl } from "@/lib/artifacts";
 import photosData from "../../public/detected_waste_photos/photos.json";
-import historyData from "../../public/detected_waste_photos/waste_history.json";
 import {
   BarChart,
   Bar,
@@ -15,25 +16,104 @@ import {
   ResponsiveContainer,
 } from "recharts";
 
+// smaller copies made by waste_thumbnails.py
+interface Thumbnail {
+  width: number;
+  height: number;
+  webp: string;
+  jpeg: string;
+}
+
 interface Photo {
   id: string;
   url: string;
   date: string;
   time: string;
   original_name: string;
+  width?: number;
+  height?: number;
+  thumbnails?: Thumbnail[];
+  // near-identical frames of the same burst, see waste_dedupe.py
+  duplicates?: number;
+  duplicate_ids?: string[];
+  duplicate_of?: string;
+}
+
+// grid is 1 / 2 / 3 columns wide, see the grid classes below
+const gridSizes = "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw";
+
+const srcSet = (thumbnails: Thumbnail[], format: "webp" | "jpeg") =>
+  thumbnails.map((t) => `${t[format]} ${t.width}w`).join(", ");
+
+// one entry per month of history, see archive_waste_history.py
+interface HistoryShard {
+  month: string;
+  file: string;
+  count: number;
+  newest: string;
+  oldest: string;
+  days: Record<string, number>;
+  hours: number[];
 }
 
+interface HistoryManifest {
+  updated: string;
+  total: number;
+  shards: HistoryShard[]; // newest first
+}
+
+
 const Gallery = () => {
-  const [photos] = useState<Photo[]>(photosData as Photo[]);
+  // the other frames of a burst are folded into its first one
+  const [photos] = useState<Photo[]>((photosData as Photo[]).filter((photo) => !photo.duplicate_of));
   const [selectedPhoto, setSelectedPhoto] = useState<Photo | null>(null);
+  const [manifest, setManifest] = useState<HistoryManifest | null>(null);
+  // older photos, one month shard at a time
+  const [historyPhotos, setHistoryPhotos] = useState<Photo[]>([]);
+  const [shardsLoaded, setShardsLoaded] = useState(0);
+  const [historyLoading, setHistoryLoading] = useState(false);
+
+  useEffect(() => {
+    artifactUrl("detected_waste_photos/history/manifest.json")
+      .then((url) => fetch(url))
+      .then((res) => {
+        if (!res.ok) throw new Error("Failed to fetch waste history");
+        return res.json();
+      })
+      .then((data: HistoryManifest) => setManifest(data))
+      .catch((err) => console.error("Error fetching waste history:", err));
+  }, []);
+
+  // fetch the next (older) month only when asked for
+  const loadOlder = () => {
+    if (!manifest || historyLoading || shardsLoaded >= manifest.shards.length) return;
+    const shard = manifest.shards[shardsLoaded];
+    setHistoryLoading(true);
+    artifactUrl(`detected_waste_photos/${shard.file}`)
+      .then((url) => fetch(url))
+      .then((res) => {
+        if (!res.ok) throw new Error(`Failed to fetch ${shard.file}`);
+        return res.json();
+      })
+      .then((data: Photo[]) => {
+        setHistoryPhotos((prev) => [...prev, ...data]);
+        setShardsLoaded((n) => n + 1);
+      })
+      .catch((err) => console.error("Error fetching waste history:", err))
+      .finally(() => setHistoryLoading(false));
+  };
 
   // calculate how much trash we found
+  // the manifest already has per day / per hour counts, no shard needs to be loaded
   const stats = useMemo(() => {
+    const shards = manifest?.shards ?? [];
+
     // 1. Daily Counts
     const dailyMap = new Map<string, number>();
-    (historyData as Photo[]).forEach((photo) => {
-      const current = dailyMap.get(photo.date) || 0;
-      dailyMap.set(photo.date, current + 1);
+    shards.forEach((shard) => {
+      Object.entries(shard.days).forEach(([date, count]) => {
+        dailyMap.set(date, (dailyMap.get(date) || 0) + count);
+      });
     });
 
     // Sort by date
@@ -46,12 +126,10 @@ const Gallery = () => {
     // Initialize all 24 hours to 0 for a complete chart
     for (let i = 0; i < 24; i++) hourlyMap.set(i, 0);
 
-    (historyData as Photo[]).forEach((photo) => {
-      // time format: "HH:MM:SS"
-      const hour = parseInt(photo.time.split(":")[0], 10);
-      if (!isNaN(hour)) {
-        hourlyMap.set(hour, (hourlyMap.get(hour) || 0) + 1);
-      }
+    shards.forEach((shard) => {
+      shard.hours.forEach((count, hour) => {
+        hourlyMap.set(hour, (hourlyMap.get(hour) || 0) + count);
+      });
     });
 
     const hourlyData = Array.from(hourlyMap.entries())
@@ -66,7 +144,59 @@ const Gallery = () => {
       .sort((a, b) => a.hourIndex - b.hourIndex);
 
     return { dailyData, hourlyData };
-  }, [photos]);
+  }, [manifest]);
+
+  const nextShard = manifest?.shards[shardsLoaded];
+
+  const renderPhoto = (photo: Photo) => (
+    <Card
+      key={photo.id}
+      className="overflow-hidden group cursor-pointer hover:ring-2 hover:ring-primary transition-all"
+      onClick={() => setSelectedPhoto(photo)}
+    >
+      <div className="relative bg-muted aspect-[4/3] flex items-center justify-center overflow-hidden">
+        {photo.duplicates ? (
+          <span className="absolute top-2 right-2 z-10 rounded-full bg-black/60 px-2 py-0.5 text-xs text-white">
+            +{photo.duplicates} similar
+          </span>
+        ) : null}
+        {photo.thumbnails && photo.thumbnails.length > 0 ? (
+          // the browser picks the smallest thumbnail that fills the card, the original is only used in the lightbox
+          <picture className="w-full h-full">
+            <source type="image/webp" srcSet={srcSet(photo.thumbnails, "webp")} sizes={gridSizes} />
+            <img
+              src={photo.thumbnails[0].jpeg}
+              srcSet={srcSet(photo.thumbnails, "jpeg")}
+              sizes={gridSizes}
+              width={photo.width}
+              height={photo.height}
+              loading="lazy"
+              decoding="async"
+              alt={`Detected waste ${photo.date} ${photo.time}`}
+              className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
+            />
+          </picture>
+        ) : (
+          <img
+            src={photo.url}
+            loading="lazy"
+            alt={`Detected waste ${photo.date} ${photo.time}`}
+            className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
+          />
+        )}
+      </div>
+      <div className="p-4 space-y-1">
+        <p className="font-semibold">
+          <span className="text-muted-foreground">Date: </span>
+          {photo.date}
+        </p>
+        <p className="font-semibold">
+          <span className="text-muted-foreground">Time: </span>
+          {photo.time}
+        </p>
+      </div>
+    </Card>
+  );
 
   return (
     <div className="min-h-screen flex flex-col">
@@ -76,7 +206,7 @@ const Gallery = () => {
         <h1 className="text-4xl font-bold mb-8">Detected Waste Gallery</h1>
 
         {/* --- Waste Trends Charts --- */}
-        {photos.length > 0 && (
+        {manifest && manifest.total > 0 && (
           <section className="mb-12 grid gap-8 md:grid-cols-2">
             {/* Daily Trend */}
             <Card>
@@ -154,34 +284,34 @@ const Gallery = () => {
           <div className="space-y-6">
             <h2 className="text-2xl font-bold">Recent Detected Waste</h2>
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-              {photos.map((photo) => (
-                <Card
-                  key={photo.id}
-                  className="overflow-hidden group cursor-pointer hover:ring-2 hover:ring-primary transition-all"
-                  onClick={() => setSelectedPhoto(photo)}
-                >
-                  <div className="bg-muted aspect-[4/3] flex items-center justify-center overflow-hidden">
-                    <img
-                      src={photo.url}
-                      alt={`Detected waste ${photo.date} ${photo.time}`}
-                      className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
-                    />
-                  </div>
-                  <div className="p-4 space-y-1">
-                    <p className="font-semibold">
-                      <span className="text-muted-foreground">Date: </span>
-                      {photo.date}
-                    </p>
-                    <p className="font-semibold">
-                      <span className="text-muted-foreground">Time: </span>
-                      {photo.time}
-                    </p>
-                  </div>
-                </Card>
-              ))}
+              {photos.map(renderPhoto)}
             </div>
           </div>
         )}
+
+        {/* --- Archived history, fetched a month at a time --- */}
+        {manifest && manifest.total > 0 && (
+          <div className="space-y-6 mt-12">
+            <h2 className="text-2xl font-bold">History</h2>
+            <p className="text-muted-foreground">
+              {manifest.total} photos archived, {historyPhotos.length} shown.
+            </p>
+            {historyPhotos.length > 0 && (
+              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                {historyPhotos.map(renderPhoto)}
+              </div>
+            )}
+            {nextShard && (
+              <div className="text-center">
+                <Button variant="outline" onClick={loadOlder} disabled={historyLoading}>
+                  {historyLoading
+                    ? "Loading..."
+                    : `Show ${nextShard.month} (${nextShard.count} photos)`}
+                </Button>
+              </div>
+            )}
+          </div>
+        )}
       </main>
 
       {/* Lightbox Modal */}
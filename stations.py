@@ -0,0 +1,218 @@
+"""
+Station-aware pipeline for many river stations.
+
+Stations live under stations/<id>/latest in the Realtime Database. Each tick
+discovers the station ids, then fetches, stores and scores every station
+concurrently on a bounded thread pool, so the tick time is set by the slowest
+station rather than the sum of all of them. The models are loaded once and
+shared by the workers.
+
+Per station outputs:
+    data/stations/<id>/sensor_log, data/stations/<id>/sensor_store
+    data/stations/<id>/feature_state.json, data/stations/<id>/forecast_state.json
+    data/stations/<id>/anomaly_state.json          (with --anomaly)
+    public/stations/<id>/sensor_data.csv
+    public/stations/<id>/rollups/hourly.json / daily.json
+    public/stations/<id>/latest_flood_risk.json
+    public/stations/<id>/analysis_summary.json / .txt
+and one combined public/stations/index.json, whose entries (whatever their
+status) give each station's directory name as "dir". An id with characters outside
+[A-Za-z0-9_-] gets them replaced by '_' plus a short hash of the raw id,
+so two ids that only differ in those characters keep separate directories.
+
+Usage:
+    python stations.py [--workers 32] [--anomaly] [--skip-unchanged] [--station ID ...]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from data_access import get_client
+from instrumentation import enable
+from store_sensor_data import get_sensor_data, make_reading, store_readings
+from water_forecast import latest_forecast
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "SensorDataMLAnalysis"))
+from predict_flood_risk import build_features, build_result, load_model_info, score
+from analysis.analyze import analyze_flood_risk, write_summaries
+
+STATIONS_ROOT = "stations"
+DATA_DIR = os.path.join("data", "stations")
+PUBLIC_DIR = os.path.join("public", "stations")
+INDEX_FILE = os.path.join(PUBLIC_DIR, "index.json")
+MAX_WORKERS = 32
+
+_SAFE_ID = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def station_key(station_id):
+    """Directory name of a station: the id itself when it is safe, else sanitised plus a hash of the raw id."""
+    safe_id = _SAFE_ID.sub("_", station_id)
+    if safe_id == station_id:
+        return safe_id
+    return f"{safe_id}-{hashlib.sha1(station_id.encode('utf-8')).hexdigest()[:8]}"
+
+
+def station_dirs(station_id):
+    key = station_key(station_id)
+    return os.path.join(DATA_DIR, key), os.path.join(PUBLIC_DIR, key)
+
+
+def discover_stations():
+    """Station ids under stations/ (a shallow read, children are not downloaded)."""
+    return get_client().keys(STATIONS_ROOT)
+
+
+def latest_path(station_id):
+    return f"{STATIONS_ROOT}/{station_id}/latest"
+
+
+# -------------------------------
+# One station
+# -------------------------------
+def process_station(station_id, model_info, fetch=get_sensor_data, anomaly=False, skip_unchanged=False):
+    """Fetch, store and score one station; returns its entry for the combined index."""
+    started = time.perf_counter()
+    stages = {}
+
+    def lap(stage):
+        # seconds spent in each stage, reported in the index entry
+        nonlocal started
+        now = time.perf_counter()
+        stages[stage] = now - started
+        started = now
+
+    data = fetch(latest_path(station_id))
+    lap("fetch")
+    if not data:
+        return {"station": station_id, "dir": station_key(station_id), "status": "no data"}
+    if skip_unchanged and not get_client().changed(latest_path(station_id)):
+        return {"station": station_id, "dir": station_key(station_id), "status": "unchanged"}
+
+    data_dir, public_dir = station_dirs(station_id)
+    os.makedirs(public_dir, exist_ok=True)
+    reading = make_reading(data)
+    store_readings([reading],
+                   csv_file=os.path.join(public_dir, "sensor_data.csv"),
+                   log_dir=os.path.join(data_dir, "sensor_log"),
+                   store_dir=os.path.join(data_dir, "sensor_store"),
+                   rollup_dir=os.path.join(public_dir, "rollups"),
+                   feature_state=os.path.join(data_dir, "feature_state.json"),
+                   forecast_state=os.path.join(data_dir, "forecast_state.json"))
+    lap("store")
+
+    # supervised model, shared by every worker
+    model_name, model_accuracy, model, scaler = model_info
+    forecast = latest_forecast(os.path.join(data_dir, "forecast_state.json"))
+    row = pd.DataFrame([reading])
+    input_features = build_features(row)
+    predictions, probabilities = score(model, scaler, input_features)
+    probability = probabilities[0] if probabilities is not None else None
+    result = build_result(row, input_features, predictions[0], probability, model_name, model_accuracy, forecast)
+    with open(os.path.join(public_dir, "latest_flood_risk.json"), "w") as f:
+        json.dump(result, f, indent=4)
+    lap("predict")
+
+    # threshold rules, summaries only (the graph is rendered for the main station by analyze.py)
+    analysis = analyze_flood_risk(reading)
+    write_summaries(analysis,
+                    txt_path=os.path.join(public_dir, "analysis_summary.txt"),
+                    json_path=os.path.join(public_dir, "analysis_summary.json"),
+                    forecast=forecast)
+    lap("rules")
+
+    if anomaly:
+        from analysis_firebase import analyse_reading
+        analyse_reading(reading, f"{STATIONS_ROOT}/{station_id}/floodResult",
+                        state_path=os.path.join(data_dir, "anomaly_state.json"))
+        lap("anomaly")
+
+    return {
+        "station": station_id,
+        "dir": station_key(station_id),
+        "status": "ok",
+        "timestamp": reading["timestamp"],
+        "prediction": result["prediction"],
+        "probability": result["probability"],
+        "risk_level": analysis["risk_level"],
+        "risk_score": analysis["risk_score"],
+        "water_level": reading["waterLevel"],
+        "rainfall": reading["rainfall"],
+        "seconds": sum(stages.values()),
+        "stages": stages,
+    }
+
+
+# -------------------------------
+# All stations
+# -------------------------------
+def run_stations(station_ids, fetch=get_sensor_data, max_workers=MAX_WORKERS, anomaly=False,
+                 skip_unchanged=False, model_info=None):
+    if model_info is None:
+        model_info = load_model_info()
+
+    def safe_process(station_id):
+        # one broken station must not take the others down
+        try:
+            return process_station(station_id, model_info, fetch, anomaly, skip_unchanged)
+        except Exception as e:
+            return {"station": station_id, "dir": station_key(station_id), "status": "error", "error": str(e)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(station_ids)))) as pool:
+        entries = list(pool.map(safe_process, station_ids))
+    elapsed = time.perf_counter() - started
+
+    # stations that did not change keep their entry from the previous tick
+    if skip_unchanged and os.path.exists(INDEX_FILE):
+        with open(INDEX_FILE, "r") as f:
+            previous = {e["station"]: e for e in json.load(f).get("stations", [])}
+        entries = [previous.get(e["station"], e) if e["status"] == "unchanged" else e for e in entries]
+
+    index = {
+        "generatedAt": datetime.now().isoformat() + "Z",
+        "stations": entries,
+        "tick_seconds": elapsed,
+    }
+    os.makedirs(PUBLIC_DIR, exist_ok=True)
+    tmp_path = INDEX_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, INDEX_FILE)
+
+    ok = sum(1 for e in entries if e["status"] == "ok")
+    print(f"Processed {ok}/{len(entries)} stations in {elapsed:.2f}s. Index saved to {INDEX_FILE}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch, store and score every river station concurrently.")
+    parser.add_argument("--station", action="append", help="only process this station id (repeatable)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="maximum concurrent stations")
+    parser.add_argument("--anomaly", action="store_true",
+                        help="also upload the streaming anomaly result to stations/<id>/floodResult")
+    parser.add_argument("--skip-unchanged", action="store_true",
+                        help="leave stations whose latest node has not changed since the last run alone")
+    args = parser.parse_args()
+
+    enable("stations")
+    get_client().new_tick()
+    station_ids = args.station or discover_stations()
+    if not station_ids:
+        print(f"No stations found under {STATIONS_ROOT}/.")
+        return
+    run_stations(station_ids, max_workers=args.workers, anomaly=args.anomaly, skip_unchanged=args.skip_unchanged)
+
+
+if __name__ == "__main__":
+    main()
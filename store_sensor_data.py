@@ -1,87 +1,104 @@
-import firebase_admin
-from firebase_admin import credentials, db
-import pandas as pd
 import os
-import json
 from datetime import datetime
 import pytz
 
-# -------------------------------
-# Firebase Initialization
-# -------------------------------
-# Load Firebase key from environment variable
-firebase_key_json = os.environ.get("FIREBASE_KEY")
-if not firebase_key_json:
-    raise ValueError("FIREBASE_KEY not found in environment variables!")
+from sensor_log import SensorLog, LOG_DIR, VIEW_ROWS
+from sensor_store import SensorStore, STORE_DIR
+from sensor_rollups import update_rollups, ROLLUP_DIR
+from rolling_features import update_features, STATE_FILE as FEATURE_STATE
+from water_forecast import update_forecast, STATE_FILE as FORECAST_STATE
+from data_access import get_client
+from instrumentation import enable, span
 
-# Convert string to dictionary
-firebase_key_dict = json.loads(firebase_key_json)
-
-cred = credentials.Certificate(firebase_key_dict)
-firebase_admin.initialize_app(cred, {
-    "databaseURL": "https://aura-data-cb5bf-default-rtdb.asia-southeast1.firebasedatabase.app"
-})
+PUBLIC_DIR = "public"
+CSV_FILE = os.path.join(PUBLIC_DIR, "sensor_data.csv")
 
 # -------------------------------
 # Fetch Sensor Data From Firebase
 # -------------------------------
-def get_sensor_data():
-    # fetch data from sensors/latest
-    ref = db.reference("sensors/latest")
-    data = ref.get()
-    return data
+def get_sensor_data(path="sensors/latest"):
+    # fetch data from sensors/latest (or a station's latest node), once per tick
+    return get_client().fetch(path)
 
 # -------------------------------
-# Main Execution
+# Storage
 # -------------------------------
-def main():
-    data = get_sensor_data()
-
-    if not data:
-        print("No data found in Firebase.")
-        return
-
+def make_reading(data, timestamp=None):
     # Extract specific fields to ensure only relevant data is stored
     # get the values we need and add timestamp
-    sensor_reading = {
+    if timestamp is None:
+        timestamp = datetime.now(pytz.timezone('Asia/Kuala_Lumpur')).strftime("%Y-%m-%d %H:%M:%S")
+    return {
         'humidity': float(data.get('humidity', 0)),
         'rainfall': float(data.get('rainfall', 0)),
         'temperature': float(data.get('temperature', 0)),
         'waterLevel': float(data.get('waterLevel', 0)),
-        'timestamp': datetime.now(pytz.timezone('Asia/Kuala_Lumpur')).strftime("%Y-%m-%d %H:%M:%S")
+        'timestamp': timestamp
     }
-    
-    # Create DataFrame for new data
-    new_row = pd.DataFrame([sensor_reading])
-    
+
+
+def store_readings(readings, csv_file=CSV_FILE, log_dir=LOG_DIR, store_dir=STORE_DIR, rollup_dir=ROLLUP_DIR,
+                   feature_state=FEATURE_STATE, forecast_state=FORECAST_STATE):
+    """Append a batch of readings to the log, store and rollups, then refresh the csv view once."""
     # Ensure public directory exists
-    public_dir = "public"
-    if not os.path.exists(public_dir):
+    public_dir = os.path.dirname(csv_file)
+    if public_dir and not os.path.exists(public_dir):
         os.makedirs(public_dir)
 
-    csv_file = os.path.join(public_dir, "sensor_data.csv")
-    
-    if os.path.exists(csv_file) and os.path.getsize(csv_file) > 0:
-        try:
-            # Read existing data
-            df = pd.read_csv(csv_file)
-            # Append new data
-            df = pd.concat([df, new_row], ignore_index=True)
-        except pd.errors.EmptyDataError:
-            # File exists but is empty
-            df = new_row
-    else:
-        # Create new DataFrame
-        df = new_row
-        
-    # Keep only the last 1001 rows
-    if len(df) > 1001:
-        df = df.tail(1001)
-        
-    # Save back to CSV
-    # save to csv file
-    df.to_csv(csv_file, index=False)
-    print(f"Data appended. Total rows: {len(df)}")
+    # append to the segmented log, this costs the same no matter how long the history is
+    log = SensorLog(log_dir)
+    if log.is_empty() and os.path.exists(csv_file) and os.path.getsize(csv_file) > 0:
+        imported = log.import_csv(csv_file)
+        print(f"Seeded sensor log with {imported} rows from {csv_file}")
+    with span("log_append"):
+        for reading in readings:
+            log.append(reading)
+
+    # keep the memory-mapped columnar copy in step for the scripts that read history
+    store = SensorStore(store_dir)
+    try:
+        with span("store_append"):
+            if len(store) == 0:
+                store.import_rows(log.iter_rows())
+            else:
+                store.append(readings)
+    except ValueError as e:
+        print(f"Skipped columnar store update: {e}")
+
+    # 1/3/24 hour accumulations and rates of rise, the windows are rows of the store
+    with span("features"):
+        update_features(store, feature_state)
+
+    # recursive least squares update of the water level forecast, publishes the next 6 hours
+    with span("forecast"):
+        update_forecast(readings, forecast_state)
+
+    # hourly/daily min/max/mean for the dashboard, rebuilt from the log the first time
+    with span("rollups"):
+        update_rollups(readings, rollup_dir, history=log.iter_rows)
+
+    # merge small segments while we publish the csv view for the website
+    compaction = log.compact_in_background()
+    with span("csv_view"):
+        view_rows = log.write_csv_view(csv_file, VIEW_ROWS)
+    compaction.join()
+    return view_rows
+
+# -------------------------------
+# Main Execution
+# -------------------------------
+def main():
+    enable("store_sensor_data")
+    data = get_sensor_data()
+
+    if not data:
+        print("No data found in Firebase.")
+        return
+
+    sensor_reading = make_reading(data)
+    view_rows = store_readings([sensor_reading])
+    print(f"Data appended. Rows in {CSV_FILE}: {view_rows}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,197 @@
+"""
+Streaming anomaly detector for the sensor readings.
+
+Each channel keeps an exponentially weighted location and scale that follow
+the river's baseline (the half-life is HALF_LIFE readings, about three days
+at one reading every 10 minutes). A reading is scored by its robust z-score
+per channel, and the updates are Huber-clipped to CLIP standard deviations,
+so a spike barely moves the baseline while a lasting change is absorbed
+within a few half-lives. A channel that stays above THRESHOLD for PERSIST
+readings in a row has changed regime (a step the clipped updates would take
+hundreds of readings to follow), so its baseline restarts at the new level.
+Every update is O(1) with a fixed amount of state:
+
+    {"version": 1, "seen": 812, "channels": {"waterLevel": {"loc": 41.2, "var": 3.1, "run": 0}, ...}}
+
+The state is checkpointed to a small JSON file after every reading (written
+atomically), so scheduled one-shot runs continue where the last one stopped.
+
+The first WARMUP readings only learn (plain running mean and variance) and
+are reported as normal. peek() scores a reading against the checkpointed
+baseline without learning from it or writing the state, for a second opinion
+that must not count the reading twice.
+
+    python streaming_anomaly.py --replay public/sensor_data.csv   # compare with flood_unsupervised.pkl
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+
+CHANNELS = ['humidity', 'rainfall', 'temperature', 'waterLevel']
+STATE_FILE = os.path.join("data", "anomaly_state.json")
+STATE_VERSION = 1
+
+HALF_LIFE = 432          # readings, ~3 days at one reading every 10 minutes
+WARMUP = 30              # readings before anything is flagged
+CLIP = 3.0               # Huber clip of the updates, in standard deviations
+THRESHOLD = 4.0          # |z| above which a reading is anomalous
+PERSIST = 18             # readings in a row above THRESHOLD before a channel re-baselines (~3 hours)
+MIN_STD = {'humidity': 0.5, 'rainfall': 0.5, 'temperature': 0.2, 'waterLevel': 1.0}
+
+ALPHA = 1 - 0.5 ** (1 / HALF_LIFE)
+# E[min(z^2, CLIP^2)] for a standard normal, keeps the clipped variance unbiased
+_CLIPPED_VAR = (math.erf(CLIP / math.sqrt(2))
+                - 2 * CLIP * math.exp(-CLIP ** 2 / 2) / math.sqrt(2 * math.pi)
+                + CLIP ** 2 * math.erfc(CLIP / math.sqrt(2)))
+
+
+class StreamingDetector:
+    def __init__(self, state=None):
+        self.state = state or {"version": STATE_VERSION, "seen": 0,
+                               "channels": {c: {"loc": 0.0, "var": 0.0, "run": 0} for c in CHANNELS}}
+
+    # -------------------------------
+    # Checkpoint
+    # -------------------------------
+    @classmethod
+    def load(cls, path=STATE_FILE):
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("version") == STATE_VERSION and set(state["channels"]) == set(CHANNELS):
+                    return cls(state)
+                print(f"Ignoring {path}: written by a different version.")
+            except (OSError, ValueError, KeyError):
+                print(f"Could not read {path}, starting a new baseline.")
+        return cls()
+
+    def save(self, path=STATE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, path)
+
+    # -------------------------------
+    # Scoring
+    # -------------------------------
+    def _std(self, channel):
+        return max(math.sqrt(self.state["channels"][channel]["var"]), MIN_STD[channel])
+
+    def score(self, reading):
+        """Robust z-score per channel against the current baseline (no update)."""
+        return {c: (float(reading[c]) - self.state["channels"][c]["loc"]) / self._std(c) for c in CHANNELS}
+
+    def _judge(self, z, warming_up):
+        worst = max(abs(v) for v in z.values())
+        p_anomaly = 1 / (1 + math.exp(-(worst - THRESHOLD))) if not warming_up else 0.0
+        prediction = 1 if p_anomaly > 0.5 else 0
+        confidence = p_anomaly if prediction else 1 - p_anomaly
+        return prediction, confidence
+
+    def assess(self, reading):
+        """Same result as update() would give, but the baseline is left alone."""
+        warming_up = self.state["seen"] < WARMUP
+        z = self.score(reading) if not warming_up else {c: 0.0 for c in CHANNELS}
+        return (*self._judge(z, warming_up), z)
+
+    def update(self, reading):
+        """Score a reading, then fold it into the baseline.
+
+        Returns (prediction, confidence, z-scores): prediction is 1 when the
+        largest |z| is above THRESHOLD, confidence is how sure we are of that
+        prediction (0.5 right at the threshold).
+        """
+        seen = self.state["seen"]
+        warming_up = seen < WARMUP
+        z = self.score(reading) if not warming_up else {c: 0.0 for c in CHANNELS}
+
+        for c in CHANNELS:
+            x = float(reading[c])
+            stats = self.state["channels"][c]
+            if warming_up:
+                # Welford running mean/variance until the EW estimates are meaningful
+                delta = x - stats["loc"]
+                stats["loc"] += delta / (seen + 1)
+                stats["var"] += (delta * (x - stats["loc"]) - stats["var"]) / (seen + 1)
+            elif abs(z[c]) > THRESHOLD and stats.get("run", 0) + 1 >= PERSIST:
+                # still this far off after PERSIST readings, the level itself moved
+                stats["loc"] = x
+                stats["run"] = 0
+            else:
+                stats["run"] = stats.get("run", 0) + 1 if abs(z[c]) > THRESHOLD else 0
+                std = self._std(c)
+                clipped = max(-CLIP, min(CLIP, z[c])) * std
+                stats["loc"] += ALPHA * clipped
+                stats["var"] += ALPHA * (clipped ** 2 / _CLIPPED_VAR - stats["var"])
+        self.state["seen"] = seen + 1
+        return (*self._judge(z, warming_up), z)
+
+
+# one detector per state file, shared by every call in a long running process
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def _detector(state_path):
+    with _detectors_lock:
+        entry = _detectors.get(state_path)
+        if entry is None:
+            entry = _detectors[state_path] = (StreamingDetector.load(state_path), threading.Lock())
+    return entry
+
+
+def detect(reading, state_path=STATE_FILE):
+    """Score and learn one reading with the detector checkpointed at state_path."""
+    detector, lock = _detector(state_path)
+    with lock:
+        result = detector.update(reading)
+        detector.save(state_path)
+    return result
+
+
+def peek(reading, state_path=STATE_FILE):
+    """Score one reading with the detector at state_path, read-only: nothing is learned or saved."""
+    detector, lock = _detector(state_path)
+    with lock:
+        return detector.assess(reading)
+
+
+# -------------------------------
+# Offline comparison
+# -------------------------------
+def replay(csv_path, model_path="flood_unsupervised.pkl"):
+    """Run a csv of readings through a fresh detector and the IsolationForest, print how they compare."""
+    import joblib
+    import pandas as pd
+
+    frame = pd.read_csv(csv_path)
+    detector = StreamingDetector()
+    streaming = [detector.update(row)[0] for row in frame[CHANNELS].to_dict("records")]
+    forest = (joblib.load(model_path).predict(frame[CHANNELS]) == -1).astype(int)
+
+    rows = len(frame)
+    agree = sum(int(a == b) for a, b in zip(streaming, forest))
+    print(f"{rows} readings from {csv_path}")
+    print(f"  streaming detector flagged {sum(streaming)} ({sum(streaming) / rows:.1%})")
+    print(f"  IsolationForest flagged    {int(forest.sum())} ({forest.mean():.1%})")
+    print(f"  agreement                  {agree / rows:.1%}")
+    return streaming, forest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming anomaly detector for the sensor readings.")
+    parser.add_argument("--replay", metavar="CSV", help="compare with the IsolationForest on a csv of readings")
+    parser.add_argument("--model", default="flood_unsupervised.pkl")
+    args = parser.parse_args()
+    if not args.replay:
+        parser.error("nothing to do, pass --replay")
+    replay(args.replay, args.model)
+
+
+if __name__ == "__main__":
+    main()
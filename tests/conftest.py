@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the scripts import each other as top-level modules, like they do when run from the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "SensorDataMLAnalysis"))
@@ -0,0 +1,89 @@
+"""analyze_flood_risk_batch() must agree with analyze_flood_risk() on every row."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.analyze import RISK_RULES, analyze_flood_risk, analyze_flood_risk_batch, analyze_history
+from analysis.thresholds import (HUMIDITY_NORMAL_MAX, HUMIDITY_NORMAL_MIN, RAINFALL_DANGER, RAINFALL_SAFE,
+                                 RAINFALL_WARNING, WATER_LEVEL_DANGER, WATER_LEVEL_SAFE, WATER_LEVEL_WARNING)
+
+
+def _around(*thresholds):
+    # each threshold, just below and just above it, plus the ends of the range
+    values = [-1.0, 0.0, 1000.0]
+    for t in thresholds:
+        values += [t - 1e-9, t, t + 1e-9]
+    return values
+
+
+WATER_LEVELS = _around(WATER_LEVEL_SAFE, WATER_LEVEL_WARNING, WATER_LEVEL_DANGER)
+RAINFALLS = _around(RAINFALL_SAFE, RAINFALL_WARNING, RAINFALL_DANGER)
+HUMIDITIES = _around(HUMIDITY_NORMAL_MIN, HUMIDITY_NORMAL_MAX)
+
+
+def _assert_matches(records):
+    # missing keys become NaN columns, the way analyze_history() sees them
+    frame = pd.DataFrame.from_records(records, columns=['waterLevel', 'rainfall', 'humidity'])
+    batch = analyze_flood_risk_batch(frame['waterLevel'].to_numpy(dtype=float),
+                                     frame['rainfall'].to_numpy(dtype=float),
+                                     frame['humidity'].to_numpy(dtype=float))
+    for i, record in enumerate(records):
+        scalar = analyze_flood_risk(record)
+        assert batch['risk_score'][i] == scalar['risk_score'], record
+        assert batch['risk_level'][i] == scalar['risk_level'], record
+
+
+def test_every_threshold_boundary_combination():
+    records = [{'waterLevel': w, 'rainfall': r, 'humidity': h}
+               for w, r, h in itertools.product(WATER_LEVELS, RAINFALLS, HUMIDITIES)]
+    _assert_matches(records)
+
+
+def test_humidity_threshold_is_strict():
+    at_max = analyze_flood_risk_batch(np.array([0.0]), np.array([0.0]), np.array([float(HUMIDITY_NORMAL_MAX)]))
+    above = analyze_flood_risk_batch(np.array([0.0]), np.array([0.0]), np.array([HUMIDITY_NORMAL_MAX + 1e-9]))
+    assert at_max['risk_score'][0] == 0
+    assert above['risk_score'][0] == RISK_RULES['humidity']['scores'][1]
+    _assert_matches([{'waterLevel': 0, 'rainfall': 0, 'humidity': HUMIDITY_NORMAL_MAX}])
+
+
+def test_water_level_and_rainfall_thresholds_are_inclusive():
+    result = analyze_flood_risk_batch(np.array([float(WATER_LEVEL_DANGER)]), np.array([float(RAINFALL_DANGER)]),
+                                      np.array([0.0]))
+    assert result['risk_score'][0] == 90
+    assert result['risk_level'][0] == 'critical'
+
+
+def test_nan_scores_like_the_scalar_rules():
+    nan = float('nan')
+    records = [
+        {'waterLevel': nan, 'rainfall': nan, 'humidity': nan},
+        {'waterLevel': nan, 'rainfall': RAINFALL_DANGER, 'humidity': 95.0},
+        {'waterLevel': WATER_LEVEL_DANGER, 'rainfall': nan, 'humidity': nan},
+    ]
+    _assert_matches(records)
+
+
+@pytest.mark.parametrize('missing', [['waterLevel'], ['rainfall'], ['humidity'], ['waterLevel', 'rainfall', 'humidity']])
+def test_missing_keys_score_like_the_scalar_defaults(missing):
+    full = {'waterLevel': WATER_LEVEL_WARNING, 'rainfall': RAINFALL_WARNING, 'humidity': 90.0}
+    _assert_matches([{k: v for k, v in full.items() if k not in missing}, full])
+
+
+def test_random_readings_and_history_frame():
+    rng = np.random.default_rng(0)
+    n = 2000
+    frame = pd.DataFrame({
+        'waterLevel': rng.uniform(-10, 250, n).round(1),
+        'rainfall': rng.uniform(0, 80, n).round(1),
+        'humidity': rng.uniform(20, 100, n).round(0),
+        'temperature': rng.uniform(20, 35, n),
+    })
+    history = analyze_history(frame)
+    for i, record in enumerate(frame.to_dict('records')):
+        scalar = analyze_flood_risk(record)
+        assert history['risk_score'].iat[i] == scalar['risk_score']
+        assert history['risk_level'].iat[i] == scalar['risk_level']
@@ -0,0 +1,54 @@
+"""choose_model() must treat missing benchmark numbers as unknown and not chase timing noise."""
+
+import json
+
+from predict_flood_risk import METRICS_PATH, choose_model
+
+MEASURED = {'name': 'Measured', 'accuracy': 0.80, 'single_p50_ms': 0.5, 'single_p99_ms': 1.0,
+            'artifact_bytes': 1000}
+UNMEASURED = {'name': 'Unmeasured', 'accuracy': 0.81}
+
+
+def test_unmeasured_entry_ranks_after_measured_near_ties():
+    assert choose_model([UNMEASURED, MEASURED], None, None, 0.02)['name'] == 'Measured'
+
+
+def test_unmeasured_entry_does_not_fit_a_budget():
+    assert choose_model([UNMEASURED, MEASURED], 5.0, None, 0.0)['name'] == 'Measured'
+    assert choose_model([UNMEASURED, MEASURED], None, 5000, 0.0)['name'] == 'Measured'
+
+
+def test_without_budget_or_numbers_the_most_accurate_wins():
+    assert choose_model([UNMEASURED, MEASURED], None, None, 0.0)['name'] == 'Unmeasured'
+
+
+def _entry(name, p50, has_proba=True, accuracy=0.80, artifact_bytes=1000):
+    return {'name': name, 'accuracy': accuracy, 'single_p50_ms': p50, 'single_p99_ms': 2 * p50,
+            'artifact_bytes': artifact_bytes, 'has_proba': has_proba}
+
+
+def test_noise_level_latency_does_not_flip_the_choice():
+    # same models, two benchmark runs whose single-row timings swapped order by a few microseconds
+    run_a = [_entry('A', 0.01067, artifact_bytes=1026), _entry('B', 0.01127, artifact_bytes=1036)]
+    run_b = [_entry('A', 0.01131, artifact_bytes=1026), _entry('B', 0.01070, artifact_bytes=1036)]
+    assert choose_model(run_a, None, None, 0.02)['name'] == choose_model(run_b, None, None, 0.02)['name'] == 'A'
+
+
+def test_a_clearly_faster_model_still_wins():
+    entries = [_entry('Slow', 0.2, artifact_bytes=10), _entry('Fast', 0.01)]
+    assert choose_model(entries, None, None, 0.02)['name'] == 'Fast'
+
+
+def test_probability_comes_before_latency():
+    entries = [_entry('NoProba', 0.01, has_proba=False, accuracy=0.81), _entry('Proba', 0.03)]
+    assert choose_model(entries, None, None, 0.02)['name'] == 'Proba'
+    # outside the accuracy tolerance the better model wins regardless
+    assert choose_model(entries, None, None, 0.0)['name'] == 'NoProba'
+
+
+def test_committed_metrics_are_benchmarked():
+    with open(METRICS_PATH, 'r') as f:
+        metrics = json.load(f)
+    for m in metrics:
+        for key in ('single_p50_ms', 'single_p99_ms', 'artifact_bytes'):
+            assert key in m, f"{m['name']} has no {key}, run evaluate_models.py"
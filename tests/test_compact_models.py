@@ -0,0 +1,57 @@
+"""The NumPy runtime must predict what the pickled scikit-learn models predict."""
+
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from export_models import BASE_DIR, MODEL_FILES, export_models, model_arrays, verify
+from numpy_runtime import COMPACT_DIR, FORMAT_VERSION, KINDS, compact_path, load_compact_model
+
+
+def test_fresh_export_matches_the_pickles(tmp_path):
+    exported = export_models(BASE_DIR, str(tmp_path))
+    assert exported
+    assert verify(BASE_DIR, str(tmp_path))
+
+
+def test_committed_exports_are_not_stale():
+    # predict_flood_risk.py loads these before the pickles, they must describe the same models
+    for filename in MODEL_FILES:
+        if os.path.exists(os.path.join(BASE_DIR, filename)):
+            assert os.path.exists(compact_path(filename)), f"{filename} has no compact export"
+    assert verify(BASE_DIR, COMPACT_DIR)
+
+
+@pytest.mark.parametrize('loss, kind', [('log_loss', 'logistic'), ('hinge', 'linear_svm')])
+def test_sgd_with_scaler_folds_into_the_linear_kinds(tmp_path, loss, kind):
+    rng = np.random.default_rng(0)
+    X = rng.normal([50, 70, 28, 5], [30, 15, 3, 2], size=(500, 4))
+    y = (X[:, 0] + 2 * X[:, 3] + rng.normal(0, 10, 500) > 60).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = SGDClassifier(loss=loss, random_state=0).fit(scaler.transform(X), y)
+
+    arrays = model_arrays({'model': model, 'scaler': scaler})
+    assert str(arrays['kind']) == kind
+    assert 'scaler_mean' not in arrays
+    path = tmp_path / 'model.npz'
+    np.savez(path, **arrays)
+    compact = load_compact_model(str(path))
+
+    assert np.array_equal(compact.predict(X), model.predict(scaler.transform(X)))
+    if loss == 'log_loss':
+        assert np.abs(compact.predict_proba(X) - model.predict_proba(scaler.transform(X))).max() < 1e-9
+    else:
+        assert not hasattr(compact, 'predict_proba')
+
+
+def test_exports_only_use_known_kinds():
+    for filename in MODEL_FILES:
+        path = compact_path(filename)
+        if not os.path.exists(path):
+            continue
+        with np.load(path, allow_pickle=False) as data:
+            assert int(data['format_version']) == FORMAT_VERSION
+            assert str(data['kind']) in KINDS
@@ -0,0 +1,43 @@
+"""MemoryBackend.listen() pushes changes like firebase_admin's Reference.listen()."""
+
+from data_access import DataAccess, MemoryBackend, set_client
+from ingest_daemon import FirebaseEventSource
+
+
+def test_listen_pushes_the_current_value_then_every_change():
+    backend = MemoryBackend({"sensors": {"latest": {"humidity": {"value": 60}}}})
+    events = []
+    registration = backend.listen("sensors/latest", events.append)
+    backend.set("sensors/latest/humidity", {"value": 61})
+    backend.set("sensors", {"latest": {"rainfall": {"value": 3}}})
+    backend.set("stations/a", {"x": 1})
+    backend.delete("sensors/latest/rainfall")
+    registration.close()
+    backend.set("sensors/latest/humidity", {"value": 99})
+
+    assert [(e.event_type, e.path, e.data) for e in events] == [
+        ("put", "/", {"humidity": {"value": 60}}),
+        ("put", "/humidity", {"value": 61}),
+        ("put", "/", {"rainfall": {"value": 3}}),
+        ("put", "/rainfall", None),
+    ]
+
+
+def test_firebase_event_source_runs_on_the_memory_backend():
+    backend = MemoryBackend({"sensors": {"latest": {}}})
+    previous = set_client(DataAccess(backend, cache_dir=None))
+    try:
+        snapshots = []
+        source = FirebaseEventSource("sensors/latest")
+        source.start(lambda data, timestamp: snapshots.append(data))
+        backend.set("sensors/latest/humidity", {"value": 70})
+        backend.set("sensors/latest/rainfall", {"value": 2})
+        source.stop()
+        backend.set("sensors/latest/humidity", {"value": 71})
+    finally:
+        set_client(previous)
+
+    assert snapshots == [
+        {"humidity": {"value": 70}},
+        {"humidity": {"value": 70}, "rainfall": {"value": 2}},
+    ]
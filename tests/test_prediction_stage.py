@@ -0,0 +1,29 @@
+"""Streaming prediction loads the model once and scores each reading with it."""
+
+import json
+import sys
+
+import ingest_daemon
+from predict_flood_risk import load_model_info, predict_reading
+
+READING = {"humidity": 80.0, "rainfall": 120.0, "temperature": 28.0, "waterLevel": 6.5,
+           "timestamp": "2026-01-14 15:52:02"}
+
+
+def test_predict_reading_writes_the_result(tmp_path):
+    output = tmp_path / "latest_flood_risk.json"
+    result = predict_reading(READING, load_model_info(), str(output), str(tmp_path / "no_forecast.json"))
+    assert json.loads(output.read_text()) == json.loads(json.dumps(result))
+    assert result["prediction"] in (0, 1)
+
+
+def test_prediction_stage_loads_the_model_once(monkeypatch):
+    loads, scored = [], []
+    monkeypatch.setattr(ingest_daemon, "_model_info", None)
+    monkeypatch.setattr(ingest_daemon, "load_model_info", lambda: loads.append(1) or ("m", 0.5, None, None))
+    monkeypatch.setattr(ingest_daemon, "predict_reading", lambda reading, info: scored.append(info))
+    path_length = len(sys.path)
+    for _ in range(5):
+        ingest_daemon.prediction_stage(READING)
+    assert len(loads) == 1 and len(scored) == 5
+    assert len(sys.path) == path_length
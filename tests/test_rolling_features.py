@@ -0,0 +1,52 @@
+"""Online rolling features match the batch ones bit for bit, across checkpoints too."""
+
+import numpy as np
+import pandas as pd
+
+import rolling_features as rf
+from sensor_store import SensorStore, from_epoch
+
+START = 1_767_225_600
+
+
+def _readings(count, seed=0):
+    # irregular 5-40 minute gaps with a few bursts, so windows grow and shrink
+    rng = np.random.default_rng(seed)
+    epochs = START + np.cumsum(rng.choice([60, 300, 600, 1200, 2400], size=count))
+    return pd.DataFrame({
+        'timestamp': [from_epoch(int(t)) for t in epochs],
+        'humidity': rng.uniform(40, 95, count).round(2),
+        'rainfall': rng.exponential(2.0, count).round(2),
+        'temperature': rng.normal(27, 3, count).round(2),
+        'waterLevel': (100 + np.cumsum(rng.normal(0, 0.8, count))).round(2),
+    })
+
+
+def test_check_finds_no_mismatch(tmp_path):
+    csv_path = tmp_path / 'sensor_data.csv'
+    _readings(600).to_csv(csv_path, index=False)
+    assert rf.check(str(csv_path))
+    for resume_at in (0, 1, 600):
+        assert rf.check(str(csv_path), resume_at=resume_at)
+
+
+def test_update_features_only_feeds_new_rows(tmp_path, monkeypatch):
+    readings = _readings(600, seed=1).to_dict('records')
+    store = SensorStore(str(tmp_path / 'sensor_store'))
+    state_path = str(tmp_path / 'feature_state.json')
+    store.append(readings[:500])
+    rf.update_features(store, state_path)
+
+    def no_rebuild(columns):
+        raise AssertionError("the checkpoint follows the store, nothing should be rebuilt")
+
+    monkeypatch.setattr(rf, 'batch_features', no_rebuild)
+    for reading in readings[500:]:
+        store.append([reading])
+        latest = rf.update_features(store, state_path)
+    monkeypatch.undo()
+
+    frame, engine = rf.batch_features(pd.DataFrame(readings))
+    assert rf.RollingFeatures.load(state_path).state == engine.state
+    assert latest == {name: (int(v) if name.startswith('count_') else float(v))
+                      for name, v in frame.iloc[-1].items()}
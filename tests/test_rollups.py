@@ -0,0 +1,35 @@
+"""Saving and reloading a rollup after every reading must not drift its mean."""
+
+import json
+import random
+
+from sensor_rollups import CHANNELS, update_rollups
+
+
+def test_mean_does_not_drift_across_saves(tmp_path):
+    rng = random.Random(0)
+    readings = [{"timestamp": f"2026-01-05 16:{i // 20:02d}:{i % 60:02d}",
+                 **{channel: round(rng.uniform(0, 300), 4) for channel in CHANNELS}} for i in range(1000)]
+    for reading in readings:
+        update_rollups([reading], str(tmp_path))
+
+    with open(tmp_path / "daily.json", "r") as f:
+        daily = json.load(f)
+    assert daily["count"] == [len(readings)]
+    for channel in CHANNELS:
+        exact = sum(r[channel] for r in readings) / len(readings)
+        assert daily["channels"][channel]["mean"] == [round(exact, 4)]
+
+
+def test_files_without_sums_still_load(tmp_path):
+    update_rollups([{"timestamp": "2026-01-05 16:00:00", **{c: 1.0 for c in CHANNELS}}], str(tmp_path))
+    path = tmp_path / "hourly.json"
+    data = json.loads(path.read_text())
+    for stats in data["channels"].values():
+        del stats["sum"]
+    path.write_text(json.dumps(data))
+
+    update_rollups([{"timestamp": "2026-01-05 16:10:00", **{c: 3.0 for c in CHANNELS}}], str(tmp_path))
+    data = json.loads(path.read_text())
+    assert data["channels"]["waterLevel"]["mean"] == [2.0]
+    assert data["channels"]["waterLevel"]["sum"] == [4.0]
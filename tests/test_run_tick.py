@@ -0,0 +1,24 @@
+"""Under --loop the predict step keeps its model and sys.path stays put."""
+
+import sys
+
+import run_tick
+from data_access import DataAccess, MemoryBackend, set_client
+
+SNAPSHOT = {"humidity": 80, "rainfall": 12, "temperature": 28, "waterLevel": 140}
+
+
+def test_predict_model_is_loaded_once_across_ticks(monkeypatch):
+    loads, scored = [], []
+    monkeypatch.setattr(run_tick, "_model_info", None)
+    monkeypatch.setattr(run_tick, "load_model_info", lambda: loads.append(1) or ("m", 0.5, None, None))
+    monkeypatch.setattr(run_tick, "predict_reading", lambda reading, info: scored.append(reading))
+    previous = set_client(DataAccess(MemoryBackend({"sensors": {"latest": SNAPSHOT}}), cache_dir=None))
+    try:
+        path_length = len(sys.path)
+        for _ in range(3):
+            assert run_tick.tick(["predict"])
+    finally:
+        set_client(previous)
+    assert len(loads) == 1 and len(scored) == 3
+    assert len(sys.path) == path_length
@@ -0,0 +1,50 @@
+"""Compaction keeps every row exactly once, also when it dies half way."""
+
+import pytest
+
+from sensor_log import SensorLog
+
+
+def _reading(i):
+    return {"humidity": i, "rainfall": 0, "temperature": 20, "waterLevel": 100, "timestamp": f"t{i:05d}"}
+
+
+def _log(tmp_path, rows):
+    # tiny segments so a few rows give several sealed ones
+    log = SensorLog(str(tmp_path), segment_bytes=200, compact_min_segments=3, compacted_rows=10000)
+    for i in range(rows):
+        log.append(_reading(i))
+    return log
+
+
+def _timestamps(log):
+    return [row["timestamp"] for row in log.iter_rows()]
+
+
+def test_compaction_keeps_rows_and_order(tmp_path):
+    log = _log(tmp_path, 60)
+    assert log.compact() > 0
+    for i in range(60, 80):
+        log.append(_reading(i))
+    assert _timestamps(log) == [f"t{i:05d}" for i in range(80)]
+    assert [row[-1] for row in log.tail(5)] == [f"t{i:05d}" for i in range(75, 80)]
+    # a second compaction folds the compacted segment into a larger one
+    log.compact()
+    assert _timestamps(log) == [f"t{i:05d}" for i in range(80)]
+
+
+def test_crash_before_the_index_swap_reads_nothing_twice(tmp_path, monkeypatch):
+    log = _log(tmp_path, 60)
+
+    def crash(index):
+        raise OSError("power cut")
+
+    monkeypatch.setattr(log, "_save_index", crash)
+    with pytest.raises(OSError):
+        log.compact()
+
+    reopened = SensorLog(str(tmp_path), segment_bytes=200, compact_min_segments=3, compacted_rows=10000)
+    assert _timestamps(reopened) == [f"t{i:05d}" for i in range(60)]
+    reopened.append(_reading(60))
+    assert reopened.compact() > 0
+    assert _timestamps(reopened) == [f"t{i:05d}" for i in range(61)]
@@ -0,0 +1,40 @@
+"""Every station id gets a directory of its own."""
+
+import stations
+from stations import station_dirs, station_key
+
+
+def test_safe_ids_are_their_own_directory():
+    assert station_key("river-01_upper") == "river-01_upper"
+
+
+def test_ids_that_sanitise_alike_do_not_collide():
+    ids = ["a.b", "a b", "a/b", "a_b", "a__b"]
+    assert len({station_dirs(i) for i in ids}) == len(ids)
+    assert station_key("a.b") == station_key("a.b")
+
+
+class _NothingChanged:
+    def changed(self, path):
+        return False
+
+
+def test_every_index_entry_names_its_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(stations, "PUBLIC_DIR", str(tmp_path))
+    monkeypatch.setattr(stations, "INDEX_FILE", str(tmp_path / "index.json"))
+    monkeypatch.setattr(stations, "get_client", _NothingChanged)
+
+    def fetch(path):
+        if path.startswith(f"{stations.STATIONS_ROOT}/a.b/"):
+            raise RuntimeError("station offline")
+        if path.startswith(f"{stations.STATIONS_ROOT}/same/"):
+            return {"waterLevel": {"value": 40}}
+        return None
+
+    index = stations.run_stations(["a.b", "empty one", "same"], fetch=fetch, skip_unchanged=True,
+                                  model_info=object())
+    assert [(e["status"], e["dir"]) for e in index["stations"]] == [
+        ("error", station_key("a.b")),
+        ("no data", station_key("empty one")),
+        ("unchanged", station_key("same")),
+    ]
@@ -0,0 +1,88 @@
+"""The streaming detector warms up, flags steps, follows a lasting shift and resumes from its checkpoint."""
+
+import os
+
+import analysis_firebase
+import streaming_anomaly as sa
+
+NORMAL = {'humidity': 60.0, 'rainfall': 2.0, 'temperature': 25.0, 'waterLevel': 40.0}
+
+
+def _readings(count, start=0, **levels):
+    # small deterministic wiggle around NORMAL, with some channels moved to other levels
+    for i in range(start, start + count):
+        wiggle = ((i * 7) % 11 - 5) / 5
+        yield {c: levels.get(c, NORMAL[c]) + wiggle * sa.MIN_STD[c] for c in sa.CHANNELS}
+
+
+def test_compare_scores_without_touching_the_checkpoint(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'anomaly_state.json')
+    monkeypatch.setattr(sa, '_detectors', {})
+    for reading in _readings(sa.WARMUP + 5):
+        sa.detect(reading, state_path)
+    with open(state_path, 'rb') as f:
+        saved = f.read()
+    state = sa.StreamingDetector.load(state_path).state
+
+    reading = {**NORMAL, 'waterLevel': 80.0}
+    flood, _ = analysis_firebase.predict_flood(*(reading[c] for c in sa.CHANNELS), 'streaming', state_path,
+                                               learn=False)
+    assert flood == 1
+    detector, _ = sa._detectors[state_path]
+    assert detector.state == state
+    with open(state_path, 'rb') as f:
+        assert f.read() == saved
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+
+def test_nothing_is_flagged_during_warm_up():
+    detector = sa.StreamingDetector()
+    for reading in _readings(sa.WARMUP - 1):
+        assert detector.update(reading)[0] == 0
+    # the last warm-up reading is far off but still only learned from
+    prediction, confidence, z = detector.update({**NORMAL, 'waterLevel': 500.0})
+    assert (prediction, confidence) == (0, 1.0) and set(z.values()) == {0.0}
+    assert detector.state['seen'] == sa.WARMUP
+    assert detector.update({**NORMAL, 'waterLevel': 500.0})[0] == 1
+
+
+def test_a_step_scores_its_robust_z():
+    detector = sa.StreamingDetector()
+    for reading in _readings(200):
+        detector.update(reading)
+    stats = detector.state['channels']['waterLevel']
+    std = max(stats['var'] ** 0.5, sa.MIN_STD['waterLevel'])
+    expected = (NORMAL['waterLevel'] + 10 - stats['loc']) / std
+
+    prediction, confidence, z = detector.update({**NORMAL, 'waterLevel': NORMAL['waterLevel'] + 10})
+    assert prediction == 1 and confidence > 0.99
+    assert abs(z['waterLevel'] - expected) < 1e-12
+    assert max(abs(z[c]) for c in sa.CHANNELS if c != 'waterLevel') < sa.THRESHOLD
+    # one clipped update barely moves the baseline
+    assert abs(stats['loc'] - NORMAL['waterLevel']) < 0.1
+
+
+def test_a_lasting_shift_re_baselines_after_persist_readings():
+    detector = sa.StreamingDetector()
+    for reading in _readings(200):
+        detector.update(reading)
+    shifted = [detector.update(r)[0] for r in _readings(3 * sa.PERSIST, start=200, waterLevel=60.0)]
+    assert shifted[:sa.PERSIST] == [1] * sa.PERSIST
+    assert shifted[sa.PERSIST:] == [0] * (2 * sa.PERSIST)
+    assert abs(detector.state['channels']['waterLevel']['loc'] - 60.0) < 2
+
+
+def test_a_resumed_checkpoint_scores_like_an_uninterrupted_run(tmp_path):
+    readings = list(_readings(150)) + list(_readings(100, start=150, waterLevel=55.0))
+    uninterrupted = sa.StreamingDetector()
+    expected = [uninterrupted.update(r) for r in readings]
+
+    path = str(tmp_path / 'anomaly_state.json')
+    first = sa.StreamingDetector()
+    resumed = [first.update(r) for r in readings[:170]]
+    first.save(path)
+    second = sa.StreamingDetector.load(path)
+    resumed += [second.update(r) for r in readings[170:]]
+    assert resumed == expected
+    assert second.state == uninterrupted.state
@@ -0,0 +1,75 @@
+"""Incremental updates: scaler moves must not change the models, batches must be in the dataset's units."""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import SGDClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from dataset import DATASET_FILE, FEATURES
+from export_models import BASE_DIR
+from train_incremental import INCREMENTAL, MANIFEST_FILE, VERSIONS_DIR, read_batch, rescale_inputs, train_incremental
+
+RANGES = {'rainfall': (0.0, 300.0), 'humidity': (20.0, 100.0), 'temperature': (15.0, 45.0), 'water_level': (0.0, 10.0)}
+
+
+def _features(rng, n, water_scale=1.0):
+    low, high = np.array([r[0] for r in RANGES.values()]), np.array([r[1] for r in RANGES.values()])
+    X = rng.uniform(low, high, (n, 4))
+    X[:, 3] *= water_scale
+    return X
+
+
+@pytest.mark.parametrize('model', [SGDClassifier(loss='log_loss', random_state=0),
+                                   MLPClassifier(hidden_layer_sizes=(8,), max_iter=50, random_state=0)])
+def test_rescaled_model_scores_raw_features_the_same(model):
+    rng = np.random.default_rng(0)
+    X, y = _features(rng, 300), rng.integers(0, 2, 300)
+    scaler = StandardScaler().fit(X)
+    model.fit(scaler.transform(X), y)
+    score = model.decision_function if hasattr(model, 'decision_function') else model.predict_proba
+    before = score(scaler.transform(X))
+
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    scaler.partial_fit(_features(rng, 100, water_scale=1.5))
+    rescale_inputs(model, old_mean, old_scale, scaler.mean_, scaler.scale_)
+    assert np.allclose(score(scaler.transform(X)), before)
+
+
+def _write_batch(tmp_path, X, name='batch.csv'):
+    frame = pd.DataFrame(X, columns=['rainfall', 'humidity', 'temperature', 'waterLevel'])
+    frame['flood'] = 1
+    path = tmp_path / name
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_batch_in_centimetres_is_rejected(tmp_path):
+    path = _write_batch(tmp_path, _features(np.random.default_rng(0), 20, water_scale=100.0))
+    with pytest.raises(ValueError, match='water_level'):
+        read_batch(path, RANGES)
+
+
+def test_glitch_rows_are_dropped(tmp_path):
+    X = _features(np.random.default_rng(0), 20)
+    X[3, 3] = -350.0
+    X_read, y = read_batch(_write_batch(tmp_path, X), RANGES)
+    assert len(X_read) == len(y) == 19
+    assert list(X_read.columns) == FEATURES
+
+
+def test_applied_batches_are_recorded_next_to_the_live_models(tmp_path):
+    for filename in [DATASET_FILE, 'model_metrics.json'] + [f for f, _ in INCREMENTAL.values()]:
+        shutil.copy(os.path.join(BASE_DIR, filename), tmp_path / filename)
+    X = _features(np.random.default_rng(0), 50)
+    batch = _write_batch(tmp_path, X)
+
+    assert train_incremental([batch], model_dir=str(tmp_path))['version'] == 1
+    # a fresh checkout has the live files and model_manifest.json, not model_versions/
+    shutil.rmtree(tmp_path / VERSIONS_DIR)
+    assert (tmp_path / MANIFEST_FILE).exists()
+    assert train_incremental([batch], model_dir=str(tmp_path)) is None
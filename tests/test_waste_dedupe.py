@@ -0,0 +1,78 @@
+"""The near-duplicate index is sharded by month and a run only opens the shards its photos need."""
+
+import json
+import os
+
+import pytest
+
+import waste_dedupe
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _photo(public_dir, photo_id, taken, shade):
+    # a left to right gradient, shade moves it enough to change the hash
+    url = f"detected_waste_photos/{photo_id}.jpg"
+    image = Image.new("L", (90, 80))
+    image.putdata([min(255, (x * 3 + shade) % 256) for y in range(80) for x in range(90)])
+    image.save(os.path.join(public_dir, url))
+    date, time = taken.split(" ")
+    return {"id": photo_id, "date": date, "time": time, "url": url}
+
+
+@pytest.fixture
+def public_dir(tmp_path):
+    os.makedirs(tmp_path / "public" / "detected_waste_photos")
+    return str(tmp_path / "public")
+
+
+def test_a_burst_across_a_month_boundary_stays_with_its_representative(public_dir, tmp_path):
+    index_dir = str(tmp_path / "phash")
+    photos = [_photo(public_dir, "rep", "2026-01-31 23:58:00", 0),
+              _photo(public_dir, "frame", "2026-02-01 00:01:00", 0)]
+    changed = waste_dedupe.collapse_duplicates(photos, index_dir, public_dir)
+
+    assert changed == {"rep": {"at": "2026-01-31 23:58:00", "duplicate_ids": ["frame"]}}
+    assert os.listdir(index_dir) == ["2026-01.json"]
+    assert photos[1]["duplicate_of"] == "rep" and photos[0]["duplicates"] == 1
+
+    # the next run finds both in the January shard without hashing them again
+    again = [{k: v for k, v in p.items() if k in ("id", "date", "time", "url")} for p in photos]
+    os.remove(os.path.join(public_dir, photos[0]["url"]))
+    assert waste_dedupe.collapse_duplicates(again, index_dir, public_dir) == {}
+    assert again[1]["duplicate_of"] == "rep" and again[0]["duplicate_ids"] == ["frame"]
+
+
+def test_only_the_shards_around_the_photos_are_opened(public_dir, tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "phash")
+    os.makedirs(index_dir)
+    for month in ("2025-06", "2025-12", "2026-03"):
+        with open(os.path.join(index_dir, f"{month}.json"), "w") as f:
+            f.write("not json, must not be read")
+
+    opened = []
+    load_index = waste_dedupe.load_index
+    monkeypatch.setattr(waste_dedupe, "load_index", lambda path: opened.append(path) or load_index(path))
+    photos = [_photo(public_dir, "a", "2026-01-10 12:00:00", 0), _photo(public_dir, "b", "2026-01-10 12:00:30", 90)]
+    waste_dedupe.collapse_duplicates(photos, index_dir, public_dir)
+
+    assert {os.path.basename(path) for path in opened} == {"2026-01.json"}
+    with open(os.path.join(index_dir, "2026-01.json")) as f:
+        assert set(json.load(f)["reps"]) == {"a", "b"}
+
+
+def test_the_single_file_index_is_split_by_month(tmp_path):
+    legacy_path = str(tmp_path / "phash.json")
+    index_dir = str(tmp_path / "phash")
+    waste_dedupe.write_index(legacy_path, {
+        "reps": {"r1": {"hash": "00", "at": "2025-12-31 23:59:00", "duplicate_ids": ["m1"]},
+                 "r2": {"hash": "ff", "at": "2026-01-02 08:00:00", "duplicate_ids": []}},
+        "members": {"m1": "r1"},
+    })
+    waste_dedupe.split_legacy_index(legacy_path, index_dir)
+
+    assert not os.path.exists(legacy_path)
+    december = waste_dedupe.load_index(os.path.join(index_dir, "2025-12.json"))
+    january = waste_dedupe.load_index(os.path.join(index_dir, "2026-01.json"))
+    assert set(december["reps"]) == {"r1"} and december["members"] == {"m1": "r1"}
+    assert set(january["reps"]) == {"r2"} and january["members"] == {}
@@ -0,0 +1,32 @@
+"""A photo is only hashed again when its size or mtime changed."""
+
+import os
+
+import pytest
+
+import waste_thumbnails
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_unchanged_photos_are_not_hashed_again(tmp_path, monkeypatch):
+    public_dir = str(tmp_path)
+    os.makedirs(tmp_path / "detected_waste_photos")
+    src_path = tmp_path / "detected_waste_photos" / "p1.jpg"
+    Image.new("RGB", (400, 300), "navy").save(src_path)
+    photos = [{"id": "p1", "url": "detected_waste_photos/p1.jpg"}]
+
+    hashed = []
+    file_hash = waste_thumbnails.file_hash
+    monkeypatch.setattr(waste_thumbnails, "file_hash", lambda path: hashed.append(path) or file_hash(path))
+
+    assert waste_thumbnails.add_thumbnails(photos, public_dir, workers=1) == 1
+    assert waste_thumbnails.add_thumbnails(photos, public_dir, workers=1) == 0
+    assert len(hashed) == 1
+    first = photos[0]["thumbnails"]
+
+    # a new image under the same name gets hashed and resized again
+    Image.new("RGB", (400, 300), "olive").save(src_path, quality=50)
+    os.utime(src_path, ns=(0, os.stat(src_path).st_mtime_ns + 1))
+    assert waste_thumbnails.add_thumbnails(photos, public_dir, workers=1) == 1
+    assert len(hashed) == 2 and photos[0]["thumbnails"] != first
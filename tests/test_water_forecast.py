@@ -0,0 +1,49 @@
+"""The forecast is only published as far ahead as it beats persistence."""
+
+import numpy as np
+
+import water_forecast as wf
+
+START = 1_700_000_000
+
+
+def _feed(model, levels, every=1200):
+    for i, level in enumerate(levels):
+        model.update(START + i * every, float(level), 0.0)
+
+
+def test_a_smooth_swell_is_forecast_further_than_persistence():
+    rng = np.random.default_rng(0)
+    model = wf.WaterLevelForecaster()
+    _feed(model, 100 + np.cumsum(0.5 * np.sin(np.arange(600) / 40) + rng.normal(0, 0.05, 600)))
+    forecast = model.forecast()
+    assert forecast['skilful'] and forecast['skilful_hours'] == wf.HORIZON_HOURS
+    assert forecast['water_level'][-1]['minutes'] > (wf.HORIZON_HOURS - 1) * 60
+    assert all(m < p for m, p in zip(forecast['mae'], forecast['persistence_mae']))
+
+
+def test_no_forecast_while_worse_than_persistence():
+    model = wf.WaterLevelForecaster()
+    _feed(model, np.linspace(100, 110, 200))
+    skill = model.state['skill']
+    skill['model'][0] = skill['persistence'][0] + 1.0
+    forecast = model.forecast({'below': 500.0, 'reached': 50.0})
+    assert forecast['skilful'] is False and forecast['skilful_hours'] == 0
+    assert forecast['water_level'] == []
+    # a threshold already reached is an observation, not a forecast
+    assert forecast['minutes_to_below'] is None and forecast['minutes_to_reached'] == 0
+
+
+def test_not_skilful_before_enough_scored_forecasts():
+    model = wf.WaterLevelForecaster()
+    _feed(model, np.linspace(100, 110, 10))
+    assert max(model.state['skill']['scored']) < wf.SKILL_MIN_SCORED
+    assert model.forecast()['skilful'] is False
+
+
+def test_skill_survives_a_checkpoint(tmp_path):
+    path = str(tmp_path / 'forecast_state.json')
+    model = wf.WaterLevelForecaster()
+    _feed(model, np.linspace(100, 110, 200))
+    model.save(path)
+    assert wf.WaterLevelForecaster.load(path).state['skill'] == model.state['skill']
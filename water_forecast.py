@@ -0,0 +1,376 @@
+"""
+Short-horizon water level forecast: where waterLevel will be over the next
+HORIZON_HOURS and how long until it reaches the warning and danger levels
+(analysis/thresholds.py).
+
+The readings arrive every 10-30 minutes, so they are first put on a fixed
+grid of STEP seconds by linear interpolation. On that grid an ARX model
+predicts the next change of the level from the previous change, the level
+itself and the last two rainfall values:
+
+    level[k] - level[k-1] = a * (level[k-1] - level[k-2]) + g * level[k-1]
+                            + b1 * rain[k-1] + b2 * rain[k-2] + c
+
+Modelling the change lets a steady rise carry on into the forecast, which
+is the case that matters; g (kept <= 0 when forecasting) lets the level
+recede towards its base once the rain stops.
+
+The coefficients are updated by recursive least squares every time a grid
+step completes, with exponential forgetting (FORGET per step) so they
+follow the river as it changes; nothing is ever refitted on the history.
+The model starts as persistence (no change). Forgetting is
+paused while the covariance is large, otherwise long stretches of
+unchanging readings would blow it up and the next change would swing the
+coefficients wildly.
+
+Each grid step also issues a forecast from the grid values and scores the
+ones issued over the last HORIZON_HOURS against the level that arrived, at
+every whole hour ahead, next to persistence (the level at issue time). The
+mean absolute errors are kept with the same forgetting. A forecast is only
+published as many hours ahead as it has beaten persistence at every hour up
+to there (after SKILL_MIN_SCORED scored forecasts); when it does not even
+beat it one hour ahead it is marked "skilful": false and carries no levels,
+and minutes_to_* only say whether a threshold is already reached.
+
+Every update costs the same: a 5x5 covariance, the coefficients, the last
+two grid values, the HORIZON_STEPS pending forecasts and the error means
+are the whole state, checkpointed to a small JSON file together with the
+latest forecast:
+
+    {"version": 1, "theta": [...], "P": [[...]], "lags": [[level, rain], ...], ...,
+     "forecast": {"issued": "2026-01-14 15:52:02", "water_level": [{"at": ..., "minutes": 8,
+                  "water_level": 162.7}, ...], "skilful": true, "skilful_hours": 3,
+                  "minutes_to_warning": 0, "minutes_to_danger": 95, ...}}
+
+The forecast assumes the rain keeps falling at the latest reading's rate.
+
+    python water_forecast.py --replay public/sensor_data.csv   # one step and 1-6 hour errors
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from analysis.thresholds import WATER_LEVEL_DANGER, WATER_LEVEL_WARNING
+from sensor_store import from_epoch
+
+STATE_FILE = os.path.join("data", "forecast_state.json")
+STATE_VERSION = 1
+
+STEP = 30 * 60           # seconds between grid points
+HORIZON_HOURS = 6
+HORIZON_STEPS = HORIZON_HOURS * 3600 // STEP
+MAX_GAP = 3 * 3600       # a longer gap between readings restarts the lags
+FORGET = 0.99            # per step, memory of ~100 steps (two days)
+P_INIT = [1.0, 1e-4, 1.0, 1.0, 1.0]   # initial covariance per coefficient, g multiplies a level in cm
+MAX_TRACE = 1e4          # no forgetting while trace(P) is above this
+CLIP = 3.0               # prediction errors are clipped to this many standard deviations...
+MIN_ERROR = 1.0          # ...but never below this many cm
+SKILL_MIN_SCORED = 48   # scored forecasts per hour ahead before the forecast is trusted
+THRESHOLDS = {'warning': WATER_LEVEL_WARNING, 'danger': WATER_LEVEL_DANGER}
+
+PARAMS = ['a', 'g', 'b1', 'b2', 'c']
+PERSISTENCE = [0.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def _regressors(lags):
+    (y1, u1), (y2, u2) = lags
+    return np.array([y1 - y2, y1, u1, u2, 1.0])
+
+
+def _predict(lags, theta):
+    return lags[0][0] + float(_regressors(lags) @ theta)
+
+
+def _path(lags, theta, rain, steps):
+    """Levels at the next `steps` grid points, rain held at `rain`."""
+    theta = np.array(theta)
+    # keep the recursion from running away over six hours: damped changes, no self-amplifying level
+    theta[0] = max(-0.95, min(0.95, theta[0]))
+    theta[1] = max(-0.5, min(0.0, theta[1]))
+    levels = []
+    for _ in range(steps):
+        predicted = _predict(lags, theta)
+        levels.append(predicted)
+        lags = [[predicted, rain], lags[0]]
+    return levels
+
+
+def _new_skill():
+    # mean abs error per hour ahead of the model and of persistence, and how many forecasts were scored
+    return {"model": [None] * HORIZON_HOURS, "persistence": [None] * HORIZON_HOURS,
+            "scored": [0] * HORIZON_HOURS}
+
+
+class WaterLevelForecaster:
+    def __init__(self, state=None):
+        self.state = state or {"version": STATE_VERSION, "theta": list(PERSISTENCE),
+                               "P": np.diag(P_INIT).tolist(),
+                               "lags": [], "last": None, "next_grid": None,
+                               "error_var": None, "updates": 0, "pending": [], "skill": _new_skill(),
+                               "forecast": None}
+
+    # -------------------------------
+    # Checkpoint
+    # -------------------------------
+    @classmethod
+    def load(cls, path=STATE_FILE):
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("version") == STATE_VERSION and len(state["theta"]) == len(PARAMS):
+                    # states saved before the skill tracking start scoring now
+                    state.setdefault("pending", [])
+                    state.setdefault("skill", _new_skill())
+                    return cls(state)
+                print(f"Ignoring {path}: written by a different version.")
+            except (OSError, ValueError, KeyError):
+                print(f"Could not read {path}, starting a new model.")
+        return cls()
+
+    def save(self, path=STATE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, path)
+
+    # -------------------------------
+    # Recursive least squares
+    # -------------------------------
+    def _score(self, grid, level):
+        """Compare the pending forecasts that reach this grid point with the level that arrived."""
+        state = self.state
+        skill = state["skill"]
+        pending = []
+        for issued in state["pending"]:
+            k = (grid - issued["grid"]) // STEP
+            if k * STEP % 3600 == 0 and 1 <= k <= len(issued["levels"]):
+                h = k * STEP // 3600 - 1
+                for name, predicted in (("model", issued["levels"][k - 1]), ("persistence", issued["base"])):
+                    error = abs(predicted - level)
+                    previous = skill[name][h]
+                    skill[name][h] = error if previous is None else FORGET * previous + (1 - FORGET) * error
+                skill["scored"][h] += 1
+            if k < len(issued["levels"]):
+                pending.append(issued)
+        state["pending"] = pending
+
+    def _learn(self, level, rain):
+        """One grid step: score the forecasts and the one step prediction, update the coefficients,
+        shift the lags and issue the forecast from this grid point."""
+        state = self.state
+        grid = state["next_grid"]
+        self._score(grid, level)
+        if len(state["lags"]) == 2:
+            phi = _regressors(state["lags"])
+            theta = np.array(state["theta"])
+            P = np.array(state["P"])
+            error = level - (state["lags"][0][0] + float(phi @ theta))
+            # Huber clipped, a glitch (a -350 reading) or a sudden step moves the coefficients only a little
+            previous = state["error_var"]
+            limit = CLIP * max(math.sqrt(previous) if previous is not None else 0.0, MIN_ERROR)
+            error = max(-limit, min(limit, error))
+
+            forget = FORGET if np.trace(P) < MAX_TRACE else 1.0
+            Pphi = P @ phi
+            gain = Pphi / (forget + phi @ Pphi)
+            theta = theta + gain * error
+            P = (P - np.outer(gain, Pphi)) / forget
+            state["theta"] = theta.tolist()
+            state["P"] = ((P + P.T) / 2).tolist()
+
+            state["error_var"] = error * error if previous is None else FORGET * previous + (1 - FORGET) * error * error
+            state["updates"] += 1
+        state["lags"] = [[level, rain]] + state["lags"][:1]
+        if len(state["lags"]) == 2:
+            levels = _path(state["lags"], state["theta"], rain, HORIZON_STEPS)
+            state["pending"].append({"grid": grid, "base": level, "levels": [round(y, 3) for y in levels]})
+
+    def update(self, epoch, level, rain):
+        """Add one reading (epoch seconds, waterLevel, rainfall); returns the grid steps it completed."""
+        state = self.state
+        last = state["last"]
+        if last is not None and epoch < last[0]:
+            raise ValueError("Readings must be added in timestamp order")
+
+        steps = 0
+        if last is None or epoch - last[0] > MAX_GAP:
+            # start over on the grid, the coefficients and the error means are kept
+            state["lags"] = []
+            state["pending"] = []
+            state["next_grid"] = -(-epoch // STEP) * STEP
+        else:
+            t0, y0, u0 = last
+            while state["next_grid"] <= epoch:
+                g = state["next_grid"]
+                w = (g - t0) / (epoch - t0) if epoch > t0 else 1.0
+                self._learn(y0 + w * (level - y0), u0 + w * (rain - u0))
+                state["next_grid"] = g + STEP
+                steps += 1
+        if epoch == state["next_grid"]:
+            self._learn(level, rain)
+            state["next_grid"] += STEP
+            steps += 1
+        state["last"] = [epoch, level, rain]
+        return steps
+
+    # -------------------------------
+    # Forecast
+    # -------------------------------
+    def trajectory(self, steps=HORIZON_STEPS + 1):
+        """Grid times and levels for the next `steps` grid points, rain held at the latest reading.
+
+        The path is shifted so it passes through the latest reading, which
+        can be up to a STEP newer than the last grid point.
+        """
+        state = self.state
+        if state["last"] is None:
+            return [], []
+        epoch, level, rain = state["last"]
+        lags = [list(lag) for lag in state["lags"]]
+        if len(lags) < 2:
+            # not enough grid history yet, persistence
+            lags = [[level, rain]] * 2 if not lags else [lags[0], lags[0]]
+        grid = state["next_grid"]
+        times = [grid + k * STEP for k in range(steps)]
+        levels = _path(lags, state["theta"], rain, steps)
+
+        # the model's level at the reading, between the last grid point and the first forecast
+        last_grid = state["lags"][0][0] if state["lags"] else level
+        w = 1 - (grid - epoch) / STEP
+        offset = level - (last_grid + w * (levels[0] - last_grid))
+        return times, [y + offset for y in levels]
+
+    def skilful_hours(self):
+        """How many hours ahead the forecast has beaten persistence at every hour so far."""
+        skill = self.state["skill"]
+        hours = 0
+        for model, naive, scored in zip(skill["model"], skill["persistence"], skill["scored"]):
+            if scored < SKILL_MIN_SCORED or model >= naive:
+                break
+            hours += 1
+        return hours
+
+    def forecast(self, thresholds=THRESHOLDS):
+        """The published forecast: levels as far ahead as they beat persistence and minutes to each threshold."""
+        state = self.state
+        if state["last"] is None:
+            return None
+        epoch, level, _ = state["last"]
+        hours = self.skilful_hours()
+        times, levels = self.trajectory()
+        points = [(t, y) for t, y in zip(times, levels) if epoch < t <= epoch + hours * 3600]
+        skill = state["skill"]
+
+        result = {
+            "issued": from_epoch(epoch),
+            "step_minutes": STEP // 60,
+            "horizon_hours": HORIZON_HOURS,
+            "water_level": [{"at": from_epoch(t), "minutes": (t - epoch) // 60, "water_level": round(y, 2)}
+                            for t, y in points],
+            "one_step_rmse": round(math.sqrt(state["error_var"]), 3) if state["error_var"] is not None else None,
+            "updates": state["updates"],
+            "skilful": hours > 0,
+            "skilful_hours": hours,
+            # mean abs error per hour ahead, None until scored
+            "mae": [round(v, 3) if v is not None else None for v in skill["model"]],
+            "persistence_mae": [round(v, 3) if v is not None else None for v in skill["persistence"]],
+            "coefficients": dict(zip(PARAMS, (round(v, 5) for v in state["theta"]))),
+        }
+        for name, threshold in thresholds.items():
+            result[f"minutes_to_{name}"] = minutes_to(threshold, epoch, level, points)
+        return result
+
+
+def minutes_to(threshold, epoch, level, points):
+    """Minutes until the level first reaches threshold along points, 0 if it already has, None if not within them."""
+    if level >= threshold:
+        return 0
+    t0, y0 = epoch, level
+    for t1, y1 in points:
+        if y1 >= threshold:
+            # linear between the two points around the crossing
+            return round((t0 + (threshold - y0) / (y1 - y0) * (t1 - t0) - epoch) / 60)
+        t0, y0 = t1, y1
+    return None
+
+
+def update_forecast(readings, state_path=STATE_FILE):
+    """Learn from readings (dicts with timestamp, waterLevel and rainfall) and store the new forecast."""
+    from sensor_store import to_epoch
+
+    model = WaterLevelForecaster.load(state_path)
+    last = model.state["last"]
+    for reading in readings:
+        epoch = to_epoch(reading['timestamp'])
+        if last is not None and epoch < last[0]:
+            continue
+        model.update(epoch, float(reading['waterLevel']), float(reading['rainfall']))
+        last = model.state["last"]
+    model.state["forecast"] = model.forecast()
+    model.save(state_path)
+    return model.state["forecast"]
+
+
+def latest_forecast(state_path=STATE_FILE):
+    """The forecast stored by the last update, or None before the first one."""
+    if not os.path.exists(state_path):
+        return None
+    return WaterLevelForecaster.load(state_path).state["forecast"]
+
+
+# -------------------------------
+# Offline evaluation
+# -------------------------------
+def replay(csv_path):
+    """Feed a csv through a fresh model and compare its forecasts with what happened."""
+    import pandas as pd
+
+    from sensor_store import to_epoch
+
+    frame = pd.read_csv(csv_path)
+    epochs = np.array([to_epoch(t) for t in frame['timestamp']])
+    levels = frame['waterLevel'].to_numpy(dtype=float)
+    model = WaterLevelForecaster()
+    errors = {hours: [] for hours in range(1, HORIZON_HOURS + 1)}
+    persistence = {hours: [] for hours in errors}
+    for i in range(len(frame)):
+        model.update(int(epochs[i]), float(levels[i]), float(frame['rainfall'].iat[i]))
+        times, predicted = model.trajectory()
+        for hours in errors:
+            target = epochs[i] + hours * 3600
+            j = np.searchsorted(epochs, target)
+            if j >= len(epochs) or epochs[j] - target > STEP or target > times[-1]:
+                continue
+            # the level actually read at about that time vs the forecast for it
+            errors[hours].append(float(np.interp(epochs[j], times, predicted)) - levels[j])
+            persistence[hours].append(levels[i] - levels[j])
+
+    print(f"{len(frame)} readings from {csv_path}, {model.state['updates']} grid updates")
+    print(f"  one step rmse {math.sqrt(model.state['error_var']):.2f}" if model.state["error_var"] else "")
+    print(f"  tracked skill: beats persistence up to {model.skilful_hours()} h ahead")
+    for hours in errors:
+        if errors[hours]:
+            mae = np.mean(np.abs(errors[hours]))
+            naive = np.mean(np.abs(persistence[hours]))
+            print(f"  {hours} h ahead: mean abs error {mae:.2f} (persistence {naive:.2f}, {len(errors[hours])} forecasts)")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Short-horizon water level forecast.")
+    parser.add_argument("--replay", metavar="CSV", help="evaluate the forecaster on a csv of readings")
+    args = parser.parse_args()
+    if not args.replay:
+        parser.error("nothing to do, pass --replay")
+    replay(args.replay)
+
+
+if __name__ == "__main__":
+    main()